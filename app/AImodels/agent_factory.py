@@ -1,139 +1,270 @@
 # app/AImodels/agent_factory.py
-from transformers import AutoTokenizer, AutoModelForSeq2SeqLM, pipeline
-from langchain_community.llms import HuggingFacePipeline
 from langchain.agents import AgentExecutor, create_react_agent
 from langchain.memory import ConversationBufferMemory
+from langchain.prompts import PromptTemplate
+from langchain_core.messages import get_buffer_string
 from langchain import hub  # 👈 추가
-import torch
+from typing import Optional
 import os
 import logging
 from app.AImodels.tools import ALL_TOOLS
+from app.AImodels.local_llm import LocalSeq2SeqLLM, load_seq2seq_model
+from app.AImodels.prompts import AGENT_PROMPT_TEMPLATE, ANSWER_PROMPT_TEMPLATE
+from app.AImodels.batching import MicroBatcher
+from app.AImodels.react_constraints import ReActGrammarLogitsProcessor
+from app.AImodels.model_loader import LazyModel
+from app.core.config import settings
+from app.AImodels.replica_pool import ReplicaPool
 
 logger = logging.getLogger(__name__)
 
 # 환경 변수 설정
 REPO_ID = os.getenv('LLM_REPO_ID', 'google/flan-t5-large')
+# CPU 양자화 모드: "none"(float32) | "int8"(Linear 레이어 동적 int8 양자화)
+LLM_QUANTIZATION = os.getenv('LLM_QUANTIZATION', 'none').lower()
+AGENT_VERBOSE = os.getenv('AGENT_VERBOSE', 'false').lower() == 'true'
+# 동시 요청 마이크로 배칭 (LLM_BATCH_MAX_SIZE=1이면 비활성화)
+# 동시에 실행되는 추론이 있어야 묶이므로 기본값은 추론 워커(INFERENCE_WORKERS)가 2개 이상일 때만 켬
+# (워커 1개면 매 생성마다 max_wait만 기다리고 묶을 요청이 없음)
+LLM_BATCH_MAX_SIZE = int(os.getenv('LLM_BATCH_MAX_SIZE', '8' if settings.INFERENCE_WORKERS > 1 else '1'))
+LLM_BATCH_MAX_WAIT_MS = float(os.getenv('LLM_BATCH_MAX_WAIT_MS', '10'))
+# ReAct 형식(Thought/Action/Action Input/Final Answer + Tool 이름) 강제 디코딩
+LLM_CONSTRAINED_DECODING = os.getenv('LLM_CONSTRAINED_DECODING', 'false').lower() == 'true'
+# 모델 복사본 수 / 추론 한 번의 torch 스레드 수 (0이면 코어 수 / 복사본 수)
+# torch 스레드 수는 프로세스 전체 설정이라 LLM/VL 중 작은 값이 적용됨 (replica_pool.reserve_threads)
+LLM_REPLICAS = int(os.getenv('LLM_REPLICAS', '1'))
+LLM_THREADS_PER_REPLICA = int(os.getenv('LLM_THREADS_PER_REPLICA', '0'))
+# 로드 전 예상 메모리 (MODEL_MEMORY_BUDGET_MB 계산용, flan-t5-large float32 기준)
+LLM_FOOTPRINT_MB = int(os.getenv('LLM_FOOTPRINT_MB', '3200'))
+# ReAct 루프 최대 반복 수 (= 요청당 최대 LLM 호출 수, 시간 예산 분할 기준)
+AGENT_MAX_ITERATIONS = 3
+# compose_answer에서 Tool 결과에 최소한 남길 토큰 수
+MIN_OBSERVATION_TOKENS = 64
 
-logger.info(f"🔍 LLM_REPO_ID: {REPO_ID}")
+logger.info(f"🔍 LLM_REPO_ID: {REPO_ID} (quantization: {LLM_QUANTIZATION})")
 
 # 전역 변수
 huggingfacehub = None
+llm_tokenizer = None
 initial_agent = None
 GLOBAL_TOOLS = ALL_TOOLS
+GLOBAL_AGENT_EXECUTOR = None  # initialize_global_agent()에서 한 번만 빌드
 
 def initialize_global_agent():
     """전역 LLM과 Tool을 초기화 (로컬 모델)"""
-    global huggingfacehub, GLOBAL_TOOLS, initial_agent
+    global huggingfacehub, llm_tokenizer, GLOBAL_TOOLS, initial_agent, GLOBAL_AGENT_EXECUTOR
     
     try:
         logger.info("🚀 Initializing Global LLM and Tools (Local Model)...")
         
-        # GPU 사용 가능 확인
-        device = 0 if torch.cuda.is_available() else -1
-        logger.info(f"🖥️ Using device: {'GPU' if device == 0 else 'CPU'}")
-        
-        # 토크나이저와 모델 로드
-        tokenizer = AutoTokenizer.from_pretrained(REPO_ID)
-        model = AutoModelForSeq2SeqLM.from_pretrained(
-            REPO_ID,
-            torch_dtype=torch.float16 if device == 0 else torch.float32,
-            device_map="auto" if device == 0 else None
+        # 토크나이저와 모델 로드 (GPU: float16, CPU: float32 또는 int8 양자화)
+        # 레플리카마다 (tokenizer, model)을 따로 두고 대여해서 사용
+        replicas = ReplicaPool(
+            "llm",
+            lambda: load_seq2seq_model(REPO_ID, quantization=LLM_QUANTIZATION),
+            size=LLM_REPLICAS,
+            threads_per_replica=LLM_THREADS_PER_REPLICA or None
         )
+        tokenizer, model = replicas.primary
         
-        # Pipeline 생성
-        pipe = pipeline(
-            "text2text-generation",
+        # LangChain LLM으로 래핑 (콜백이 있으면 토큰 스트리밍)
+        huggingfacehub = LocalSeq2SeqLLM(
             model=model,
             tokenizer=tokenizer,
             max_new_tokens=512,
-            temperature=0.1
+            replicas=replicas
         )
         
-        # LangChain LLM으로 래핑
-        huggingfacehub = HuggingFacePipeline(pipeline=pipe)
+        if LLM_CONSTRAINED_DECODING:
+            huggingfacehub.grammar_processor = ReActGrammarLogitsProcessor(
+                tokenizer, [tool.name for tool in GLOBAL_TOOLS]
+            )
+            logger.info("🧩 Constrained ReAct decoding enabled")
+        
+        # 여러 사용자의 ReAct 단계를 한 번의 generate로 묶어서 실행
+        if LLM_BATCH_MAX_SIZE > 1:
+            huggingfacehub.batcher = MicroBatcher(
+                run_batch=huggingfacehub._run_batch,
+                max_batch_size=LLM_BATCH_MAX_SIZE,
+                max_wait_ms=LLM_BATCH_MAX_WAIT_MS,
+                name="llm_batch",
+                num_workers=LLM_REPLICAS  # 레플리카마다 배치 하나씩 동시에 실행
+            )
+            logger.info(f"📦 LLM micro-batching: max_batch={LLM_BATCH_MAX_SIZE}, max_wait={LLM_BATCH_MAX_WAIT_MS}ms")
+        llm_tokenizer = tokenizer
         
         logger.info(f"✅ Tools loaded: {[tool.name for tool in GLOBAL_TOOLS]}")
         
+        # Agent는 여기서 한 번만 빌드하고 요청마다 재사용
+        GLOBAL_AGENT_EXECUTOR = build_agent_executor(huggingfacehub, GLOBAL_TOOLS)
+        
         initial_agent = True
         
         logger.info(f"✅ LLM initialized (Local): {REPO_ID}")
         logger.info(f"✅ Total tools: {len(GLOBAL_TOOLS)}")
         
+        return huggingfacehub
+        
     except Exception as e:
         logger.error(f"❌ LLM 초기화 오류: {e}")
         huggingfacehub = None
+        llm_tokenizer = None
+        GLOBAL_AGENT_EXECUTOR = None
         initial_agent = False
         raise
 
-def create_agent_executor(memory_instance: ConversationBufferMemory):
-    """세션별 Agent Executor 생성"""
-    if not huggingfacehub or not initial_agent:
-        raise RuntimeError("LLM이 초기화되지 않았습니다.")
+def unload_global_agent():
+    """메모리 예산 때문에 LLM을 내릴 때 모델을 참조하는 전역 상태 정리"""
+    global huggingfacehub, llm_tokenizer, initial_agent, GLOBAL_AGENT_EXECUTOR
     
-    logger.info("🔧 Creating Agent Executor with memory...")
-    
-    # 커스텀 프롬프트 템플릿
-    from langchain.prompts import PromptTemplate
-    
-    template = """You are a helpful medical assistant. Answer questions based on the tools available and conversation history.
-
-Available tools:
-{tools}
-
-Tool Names: {tool_names}
+    if huggingfacehub is not None and huggingfacehub.batcher is not None:
+        huggingfacehub.batcher.close()
+    huggingfacehub = None
+    llm_tokenizer = None
+    GLOBAL_AGENT_EXECUTOR = None
+    initial_agent = None
 
-Guidelines:
-- If the question contains "prescription_id: [number]", use VL_Model_Image_Analyzer with that number as input
-- For drug information questions, use Public_Data_API_Searcher
-- Otherwise, answer based on your knowledge
+# 지연 로딩 래퍼: 서버 시작 후 백그라운드 로드 또는 첫 요청 시 로드
+llm_model = LazyModel(
+    "llm",
+    initialize_global_agent,
+    unload_fn=unload_global_agent,
+    footprint_mb=LLM_FOOTPRINT_MB
+)
 
-Use this format:
-Question: the input question
-Thought: think about what to do
-Action: the tool to use (one of [{tool_names}]) OR say "No tool needed"
-Action Input: the input for the tool (if using a tool)
-Observation: the tool's response
-... (repeat Thought/Action/Observation if needed)
-Thought: I now know the final answer
-Final Answer: the complete answer to the question
+def count_tokens(text: str) -> int:
+    """LLM 토크나이저 기준 토큰 수 (토크나이저 로드 전에는 글자 수 기반 근사치)"""
+    if not text:
+        return 0
+    if llm_tokenizer is None:
+        # 한국어 기준 대략 2글자당 1토큰
+        return len(text) // 2 + 1
+    return len(llm_tokenizer.encode(text, add_special_tokens=False))
 
-Begin!
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """LLM 토크나이저 기준 앞에서부터 max_tokens 토큰까지만 남김 (토크나이저 로드 전에는 글자 수 기반 근사치)"""
+    if count_tokens(text) <= max_tokens:
+        return text
+    if llm_tokenizer is None:
+        return text[:max_tokens * 2]
+    token_ids = llm_tokenizer.encode(text, add_special_tokens=False)[:max_tokens]
+    return llm_tokenizer.decode(token_ids, skip_special_tokens=True)
 
-Previous conversation:
-{chat_history}
-
-Question: {input}
-{agent_scratchpad}"""
+def build_agent_executor(llm, tools, memory_instance: Optional[ConversationBufferMemory] = None) -> AgentExecutor:
+    """
+    프롬프트 + ReAct Agent + AgentExecutor 생성
     
-    prompt = PromptTemplate.from_template(template)
+    Args:
+        llm: LangChain LLM
+        tools: Agent가 사용할 Tool 리스트
+        memory_instance: 바인딩할 메모리 (None이면 호출 시 chat_history를 직접 전달)
+        
+    Returns:
+        AgentExecutor 인스턴스
+    """
+    prompt = PromptTemplate.from_template(AGENT_PROMPT_TEMPLATE)
     
     agent = create_react_agent(
-        llm=huggingfacehub,
-        tools=GLOBAL_TOOLS,
+        llm=llm,
+        tools=tools,
         prompt=prompt
     )
     
-    agent_executor = AgentExecutor(
+    return AgentExecutor(
         agent=agent,
-        tools=GLOBAL_TOOLS,
+        tools=tools,
         memory=memory_instance,
-        verbose=True,
+        verbose=AGENT_VERBOSE,
         handle_parsing_errors=True,
-        max_iterations=3  # 👈 iteration 제한 줄임
+        max_iterations=AGENT_MAX_ITERATIONS  # 👈 iteration 제한 줄임
     )
+
+def create_agent_executor(memory_instance: ConversationBufferMemory):
+    """세션별 Agent Executor 생성 (이전 방식: 요청마다 Agent를 새로 빌드, 벤치마크 비교용)"""
+    if not huggingfacehub or not initial_agent:
+        raise RuntimeError("LLM이 초기화되지 않았습니다.")
+    
+    logger.info("🔧 Creating Agent Executor with memory...")
+    
+    agent_executor = build_agent_executor(huggingfacehub, GLOBAL_TOOLS, memory_instance)
     
     logger.info("✅ Agent Executor created successfully")
     
     return agent_executor
 
-SESSION_MEMORY_CACHE = {}
+# 라우터가 고른 Tool을 이름으로 찾기 위한 dict
+TOOLS_BY_NAME = {tool.name: tool for tool in GLOBAL_TOOLS}
 
-def cleanup_old_sessions(max_sessions: int = 1000):
-    """메모리 캐시 정리"""
-    if len(SESSION_MEMORY_CACHE) > max_sessions:
-        keys_to_delete = list(SESSION_MEMORY_CACHE.keys())[:len(SESSION_MEMORY_CACHE) // 2]
-        for key in keys_to_delete:
-            del SESSION_MEMORY_CACHE[key]
-        logger.info(f"🧹 Cleaned up {len(keys_to_delete)} old sessions")
+def memory_to_chat_history(memory_instance: Optional[ConversationBufferMemory]) -> str:
+    """메모리 내용을 프롬프트의 {chat_history}에 들어갈 문자열로 변환"""
+    if memory_instance is None:
+        return ""
+    return get_buffer_string(memory_instance.chat_memory.messages)
 
-GLOBAL_AGENT_EXECUTOR = None
\ No newline at end of file
+def run_agent(
+    query: str,
+    memory_instance: Optional[ConversationBufferMemory] = None,
+    callbacks: Optional[list] = None
+) -> dict:
+    """
+    미리 빌드된 전역 Agent 실행 (요청별 상태는 호출 시점에 전달)
+    
+    Args:
+        query: 사용자 질문
+        memory_instance: 대화 기록 메모리 (옵션)
+        callbacks: LangChain 콜백 핸들러 리스트 (옵션)
+        
+    Returns:
+        AgentExecutor.invoke 결과 dict ("output" 키에 최종 답변)
+    """
+    # 아직 로드되지 않았으면 여기서 로드 (추론 스레드에서 실행됨), 실행 중에는 언로드되지 않음
+    with llm_model.use():
+        return GLOBAL_AGENT_EXECUTOR.invoke(
+            {
+                "input": query,
+                "chat_history": memory_to_chat_history(memory_instance)
+            },
+            config={"callbacks": callbacks} if callbacks else None
+        )
+
+def compose_answer(
+    query: str,
+    tool_name: str,
+    observation: str,
+    memory_instance: Optional[ConversationBufferMemory] = None,
+    callbacks: Optional[list] = None
+) -> str:
+    """
+    Tool 실행 결과로 최종 답변만 생성 (LLM 1회 호출, ReAct 루프 없음)
+    
+    Args:
+        query: 사용자 질문
+        tool_name: 실행된 Tool 이름
+        observation: Tool 실행 결과
+        memory_instance: 대화 기록 메모리 (옵션)
+        callbacks: LangChain 콜백 핸들러 리스트 (옵션)
+        
+    Returns:
+        최종 답변 텍스트
+    """
+    chat_history = memory_to_chat_history(memory_instance)
+    
+    with llm_model.use() as llm:
+        # 긴 Tool 결과(약물 정보, VL 분석) 때문에 뒤쪽 질문/"Answer:"가 잘리지 않도록
+        # 나머지 프롬프트를 뺀 토큰 수만큼만 Tool 결과를 남김 (특수 토큰 몇 개만큼 여유)
+        fixed_tokens = count_tokens(ANSWER_PROMPT_TEMPLATE.format(
+            chat_history=chat_history, input=query, tool_name=tool_name, observation=""
+        ))
+        observation_budget = max(llm.max_input_tokens - fixed_tokens - 8, MIN_OBSERVATION_TOKENS)
+        prompt = ANSWER_PROMPT_TEMPLATE.format(
+            chat_history=chat_history,
+            input=query,
+            tool_name=tool_name,
+            observation=truncate_to_tokens(observation, observation_budget)
+        )
+        
+        # "final_answer" 태그: 스트리밍 핸들러가 모든 토큰을 최종 답변으로 전달
+        return llm.invoke(
+            prompt,
+            config={"callbacks": callbacks, "tags": ["final_answer"]}
+        ).strip()
@@ -0,0 +1,134 @@
+# app/AImodels/batching.py
+"""
+동적 마이크로 배칭 스케줄러
+동시에 들어온 생성 요청을 짧은 시간(max_wait_ms) 동안 모아서 한 번의 배치 호출로 실행하고
+각 결과를 요청한 호출자에게 돌려줌
+
+배치 기준 요청은 제출한 추론 작업의 우선순위(aging 적용)가 가장 높은 요청
+"""
+from concurrent.futures import Future
+from collections import deque
+from typing import Any, Callable, Hashable, List, Optional
+import threading
+import time
+import logging
+from app.core.metrics import metrics
+from app.core.priority import current_priority, effective_priority
+
+logger = logging.getLogger(__name__)
+
+
+class _BatchItem:
+    __slots__ = ("payload", "group_key", "priority", "future", "enqueued_at")
+
+    def __init__(self, payload: Any, group_key: Hashable, priority: int):
+        self.payload = payload
+        self.group_key = group_key
+        self.priority = priority
+        self.future: Future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class MicroBatcher:
+    def __init__(
+        self,
+        run_batch: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = 8,
+        max_wait_ms: float = 10,
+        name: str = "batcher",
+        num_workers: int = 1
+    ):
+        """
+        Args:
+            run_batch: payload 리스트를 받아 같은 순서의 결과 리스트를 반환하는 함수
+            max_batch_size: 한 배치에 담을 최대 요청 수
+            max_wait_ms: 첫 요청이 들어온 뒤 배치를 채우기 위해 기다리는 최대 시간
+            name: 메트릭/스레드 이름
+            num_workers: 배치를 실행할 스레드 수
+        """
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.name = name
+        self._pending: deque = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._workers = [
+            threading.Thread(target=self._worker_loop, name=f"{name}-{i}", daemon=True)
+            for i in range(num_workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, payload: Any, group_key: Optional[Hashable] = None) -> Future:
+        """
+        요청 제출 (group_key가 같은 요청끼리만 한 배치로 묶임)
+        우선순위는 현재 추론 작업의 우선순위(contextvar)를 사용
+
+        Returns:
+            결과를 담을 Future
+        """
+        item = _BatchItem(payload, group_key, current_priority())
+        with self._cond:
+            self._pending.append(item)
+            metrics.set_gauge(f"{self.name}.pending", len(self._pending))
+            self._cond.notify()
+        return item.future
+
+    def run(self, payload: Any, group_key: Optional[Hashable] = None) -> Any:
+        """동기 호출용: 결과가 나올 때까지 대기"""
+        return self.submit(payload, group_key).result()
+
+    def close(self) -> None:
+        """남은 요청을 처리한 뒤 워커 스레드 종료 (모델 언로드 시 run_batch 참조 해제)"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def _next_batch(self) -> List[_BatchItem]:
+        with self._cond:
+            while not self._pending:
+                if self._closed:
+                    return []
+                self._cond.wait()
+
+            # 우선순위가 가장 높은 요청(같으면 가장 오래 기다린 요청) 기준으로 같은 그룹끼리 모음
+            now = time.perf_counter()
+            first = min(self._pending, key=lambda item: (effective_priority(item.priority, item.enqueued_at, now), item.enqueued_at))
+            deadline = first.enqueued_at + self.max_wait
+            while True:
+                same_group = [item for item in self._pending if item.group_key == first.group_key]
+                remaining = deadline - time.perf_counter()
+                if len(same_group) >= self.max_batch_size or remaining <= 0:
+                    break
+                self._cond.wait(timeout=remaining)
+
+            # 같은 그룹 안에서도 우선순위가 높은 요청부터 배치에 담음
+            same_group.sort(key=lambda item: (item.priority, item.enqueued_at))
+            batch = same_group[:self.max_batch_size]
+            for item in batch:
+                self._pending.remove(item)
+            metrics.set_gauge(f"{self.name}.pending", len(self._pending))
+            return batch
+
+    def _worker_loop(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return
+            started_at = time.perf_counter()
+            for item in batch:
+                metrics.observe(f"{self.name}.queue_wait_ms", (started_at - item.enqueued_at) * 1000)
+            metrics.observe(f"{self.name}.batch_size", len(batch))
+
+            try:
+                results = self.run_batch([item.payload for item in batch])
+                for item, result in zip(batch, results):
+                    item.future.set_result(result)
+            except Exception as e:
+                logger.error(f"❌ [{self.name}] 배치 실행 실패: {e}")
+                for item in batch:
+                    if not item.future.done():
+                        item.future.set_exception(e)
+            finally:
+                metrics.observe(f"{self.name}.batch_ms", (time.perf_counter() - started_at) * 1000)
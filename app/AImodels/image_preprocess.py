@@ -0,0 +1,191 @@
+# app/AImodels/image_preprocess.py
+"""
+Qwen2-VL 입력 전 처방전 이미지 전처리
+휴대폰 사진(12MP 이상)을 그대로 넣으면 visual token 수(= prefill 시간/메모리)가 해상도에 비례해서 늘어나므로
+픽셀 예산 안으로 줄이고 종이 문서에 맞게 정규화
+
+1. JPEG 축소 디코딩 (픽셀 예산에 맞는 크기로만 디코딩)
+2. EXIF 회전 보정
+3. 흑백 + 대비 정규화 (종이 처방전, 기본 꺼짐)
+4. 종이 영역 자르기 (어두운 배경 위의 밝은 종이만 남김, 기본 꺼짐)
+5. 픽셀 예산(VL_MAX_PIXELS) 이하로 축소
+
+3/4는 분석 정확도 검증 전이라 기본으로 끄고, 설정은 preprocess_signature()로 분석 캐시 키(model_version)에 포함
+"""
+from PIL import Image, ImageFilter, ImageOps
+from io import BytesIO
+from typing import Optional, Union
+import math
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Qwen2-VL visual token 1개 = 28x28 픽셀
+VL_MIN_PIXELS = int(os.getenv("VL_MIN_PIXELS", str(256 * 28 * 28)))
+VL_MAX_PIXELS = int(os.getenv("VL_MAX_PIXELS", str(1280 * 28 * 28)))
+VL_GRAYSCALE = os.getenv("VL_GRAYSCALE", "false").lower() == "true"
+VL_AUTOCROP = os.getenv("VL_AUTOCROP", "false").lower() == "true"
+
+# 전처리 알고리즘이 바뀌면 올림 (분석 캐시 키에 포함)
+PREPROCESS_VERSION = 3
+
+# 종이 영역 검출은 긴 변을 이 크기로 줄인 이미지에서 수행
+CROP_ANALYSIS_SIZE = 256
+# 가장 큰 밝은 영역이 이미지의 이 비율보다 작으면 종이를 찾지 못한 것으로 보고 자르지 않음
+CROP_MIN_PAPER_RATIO = 0.2
+# 자른 영역 주변에 남길 여백 비율
+CROP_MARGIN_RATIO = 0.02
+# 이보다 적게 줄어들면 자르지 않음 (종이가 사진 대부분을 차지하거나 배경도 밝은 사진)
+CROP_MIN_REDUCTION = 0.1
+# 종이(밝은 쪽)와 배경(어두운 쪽) 평균 밝기 차이가 이보다 작으면 배경도 밝은 사진으로 보고 자르지 않음
+CROP_MIN_CONTRAST = 40
+
+
+def preprocess_signature() -> str:
+    """현재 전처리 설정 (같은 이미지라도 설정이 다르면 모델 입력이 달라지므로 캐시 키에 포함)"""
+    return (
+        f"pre{PREPROCESS_VERSION}-px{VL_MIN_PIXELS}-{VL_MAX_PIXELS}"
+        f"{'-gray' if VL_GRAYSCALE else ''}{'-crop' if VL_AUTOCROP else ''}"
+    )
+
+
+def _scale_for_budget(width: int, height: int, max_pixels: int) -> float:
+    return min(1.0, math.sqrt(max_pixels / float(width * height)))
+
+
+def _otsu_threshold(histogram: list) -> tuple:
+    """
+    밝기 히스토그램을 두 집단(배경 / 종이)으로 가장 잘 나누는 임계값 (Otsu)
+
+    Returns:
+        (임계값, 두 집단의 평균 밝기 차이)
+    """
+    total = sum(histogram)
+    sum_all = sum(value * count for value, count in enumerate(histogram))
+    sum_dark, weight_dark = 0.0, 0
+    best_variance, threshold, contrast = -1.0, 127, 0.0
+    for value, count in enumerate(histogram):
+        weight_dark += count
+        if weight_dark == 0:
+            continue
+        weight_bright = total - weight_dark
+        if weight_bright == 0:
+            break
+        sum_dark += value * count
+        mean_dark = sum_dark / weight_dark
+        mean_bright = (sum_all - sum_dark) / weight_bright
+        variance = weight_dark * weight_bright * (mean_dark - mean_bright) ** 2
+        if variance > best_variance:
+            best_variance, threshold, contrast = variance, value, mean_bright - mean_dark
+    return threshold, contrast
+
+
+def _largest_region(mask: bytes, width: int, height: int) -> Optional[tuple]:
+    """
+    mask에서 0이 아닌 픽셀이 상하좌우로 이어진 가장 큰 영역
+
+    Returns:
+        (픽셀 수, (left, top, right, bottom)) - 해당 픽셀이 없으면 None
+    """
+    size = width * height
+    seen = bytearray(size)
+    best = None
+    for start in range(size):
+        if not mask[start] or seen[start]:
+            continue
+        seen[start] = 1
+        stack = [start]
+        count = 0
+        left, top, right, bottom = width, height, 0, 0
+        while stack:
+            index = stack.pop()
+            count += 1
+            y, x = divmod(index, width)
+            left, right = min(left, x), max(right, x)
+            top, bottom = min(top, y), max(bottom, y)
+            neighbors = (
+                index - 1 if x > 0 else -1,
+                index + 1 if x < width - 1 else -1,
+                index - width,
+                index + width,
+            )
+            for neighbor in neighbors:
+                if 0 <= neighbor < size and mask[neighbor] and not seen[neighbor]:
+                    seen[neighbor] = 1
+                    stack.append(neighbor)
+        if best is None or count > best[0]:
+            best = (count, (left, top, right + 1, bottom + 1))
+    return best
+
+
+def _autocrop(image: Image.Image) -> Image.Image:
+    """어두운 배경(책상 등) 위에서 가장 큰 밝은 영역(종이)만 남김"""
+    small = image.convert("L")
+    small.thumbnail((CROP_ANALYSIS_SIZE, CROP_ANALYSIS_SIZE))
+    # 글씨/잡티가 종이 영역을 끊지 않도록 흐리게 한 뒤 밝은 픽셀만 표시
+    small = small.filter(ImageFilter.MedianFilter(5))
+    threshold, contrast = _otsu_threshold(small.histogram())
+    if contrast < CROP_MIN_CONTRAST:
+        return image
+    mask = small.point(lambda value: 255 if value > threshold else 0).tobytes()
+
+    region = _largest_region(mask, small.width, small.height)
+    if region is None or region[0] < small.width * small.height * CROP_MIN_PAPER_RATIO:
+        return image
+
+    width, height = image.size
+    scale_x, scale_y = width / small.width, height / small.height
+    left, top, right, bottom = region[1]
+    margin_x, margin_y = int(width * CROP_MARGIN_RATIO), int(height * CROP_MARGIN_RATIO)
+    bbox = (
+        max(0, int(left * scale_x) - margin_x),
+        max(0, int(top * scale_y) - margin_y),
+        min(width, math.ceil(right * scale_x) + margin_x),
+        min(height, math.ceil(bottom * scale_y) + margin_y),
+    )
+    cropped_area = (bbox[2] - bbox[0]) * (bbox[3] - bbox[1])
+    if cropped_area > width * height * (1 - CROP_MIN_REDUCTION):
+        return image
+    return image.crop(bbox)
+
+
+def preprocess_prescription_image(
+    source: Union[bytes, Image.Image],
+    max_pixels: int = VL_MAX_PIXELS,
+    grayscale: bool = VL_GRAYSCALE,
+    autocrop: bool = VL_AUTOCROP
+) -> Image.Image:
+    """
+    처방전 이미지 전처리
+
+    Args:
+        source: 이미지 바이트 또는 PIL.Image
+        max_pixels: 최대 픽셀 수 (Qwen2-VL processor의 max_pixels와 같은 값)
+        grayscale: 흑백/대비 정규화 여부
+        autocrop: 종이 영역 자르기 여부
+
+    Returns:
+        PIL.Image: VL 모델에 넣을 RGB 이미지
+    """
+    image = Image.open(BytesIO(source)) if isinstance(source, bytes) else source
+
+    # JPEG는 픽셀 예산보다 크지 않은 선에서 1/2, 1/4, 1/8로 축소 디코딩
+    scale = _scale_for_budget(image.width, image.height, max_pixels)
+    if scale < 1.0 and image.format == "JPEG":
+        image.draft("RGB", (int(image.width * scale), int(image.height * scale)))
+
+    image = ImageOps.exif_transpose(image)
+
+    if grayscale:
+        image = ImageOps.autocontrast(image.convert("L"), cutoff=1)
+
+    if autocrop:
+        image = _autocrop(image)
+
+    scale = _scale_for_budget(image.width, image.height, max_pixels)
+    if scale < 1.0:
+        size = (max(28, int(image.width * scale)), max(28, int(image.height * scale)))
+        image = image.resize(size, Image.LANCZOS)
+
+    return image.convert("RGB")
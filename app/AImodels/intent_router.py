@@ -0,0 +1,129 @@
+# app/AImodels/intent_router.py
+"""
+Agent 실행 전 의도가 명확한 질문을 바로 Tool로 보내는 규칙 기반 라우터
+- 알려진 약물 이름이 정확히 하나 포함 → Public_Data_API_Searcher
+그 외(애매하거나 열린 질문)는 None을 반환해서 ReAct Agent가 처리
+
+처방전 이미지(VL_Model_Image_Analyzer)는 질문 텍스트에서 찾지 않음
+(사용자가 다른 사람의 prescription_id를 입력할 수 있으므로) - 엔드포인트가 소유권을 확인한 뒤
+prescription_route()로 만든 Route를 process_chat_with_db에 직접 전달
+"""
+from collections import OrderedDict
+from functools import lru_cache
+from typing import NamedTuple, Optional
+import re
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# VL Tool 입력에서 prescription_id와 VL 모델에 보낼 질문 구분자 ("N|질문")
+VL_QUESTION_SEPARATOR = "|"
+
+# 자주 묻는 일반의약품 이름
+KNOWN_DRUG_NAMES = {
+    "타이레놀", "게보린", "펜잘", "판피린", "판콜", "부루펜", "애드빌", "탁센",
+    "아스피린", "베아제", "훼스탈", "겔포스", "개비스콘", "지르텍", "알레그라",
+    "후시딘", "마데카솔", "이지엔6", "아세트아미노펜", "이부프로펜", "나프록센",
+    "세티리진", "로라타딘", "오메프라졸", "아목시실린", "메트포르민",
+}
+
+# 약물 API에서 정확히 일치한 제품명 (실행 중에 추가, 최근에 쓰인 순서로 MAX_LEARNED_NAMES개까지 유지)
+_learned_names: "OrderedDict[str, None]" = OrderedDict()
+MAX_LEARNED_NAMES = 500
+# 학습할 약물 이름 최소/최대 길이 ("정", "약" 같은 조각이나 문장 전체 제외)
+MIN_LEARNED_NAME_LENGTH = 2
+MAX_LEARNED_NAME_LENGTH = 20
+
+# 약물 이름 뒤에 붙어도 같은 단어로 보는 조사 ("타이레놀은", "게보린이랑")
+PARTICLES = (
+    "이랑", "하고", "에서", "으로", "이나", "은", "는", "이", "가", "을", "를",
+    "의", "에", "도", "와", "과", "랑", "로", "만", "나",
+)
+
+_names_lock = threading.Lock()
+
+
+class Route(NamedTuple):
+    """라우팅 결과: 실행할 Tool 이름과 입력"""
+    tool_name: str
+    tool_input: str
+
+
+def prescription_route(prescription_id: int, question: Optional[str] = None) -> Route:
+    """
+    소유권을 확인한 처방전 이미지 분석 Route
+
+    Args:
+        prescription_id: 엔드포인트에서 현재 사용자 소유로 확인한 처방전 ID
+        question: 같은 이미지에 대한 후속 질문 (없으면 기본 분석 프롬프트)
+    """
+    if question and question.strip():
+        return Route("VL_Model_Image_Analyzer", f"{prescription_id}{VL_QUESTION_SEPARATOR}{question.strip()}")
+    return Route("VL_Model_Image_Analyzer", str(prescription_id))
+
+
+def remember_drug_name(name: str) -> None:
+    """
+    약물 API에서 검색어와 정확히 일치한 제품명(itemName)을 알려진 약물 목록에 추가
+    검색어 자체는 부분 검색으로 아무 제품이나 찾을 수 있으므로 학습하지 않음
+    """
+    name = name.strip()
+    if len(name) < MIN_LEARNED_NAME_LENGTH or len(name) > MAX_LEARNED_NAME_LENGTH or " " in name:
+        return
+    if name in KNOWN_DRUG_NAMES:
+        return
+    with _names_lock:
+        _learned_names[name] = None
+        _learned_names.move_to_end(name)
+        while len(_learned_names) > MAX_LEARNED_NAMES:
+            _learned_names.popitem(last=False)
+
+
+@lru_cache(maxsize=2048)
+def _name_pattern(name: str) -> re.Pattern:
+    """단어 경계에서만 매칭 (앞은 단어 시작, 뒤는 단어 끝 또는 조사)"""
+    particles = "|".join(PARTICLES)
+    return re.compile(rf"(?<!\w){re.escape(name.lower())}(?:{particles})?(?!\w)")
+
+
+def find_drug_names(query: str) -> list:
+    """질문에 단어로 들어 있는 알려진 약물 이름 (다른 이름에 포함되는 짧은 이름은 제외)"""
+    lowered = query.lower()
+    with _names_lock:
+        learned = list(_learned_names)
+    matches = [
+        name for name in list(KNOWN_DRUG_NAMES) + learned
+        if name.lower() in lowered and _name_pattern(name).search(lowered)
+    ]
+    if matches:
+        with _names_lock:
+            for name in matches:
+                if name in _learned_names:
+                    _learned_names.move_to_end(name)
+    # "타이레놀"과 "어린이타이레놀"이 동시에 매칭되면 긴 이름만 유지
+    return [
+        name for name in matches
+        if not any(name != other and name.lower() in other.lower() for other in matches)
+    ]
+
+
+def route_query(query: str) -> Optional[Route]:
+    """
+    의도가 명확하면 바로 실행할 Tool을 반환 (약물 이름만 - 처방전은 prescription_route 참고)
+
+    Args:
+        query: 사용자 질문
+
+    Returns:
+        Route 또는 None (LLM Agent가 판단해야 하는 경우)
+    """
+    if not query:
+        return None
+
+    # 알려진 약물 이름이 정확히 하나일 때만
+    drug_names = find_drug_names(query)
+    if len(drug_names) == 1:
+        return Route("Public_Data_API_Searcher", drug_names[0])
+
+    return None
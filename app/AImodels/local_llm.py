@@ -0,0 +1,268 @@
+# app/AImodels/local_llm.py
+"""
+로컬 Seq2Seq 모델(flan-t5)을 LangChain LLM으로 감싼 클래스
+HuggingFacePipeline 대신 model.generate를 직접 호출해서
+콜백 핸들러가 있으면 생성되는 토큰을 실시간으로 전달(스트리밍)
+"""
+from typing import Any, Callable, List, Optional, Tuple
+from langchain_core.language_models.llms import LLM
+from langchain_core.callbacks import BaseCallbackHandler, CallbackManagerForLLMRun
+from langchain_core.outputs import Generation, LLMResult
+from langchain_community.llms.utils import enforce_stop_tokens
+from transformers import AutoModelForSeq2SeqLM, AutoTokenizer, LogitsProcessorList, StoppingCriteriaList, TextStreamer
+from app.core.metrics import metrics
+from app.core.cancellation import current_token
+from app.AImodels.stopping import CancellationStoppingCriteria, RowCancel
+import torch
+import logging
+
+logger = logging.getLogger(__name__)
+
+QUANTIZATION_MODES = ("none", "int8")
+
+
+def load_seq2seq_model(repo_id: str, quantization: str = "none") -> Tuple[Any, Any]:
+    """
+    토크나이저와 Seq2Seq 모델 로드
+
+    Args:
+        repo_id: HuggingFace 모델 ID
+        quantization: "none" 또는 "int8" (CPU에서만 적용, nn.Linear 동적 int8 양자화)
+
+    Returns:
+        (tokenizer, model)
+    """
+    if quantization not in QUANTIZATION_MODES:
+        raise ValueError(f"지원하지 않는 양자화 모드: {quantization} (허용: {QUANTIZATION_MODES})")
+
+    use_gpu = torch.cuda.is_available()
+    logger.info(f"🖥️ Using device: {'GPU' if use_gpu else 'CPU'}")
+
+    tokenizer = AutoTokenizer.from_pretrained(repo_id)
+    model = AutoModelForSeq2SeqLM.from_pretrained(
+        repo_id,
+        torch_dtype=torch.float16 if use_gpu else torch.float32,
+        device_map="auto" if use_gpu else None
+    )
+    model.eval()
+
+    if quantization == "int8":
+        if use_gpu:
+            logger.warning("⚠️ int8 동적 양자화는 CPU 전용이라 GPU에서는 건너뜁니다.")
+        else:
+            # 가중치는 int8로 저장, 활성값은 실행 시점에 양자화
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+            logger.info("🗜️ int8 dynamic quantization applied (nn.Linear)")
+
+    return tokenizer, model
+
+
+class CallbackTextStreamer(TextStreamer):
+    """generate 도중 디코딩된 텍스트 조각을 콜백으로 넘겨주는 토큰 스트리머"""
+
+    def __init__(self, tokenizer, on_text: Callable[[str], None]):
+        # seq2seq는 첫 토큰이 decoder_start_token이므로 skip_prompt로 건너뜀
+        super().__init__(tokenizer, skip_prompt=True, skip_special_tokens=True)
+        self._on_text = on_text
+
+    def on_finalized_text(self, text: str, stream_end: bool = False):
+        if text:
+            self._on_text(text)
+
+
+def wants_tokens(run_manager: Optional[CallbackManagerForLLMRun]) -> bool:
+    """on_llm_new_token을 구현한 콜백 핸들러가 있는지 (토큰 집계용 핸들러 등은 제외)"""
+    if run_manager is None:
+        return False
+    return any(
+        type(handler).on_llm_new_token is not BaseCallbackHandler.on_llm_new_token
+        for handler in run_manager.handlers
+    )
+
+
+class LocalSeq2SeqLLM(LLM):
+    """flan-t5 등 로컬 Seq2Seq 모델용 LangChain LLM"""
+
+    model: Any
+    tokenizer: Any
+    max_new_tokens: int = 512
+    max_input_tokens: int = 512
+    # 설정되면 스트리밍이 아닌 호출은 MicroBatcher를 거쳐 다른 요청과 함께 배치 실행
+    batcher: Optional[Any] = None
+    # 설정되면 ReAct 단계 호출(stop 시퀀스가 있는 호출)에 형식 강제 디코딩 적용
+    grammar_processor: Optional[Any] = None
+    # 설정되면 (tokenizer, model) 레플리카를 대여해서 생성 (같은 모델에서 동시에 generate하지 않음)
+    replicas: Optional[Any] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "local_seq2seq"
+
+    @staticmethod
+    def normalize_stop(stop: Optional[List[str]]) -> tuple:
+        """
+        stop 시퀀스 정리
+        T5 토크나이저는 줄바꿈을 만들지 못하므로 "\\nObservation" → "Observation"
+        """
+        if not stop:
+            return ()
+        return tuple(sorted({s.strip() for s in stop if s.strip()}))
+
+    def generate_batch(
+        self,
+        prompts: List[str],
+        max_new_tokens: Optional[int] = None,
+        stop: tuple = (),
+        constrained: bool = False,
+        streamer=None,
+        cancels: Optional[List[RowCancel]] = None
+    ) -> List[Tuple[str, int]]:
+        """
+        여러 프롬프트를 패딩해서 한 번의 generate 호출로 생성
+
+        Args:
+            prompts: 입력 프롬프트 리스트
+            max_new_tokens: 최대 생성 토큰 수 (None이면 기본값)
+            stop: 이 문자열이 생성되면 해당 행의 생성을 멈춤
+            constrained: ReAct 형식 강제 디코딩 적용 여부
+            streamer: 토큰 스트리머 (프롬프트가 1개일 때만 사용)
+            cancels: 프롬프트별 (취소 토큰, 단계 마감 시각) - 디코딩 스텝마다 확인해서 해당 행만 중단
+
+        Returns:
+            프롬프트 순서대로 (생성된 텍스트, 생성 토큰 수) 리스트
+        """
+        if self.replicas is None:
+            return self._generate_with(
+                self.tokenizer, self.model, prompts, max_new_tokens, stop, constrained, streamer, cancels
+            )
+        with self.replicas.checkout() as (tokenizer, model):
+            return self._generate_with(
+                tokenizer, model, prompts, max_new_tokens, stop, constrained, streamer, cancels
+            )
+
+    def _generate_with(
+        self,
+        tokenizer,
+        model,
+        prompts: List[str],
+        max_new_tokens: Optional[int],
+        stop: tuple,
+        constrained: bool,
+        streamer,
+        cancels: Optional[List[RowCancel]] = None
+    ) -> List[Tuple[str, int]]:
+        inputs = tokenizer(
+            prompts,
+            return_tensors="pt",
+            padding=True,
+            truncation=True,
+            max_length=self.max_input_tokens
+        ).to(model.device)
+
+        generate_kwargs = {}
+        if stop:
+            # ReAct stop 문자열에서 바로 멈춤 (max_new_tokens까지 낭비하지 않음)
+            generate_kwargs["stop_strings"] = list(stop)
+            generate_kwargs["tokenizer"] = tokenizer
+        if constrained and self.grammar_processor is not None:
+            generate_kwargs["logits_processor"] = LogitsProcessorList([self.grammar_processor])
+        if cancels and CancellationStoppingCriteria.any_active(cancels):
+            generate_kwargs["stopping_criteria"] = StoppingCriteriaList([
+                CancellationStoppingCriteria(cancels, done_token_ids=(tokenizer.pad_token_id, tokenizer.eos_token_id))
+            ])
+
+        with torch.no_grad():
+            output_ids = model.generate(
+                **inputs,
+                max_new_tokens=max_new_tokens or self.max_new_tokens,
+                do_sample=False,
+                streamer=streamer,
+                **generate_kwargs
+            )
+
+        texts = tokenizer.batch_decode(output_ids, skip_special_tokens=True)
+        # decoder_start/패딩 토큰(pad_token_id)은 생성 토큰 수에서 제외
+        token_counts = (output_ids != tokenizer.pad_token_id).sum(dim=1).tolist()
+        return list(zip(texts, token_counts))
+
+    def _run_batch(self, payloads: List[tuple]) -> List[Tuple[str, int]]:
+        """MicroBatcher용: (prompt, max_new_tokens, stop, constrained, cancel) 리스트를 한 배치로 실행"""
+        prompts = [payload[0] for payload in payloads]
+        _, max_new_tokens, stop, constrained, _ = payloads[0]
+        return self.generate_batch(
+            prompts,
+            max_new_tokens=max_new_tokens,
+            stop=stop,
+            constrained=constrained,
+            cancels=[payload[4] for payload in payloads]
+        )
+
+    def _generate_one(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Tuple[str, int]:
+        max_new_tokens = kwargs.get("max_new_tokens", self.max_new_tokens)
+        stop = self.normalize_stop(stop)
+        constrained = bool(stop) and self.grammar_processor is not None
+
+        # 요청 취소 토큰: 이미 취소됐으면 생성하지 않고, 이번 단계는 남은 시간 예산의 몫만 사용
+        token = current_token()
+        cancel = None
+        if token is not None:
+            token.raise_if_cancelled()
+            cancel = (token, token.next_step_deadline())
+
+        # 토큰을 받는 콜백 핸들러가 있을 때만 스트리밍 (스트리머는 토큰마다 디코딩 비용이 있음)
+        streamer = None
+        if wants_tokens(run_manager):
+            streamer = CallbackTextStreamer(
+                self.tokenizer,
+                lambda text: run_manager.on_llm_new_token(text)
+            )
+
+        if streamer is None and self.batcher is not None:
+            # 생성 설정이 같은 요청끼리만 한 배치로 묶음
+            group_key = (max_new_tokens, stop, constrained)
+            text, num_tokens = self.batcher.run(
+                (prompt, max_new_tokens, stop, constrained, cancel), group_key=group_key
+            )
+        else:
+            text, num_tokens = self.generate_batch(
+                [prompt], max_new_tokens=max_new_tokens, stop=stop, constrained=constrained,
+                streamer=streamer, cancels=[cancel]
+            )[0]
+
+        metrics.observe("llm.generated_tokens", num_tokens)
+        # 생성 도중 취소됐거나 이번 단계 마감으로 잘렸으면 (CancellationStoppingCriteria가 토큰 취소) 잘린 출력은 버림
+        if token is not None:
+            token.raise_if_cancelled()
+
+        if stop:
+            text = enforce_stop_tokens(text, list(stop))
+        return text, num_tokens
+
+    def _call(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> str:
+        return self._generate_one(prompt, stop, run_manager, **kwargs)[0]
+
+    def _generate(
+        self,
+        prompts: List[str],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> LLMResult:
+        # 생성 토큰 수를 generation_info로 넘겨서 콜백(on_llm_end)에서 집계할 수 있게 함
+        generations = []
+        for prompt in prompts:
+            text, num_tokens = self._generate_one(prompt, stop, run_manager, **kwargs)
+            generations.append([Generation(text=text, generation_info={"generated_tokens": num_tokens})])
+        return LLMResult(generations=generations)
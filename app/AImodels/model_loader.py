@@ -0,0 +1,319 @@
+# app/AImodels/model_loader.py
+"""
+지연 로딩 모델 래퍼 + 메모리 예산 기반 모델 레지스트리
+import 시점에는 가중치를 로드하지 않고, 처음 사용할 때 또는 서버 시작 후 백그라운드에서 로드
+MODEL_MEMORY_BUDGET_MB를 넘게 되면 사용 중이 아닌 모델 중 가장 오래 안 쓴 모델부터 내림
+로드에 실패한 모델은 요청 안에서 다시 로드하지 않고 바로 ModelUnavailable을 던지고, 백그라운드에서 간격을 늘려가며 재시도
+모델별 로드 상태/메모리/로드 횟수는 /health 에서 조회
+"""
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+import gc
+import os
+import threading
+import time
+import logging
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# 로드된 모델 가중치의 최대 합계 (0이면 제한 없음 = 한 번 로드하면 계속 유지)
+MODEL_MEMORY_BUDGET_MB = int(os.getenv("MODEL_MEMORY_BUDGET_MB", "0"))
+# 로드 실패 후 백그라운드 재시도 간격(초) - 실패할 때마다 두 배, 최대 MODEL_RELOAD_MAX_SECONDS
+MODEL_RELOAD_MIN_SECONDS = float(os.getenv("MODEL_RELOAD_MIN_SECONDS", "5"))
+MODEL_RELOAD_MAX_SECONDS = float(os.getenv("MODEL_RELOAD_MAX_SECONDS", "300"))
+
+# 등록된 모델 (이름 → LazyModel)
+MODEL_REGISTRY: Dict[str, "LazyModel"] = {}
+# 메모리 예산 확인 + 언로드를 한 번에 한 모델만 하도록
+_registry_lock = threading.Lock()
+
+
+class ModelUnavailable(Exception):
+    """로드에 실패해서 백그라운드 재시도를 기다리는 모델 (요청은 503으로 바로 거절)"""
+    def __init__(self, name: str, retry_after: float, error: Optional[str] = None):
+        self.name = name
+        self.retry_after = retry_after
+        self.error = error
+        super().__init__(f"[{name}] 모델을 사용할 수 없습니다 ({retry_after:.0f}초 후 재시도): {error}")
+
+
+def estimate_footprint(value: Any) -> int:
+    """
+    로드된 값에 포함된 torch 모듈의 파라미터/버퍼 바이트 합
+    (ReplicaPool, (tokenizer, model) 튜플, .model 속성을 가진 래퍼까지 따라감)
+    """
+    try:
+        import torch
+    except ImportError:
+        return 0
+
+    if isinstance(value, torch.nn.Module):
+        tensors = list(value.parameters()) + list(value.buffers())
+        return sum(tensor.numel() * tensor.element_size() for tensor in tensors)
+    if isinstance(value, (list, tuple)):
+        return sum(estimate_footprint(item) for item in value)
+    if getattr(value, "replicas", None) is not None:
+        return estimate_footprint(value.replicas)
+    if getattr(value, "model", None) is not None:
+        return estimate_footprint(value.model)
+    return 0
+
+
+def _release_memory() -> None:
+    """언로드한 모델 메모리 반환 (레지스트리에서만 호출)"""
+    gc.collect()
+    try:
+        import torch
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+    except ImportError:
+        pass
+
+
+def resident_bytes() -> int:
+    return sum(model.footprint_bytes for model in MODEL_REGISTRY.values() if model.is_ready)
+
+
+def _make_room(loading: "LazyModel") -> None:
+    """loading 모델을 올릴 자리가 생길 때까지 사용 중이 아닌 모델을 오래 안 쓴 순서로 언로드"""
+    if MODEL_MEMORY_BUDGET_MB <= 0:
+        return
+    budget = MODEL_MEMORY_BUDGET_MB * 1024 * 1024
+
+    candidates = sorted(
+        (model for model in MODEL_REGISTRY.values() if model is not loading and model.is_ready),
+        key=lambda model: model.last_used
+    )
+    for model in candidates:
+        if resident_bytes() + loading.footprint_bytes <= budget:
+            return
+        model.unload()
+
+    if resident_bytes() + loading.footprint_bytes > budget:
+        logger.warning(
+            f"⚠️ [{loading.name}] 메모리 예산 초과 상태로 로드 "
+            f"(사용 중인 모델은 내릴 수 없음, budget={MODEL_MEMORY_BUDGET_MB}MB)"
+        )
+
+
+class LazyModel:
+    NOT_LOADED = "not_loaded"
+    LOADING = "loading"
+    READY = "ready"
+    FAILED = "failed"
+
+    def __init__(
+        self,
+        name: str,
+        load_fn: Callable[[], Any],
+        unload_fn: Optional[Callable[[], None]] = None,
+        footprint_mb: int = 0
+    ):
+        """
+        Args:
+            name: 모델 이름 (상태 조회용)
+            load_fn: 모델을 로드해서 반환하는 함수
+            unload_fn: 언로드 시 모델을 참조하는 전역 상태를 정리하는 함수 (옵션)
+            footprint_mb: 로드 전 예상 메모리 (첫 로드 후에는 실제 측정값 사용)
+        """
+        self.name = name
+        self._load_fn = load_fn
+        self._unload_fn = unload_fn
+        self._lock = threading.Lock()
+        self._value: Any = None
+        self._active = 0
+        self.state = self.NOT_LOADED
+        self.error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self.load_count = 0
+        self.unload_count = 0
+        self.footprint_bytes = footprint_mb * 1024 * 1024
+        self.last_used = 0.0
+        # 연속 로드 실패 횟수 / 다음 백그라운드 재시도 시각 (time.monotonic 기준)
+        self.failures = 0
+        self.next_retry_at: Optional[float] = None
+        MODEL_REGISTRY[name] = self
+
+    @property
+    def is_ready(self) -> bool:
+        return self.state == self.READY
+
+    @property
+    def is_available(self) -> bool:
+        """
+        요청을 처리할 수 있는지 (로딩 중이거나 로드에 실패했으면 False)
+        NOT_LOADED는 다음 사용 시 로드되므로 처리 가능으로 봄:
+            - 미리 로드하지 않는 설정(MODEL_PRELOAD=False)에서 첫 요청 전
+            - 메모리 예산 때문에 내려간 뒤
+        (미리 로드하는 경우 load_in_background가 바로 LOADING으로 바꿈)
+        """
+        return self.state in (self.READY, self.NOT_LOADED)
+
+    @property
+    def retry_after(self) -> float:
+        """다음 백그라운드 재시도까지 남은 시간(초, Retry-After 헤더용)"""
+        if self.next_retry_at is None:
+            return MODEL_RELOAD_MIN_SECONDS
+        return max(1.0, self.next_retry_at - time.monotonic())
+
+    def _raise_unavailable(self) -> None:
+        raise ModelUnavailable(self.name, self.retry_after, self.error)
+
+    def get(self) -> Any:
+        """
+        모델 반환 (아직 로드되지 않았으면 지금 로드, 다른 스레드가 로드 중이면 대기)
+
+        Raises:
+            ModelUnavailable: 로드에 실패해서 백그라운드 재시도를 기다리는 중 (요청 안에서 다시 로드하지 않음)
+        """
+        self.last_used = time.monotonic()
+        if self.state == self.READY:
+            return self._value
+        if self.state == self.FAILED:
+            self._raise_unavailable()
+        with self._lock:
+            if self.state == self.FAILED:
+                # 기다리는 동안 다른 스레드의 로드가 실패함
+                self._raise_unavailable()
+            if self.state != self.READY:
+                self._load()
+            return self._value
+
+    @contextmanager
+    def use(self) -> Iterator[Any]:
+        """
+        사용하는 동안 메모리 예산 때문에 언로드되지 않도록 표시하고 모델 반환
+
+        Example:
+            with llm_model.use() as value:
+                ...
+        """
+        with self._lock:
+            self._active += 1
+        try:
+            yield self.get()
+        finally:
+            with self._lock:
+                self._active -= 1
+            self.last_used = time.monotonic()
+
+    def _load(self) -> None:
+        self.state = self.LOADING
+        self.error = None
+        with _registry_lock:
+            _make_room(self)
+        logger.info(f"📦 [{self.name}] 모델 로드 시작")
+        started_at = time.perf_counter()
+        try:
+            self._value = self._load_fn()
+        except Exception as e:
+            self.state = self.FAILED
+            self.error = str(e)
+            self.failures += 1
+            metrics.inc(f"models.{self.name}.load_failures")
+            logger.error(f"❌ [{self.name}] 모델 로드 실패: {e}")
+            self._schedule_reload()
+            raise
+        self.failures = 0
+        self.next_retry_at = None
+        self.load_seconds = time.perf_counter() - started_at
+        self.load_count += 1
+        self.footprint_bytes = estimate_footprint(self._value) or self.footprint_bytes
+        self.last_used = time.monotonic()
+        self.state = self.READY
+        metrics.inc(f"models.{self.name}.loads")
+        metrics.observe(f"models.{self.name}.load_ms", self.load_seconds * 1000)
+        metrics.set_gauge("models.resident_bytes", resident_bytes())
+        logger.info(
+            f"✅ [{self.name}] 모델 로드 완료 ({self.load_seconds:.1f}s, "
+            f"{self.footprint_bytes / 1024 / 1024:.0f}MB)"
+        )
+
+    def _schedule_reload(self) -> None:
+        """로드 실패 후 백그라운드 재시도 예약 (실패할 때마다 간격 두 배)"""
+        delay = min(MODEL_RELOAD_MAX_SECONDS, MODEL_RELOAD_MIN_SECONDS * 2 ** (self.failures - 1))
+        self.next_retry_at = time.monotonic() + delay
+        logger.info(f"🔁 [{self.name}] {delay:.0f}초 후 백그라운드에서 다시 로드")
+        timer = threading.Timer(delay, self._reload)
+        timer.name = f"reload-{self.name}"
+        timer.daemon = True
+        timer.start()
+
+    def _reload(self) -> None:
+        with self._lock:
+            if self.state != self.FAILED:
+                return
+            try:
+                self._load()
+            except Exception:
+                pass  # 상태/에러는 self.state, self.error에 기록되고 다음 재시도가 예약됨
+
+    def unload(self) -> bool:
+        """
+        모델 언로드 (사용 중이거나 로드 중이면 건너뜀)
+
+        Returns:
+            언로드 여부
+        """
+        if not self._lock.acquire(blocking=False):
+            return False
+        try:
+            if self.state != self.READY or self._active > 0:
+                return False
+            self._value = None
+            if self._unload_fn is not None:
+                self._unload_fn()
+            self.state = self.NOT_LOADED
+            self.unload_count += 1
+        finally:
+            self._lock.release()
+
+        _release_memory()
+        metrics.inc(f"models.{self.name}.unloads")
+        metrics.set_gauge("models.resident_bytes", resident_bytes())
+        logger.info(f"🧹 [{self.name}] 모델 언로드 (메모리 예산)")
+        return True
+
+    def load_in_background(self) -> threading.Thread:
+        """서버 요청 처리를 막지 않도록 별도 스레드에서 로드"""
+        if self.state == self.NOT_LOADED:
+            # 스레드가 시작되기 전에 들어온 요청도 로딩 중임을 알 수 있도록 먼저 표시
+            self.state = self.LOADING
+
+        def target():
+            try:
+                self.get()
+            except Exception:
+                pass  # 상태/에러는 self.state, self.error에 기록됨
+
+        thread = threading.Thread(target=target, name=f"load-{self.name}", daemon=True)
+        thread.start()
+        return thread
+
+    def status(self) -> dict:
+        return {
+            "state": self.state,
+            "load_seconds": round(self.load_seconds, 2) if self.load_seconds is not None else None,
+            "error": self.error,
+            "failures": self.failures,
+            "retry_in_seconds": round(self.retry_after, 1) if self.state == self.FAILED else None,
+            "footprint_mb": round(self.footprint_bytes / 1024 / 1024, 1),
+            "load_count": self.load_count,
+            "unload_count": self.unload_count,
+            "in_use": self._active,
+        }
+
+
+def model_statuses() -> dict:
+    """등록된 모든 모델의 로드 상태"""
+    return {name: model.status() for name, model in MODEL_REGISTRY.items()}
+
+
+def memory_report() -> dict:
+    """메모리 예산과 현재 올라와 있는 모델"""
+    return {
+        "budget_mb": MODEL_MEMORY_BUDGET_MB or None,
+        "resident_mb": round(resident_bytes() / 1024 / 1024, 1),
+        "resident_models": [name for name, model in MODEL_REGISTRY.items() if model.is_ready],
+    }
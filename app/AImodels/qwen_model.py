@@ -5,17 +5,41 @@ os.environ['TRANSFORMERS_CACHE'] = '/home/ubuntu/BackEnd/hf_cache'
 os.environ['HF_HUB_CACHE'] = 'home/ubuntu/Backend/hf_cache'
 
 import torch
+import threading
 import requests
 from PIL import Image
 from io import BytesIO
-from transformers import AutoTokenizer, AutoProcessor
+from typing import List, Union
+from transformers import AutoTokenizer, AutoProcessor, StoppingCriteria, StoppingCriteriaList
 from transformers import Qwen2VLForConditionalGeneration  # 모델 클래스
 from qwen_vl_utils import process_vision_info
+from app.AImodels.vision_cache import VisionFeatureCache
+from app.AImodels.stopping import CancellationStoppingCriteria
+
+
+class PerRowMaxNewTokens(StoppingCriteria):
+    """배치 안에서 행마다 다른 max_new_tokens 적용 (도달한 행만 먼저 종료)"""
+
+    def __init__(self, prompt_length: int, max_new_tokens: List[int]):
+        self.prompt_length = prompt_length
+        self.max_new_tokens = torch.tensor(max_new_tokens)
+
+    def __call__(self, input_ids, scores, **kwargs):
+        generated = input_ids.shape[1] - self.prompt_length
+        return (generated >= self.max_new_tokens).to(input_ids.device)
+
 
 class QwenModel:
     
     
-    def __init__(self, model_name="Rfy23/qwen2vl-ko-zh", device=None): 
+    def __init__(
+        self,
+        model_name="Rfy23/qwen2vl-ko-zh",
+        device=None,
+        vision_cache: VisionFeatureCache = None,
+        min_pixels: int = None,
+        max_pixels: int = None
+    ): 
         
         # 환경에 따라 device 자동 선택
         if device is None:
@@ -36,8 +60,25 @@ class QwenModel:
         
         
         # 2️⃣ 프로세서 로드
-        self.processor = AutoProcessor.from_pretrained(model_name)
+        # min_pixels/max_pixels: 이미지 해상도(= visual token 수) 범위
+        processor_kwargs = {}
+        if min_pixels is not None:
+            processor_kwargs["min_pixels"] = min_pixels
+        if max_pixels is not None:
+            processor_kwargs["max_pixels"] = max_pixels
+        self.processor = AutoProcessor.from_pretrained(model_name, **processor_kwargs)
+        self.min_pixels = min_pixels
+        self.max_pixels = max_pixels
+        # 배치 생성 시 프롬프트 끝이 맞도록 왼쪽 패딩
+        self.processor.tokenizer.padding_side = "left"
         print("프로세서 로드 완료!")
+
+        # 3️⃣ 비전 인코더 캐시: 같은 이미지는 vision tower를 다시 돌리지 않음
+        self.vision_cache = vision_cache
+        self._batch_state = threading.local()
+        self._vision_model = getattr(self.model, "model", self.model)
+        self._get_image_features = self._vision_model.get_image_features
+        self._vision_model.get_image_features = self._cached_image_features
         
     # 삭제    
     # def _load_image_from_url(self, url): 
@@ -47,61 +88,186 @@ class QwenModel:
     #     img = Image.open(BytesIO(response.content)).convert("RGB")
     #     return img
 
-    def _prepare_inputs_from_messages(self, messages):
+    def _with_pixel_bounds(self, messages):
+        """이미지 항목에 min_pixels/max_pixels가 없으면 모델 설정값 적용 (process_vision_info 기본값은 16384*28*28)"""
+        bounds = {
+            name: value for name, value in (("min_pixels", self.min_pixels), ("max_pixels", self.max_pixels))
+            if value is not None
+        }
+        if not bounds:
+            return messages
+        return [
+            {
+                **message,
+                "content": [
+                    {**bounds, **item} if isinstance(item, dict) and item.get("type") == "image" else item
+                    for item in message["content"]
+                ] if isinstance(message.get("content"), list) else message.get("content")
+            }
+            for message in messages
+        ]
+
+    def _process_images(self, messages, key=None, entry=None):
         """
-            messages 리스트를 모델 입력 텐서로 변환.
+            messages 안의 이미지 전처리 (캐시에 있으면 재사용).
 
             Args:
-                messages (list): 이미지(PIL.Image)와 텍스트를 포함한 메시지 리스트.
-                                [
-                                    {
-                                        "role": "user",
-                                        "content": [
-                                            {"type": "image", "image": PIL.Image 객체},
-                                            {"type": "text", "text": "질문 텍스트"}
-                                        ]
-                                    }
-                                ]
+                entry: 호출한 쪽이 미리 꺼낸 캐시 항목 (있으면 messages의 이미지 대신 사용)
 
             Returns:
-                torch.Tensor: 모델에 입력 가능한 텐서, device(self.device)에 맞게 이동됨.
+                dict: {"image_grid_thw", "pixel_values" 또는 "image_embeds"} (이미지가 없으면 None)
         """
-        
-        print("입력 텐서 준비 중...")
-        text_input = self.processor.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
-        image_inputs, _ = process_vision_info(messages)
-
-        inputs = self.processor(
-            text=[text_input],
-            images=image_inputs,
-            padding=True,
-            return_tensors="pt"
-        ).to(self.device)
-        return inputs
-    
+        if entry is not None:
+            return entry
+        if key and self.vision_cache is not None:
+            entry = self.vision_cache.get(key)
+            if entry is not None:
+                return entry
 
-    def predict(self, messages, max_new_tokens=128):
-        """인자로 넘어온 messages의 image는 url이면 안됨."""
-        try:
-            inputs = self._prepare_inputs_from_messages(messages)
-            print("입력 텐서 준비 완료!")
-            
-            print("모델 추론 시작...")
-            with torch.no_grad():
-                generated_ids = self.model.generate(**inputs, max_new_tokens=128)
+        image_inputs, _ = process_vision_info(self._with_pixel_bounds(messages))
+        if not image_inputs:
+            return None
+        processed = self.processor.image_processor(images=image_inputs, return_tensors="pt")
+        entry = {"pixel_values": processed["pixel_values"], "image_grid_thw": processed["image_grid_thw"]}
+        if key and self.vision_cache is not None:
+            self.vision_cache.put(key, entry)
+        return entry
+
+    def _prepare_batch_inputs(self, messages_list, image_keys=None, image_entries=None):
+        """
+            여러 messages를 패딩해서 한 번에 모델 입력 텐서로 변환.
+            image_keys가 있으면 이미지 전처리/vision embedding을 캐시에서 재사용.
+
+            Args:
+                messages_list (list): messages 리스트들
+                                      ([{"role": "user", "content": [{"type": "image", "image": PIL.Image}, {"type": "text", "text": 질문}]}])
+                image_keys (list): messages별 이미지 캐시 키 (예: content hash, None이면 캐시 안 함)
+                image_entries (list): messages별로 미리 꺼낸 캐시 항목 (이미지 없이 요청한 후속 질문, 없으면 None)
+
+            Returns:
+                (inputs, plan): 왼쪽 패딩된 배치 입력 텐서 (device(self.device)로 이동됨),
+                                _cached_image_features에서 사용할 messages별 (key, entry)
+        """
+        image_keys = image_keys or [None] * len(messages_list)
+        image_entries = image_entries or [None] * len(messages_list)
+        image_token = self.processor.image_token
+        merge_length = self.processor.image_processor.merge_size ** 2
+
+        text_inputs, plan = [], []
+        for messages, key, cached in zip(messages_list, image_keys, image_entries):
+            text = self.processor.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
+            entry = self._process_images(messages, key, cached)
+            if entry is not None:
+                # processor와 같은 방식으로 이미지 토큰을 visual token 수만큼 확장
+                for num_tokens in (entry["image_grid_thw"].prod(-1) // merge_length).tolist():
+                    text = text.replace(image_token, "<|placeholder|>" * num_tokens, 1)
+                text = text.replace("<|placeholder|>", image_token)
+                plan.append((key, entry))
+            text_inputs.append(text)
 
-                generated_ids_trimmed = [
-                    out_ids[len(in_ids):] for in_ids, out_ids in zip(inputs.input_ids, generated_ids)
-                ]
+        inputs = self.processor.tokenizer(text_inputs, padding=True, return_tensors="pt")
+        if plan:
+            image_processor = self.processor.image_processor
+            pixel_dim = 3 * image_processor.temporal_patch_size * image_processor.patch_size ** 2
+            # embedding이 캐시된 이미지는 pixel_values 없이 grid 정보만 전달
+            pixel_values = [entry["pixel_values"] for _, entry in plan if "image_embeds" not in entry]
+            inputs["pixel_values"] = torch.cat(pixel_values) if pixel_values else torch.empty((0, pixel_dim))
+            inputs["image_grid_thw"] = torch.cat([entry["image_grid_thw"] for _, entry in plan])
+        return inputs.to(self.device), plan
 
-                print("디코딩 중...")
+    def _cached_image_features(self, pixel_values, image_grid_thw=None):
+        """
+            get_image_features 대체: 캐시된 image embedding은 재사용하고
+            나머지 이미지만 vision tower 실행 후 캐시에 저장.
+        """
+        plan = getattr(self._batch_state, "plan", None)
+        if not plan:
+            return self._get_image_features(pixel_values, image_grid_thw)
+        self._batch_state.plan = None  # prefill에서 한 번만 사용
+
+        merge_length = self._vision_model.visual.spatial_merge_size ** 2
+        fresh = [entry for _, entry in plan if "image_embeds" not in entry]
+        fresh_embeds = []
+        if fresh:
+            fresh_grid = torch.cat([entry["image_grid_thw"] for entry in fresh]).to(pixel_values.device)
+            fresh_embeds = self._get_image_features(pixel_values, fresh_grid)
+            if isinstance(fresh_embeds, torch.Tensor):
+                split_sizes = (fresh_grid.prod(-1) // merge_length).tolist()
+                fresh_embeds = torch.split(fresh_embeds, split_sizes)
+            fresh_embeds = list(fresh_embeds)
+
+        # 요청 순서대로 이미지별 embedding 조립
+        image_embeds = []
+        for key, entry in plan:
+            split_sizes = (entry["image_grid_thw"].prod(-1) // merge_length).tolist()
+            if "image_embeds" in entry:
+                image_embeds.extend(torch.split(entry["image_embeds"], split_sizes))
+                continue
+            embeds = [fresh_embeds.pop(0) for _ in split_sizes]
+            image_embeds.extend(embeds)
+            if key and self.vision_cache is not None:
+                self.vision_cache.put_embeds(key, entry["image_grid_thw"], torch.cat(embeds))
+        return tuple(image_embeds)
+
+    def predict_batch(
+        self,
+        messages_list,
+        max_new_tokens: Union[int, List[int]] = 128,
+        image_keys: List[str] = None,
+        cancels: list = None,
+        image_entries: list = None
+    ) -> List[str]:
+        """
+            여러 (이미지, 질문) 요청을 한 번의 generate 호출로 처리.
+
+            Args:
+                messages_list (list): 요청별 messages 리스트 (이미지는 PIL.Image)
+                max_new_tokens (int | list): 전체 또는 요청별 최대 생성 토큰 수
+                image_keys (list): 요청별 이미지 캐시 키 (같은 이미지의 후속 질문은 vision 인코더 생략)
+                cancels (list): 요청별 (취소 토큰, 마감 시각) - 취소된 요청은 디코딩 도중 중단
+                image_entries (list): 요청별로 미리 꺼낸 비전 인코더 캐시 항목 (있으면 messages의 이미지 대신 사용)
+
+            Returns:
+                list: 요청 순서대로 생성된 텍스트
+
+            Raises:
+                Exception: 전처리/추론 실패 (배치 전체 실패)
+        """
+        if isinstance(max_new_tokens, int):
+            max_new_tokens = [max_new_tokens] * len(messages_list)
+
+        inputs, plan = self._prepare_batch_inputs(messages_list, image_keys, image_entries)
+        prompt_length = inputs.input_ids.shape[1]
+
+        stopping_criteria = StoppingCriteriaList([PerRowMaxNewTokens(prompt_length, max_new_tokens)])
+        if cancels and CancellationStoppingCriteria.any_active(cancels):
+            stopping_criteria.append(CancellationStoppingCriteria(cancels))
 
-                # 디코딩
-                output_text = self.processor.batch_decode(
-                    generated_ids_trimmed, skip_special_tokens=True, clean_up_tokenization_spaces=False
+        self._batch_state.plan = plan
+        try:
+            with torch.no_grad():
+                generated_ids = self.model.generate(
+                    **inputs,
+                    max_new_tokens=max(max_new_tokens),
+                    stopping_criteria=stopping_criteria
                 )
+        finally:
+            self._batch_state.plan = None
 
-            return output_text
+        # 왼쪽 패딩이라 모든 행의 프롬프트 길이가 같음
+        generated_ids_trimmed = [
+            out_ids[prompt_length:prompt_length + limit]
+            for out_ids, limit in zip(generated_ids, max_new_tokens)
+        ]
+        return self.processor.batch_decode(
+            generated_ids_trimmed, skip_special_tokens=True, clean_up_tokenization_spaces=False
+        )
+
+    def predict(self, messages, max_new_tokens=128):
+        """인자로 넘어온 messages의 image는 url이면 안됨."""
+        try:
+            print("모델 추론 시작...")
+            return self.predict_batch([messages], max_new_tokens=max_new_tokens)
 
         except Exception as e:
             print(f"Prediction error: {e}")
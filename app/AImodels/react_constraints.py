@@ -0,0 +1,117 @@
+# app/AImodels/react_constraints.py
+"""
+ReAct 출력 형식 강제용 LogitsProcessor (제한 디코딩)
+
+flan-t5가 형식이 깨진 ReAct 출력을 만들면 handle_parsing_errors 때문에 Agent 반복이 한 번 더 낭비됨.
+아래 구간에서만 다음 토큰을 제한하고 나머지(생각/답변 본문)는 자유롭게 생성:
+    - 출력 시작: "Thought:" / "Action:" / "Final Answer:" 중 하나로 시작
+    - "Action:" 직후: 등록된 Tool 이름 + " Action Input:" 또는 "No tool needed" (프롬프트에 안내된 경로)
+
+구간별 허용 토큰은 (구간 텍스트, 후보 목록)마다 처음 한 번만 전체 어휘를 훑어서 계산하고 재사용
+(구간 텍스트는 후보의 앞부분이므로 경우의 수가 유한함)
+
+참고: T5 토크나이저에는 줄바꿈 토큰이 없어서 ReAct 출력이 한 줄로 생성됨 → 공백 기준으로 비교
+"""
+from typing import List, Optional
+from transformers import LogitsProcessor
+import re
+import torch
+
+REACT_OPENERS = ("Thought:", "Action:", "Final Answer:")
+ACTION_MARKER = "Action:"
+ACTION_INPUT_MARKER = "Action Input:"
+NO_TOOL = "No tool needed"
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _normalize(text: str) -> str:
+    return _WHITESPACE.sub(" ", text)
+
+
+class ReActGrammarLogitsProcessor(LogitsProcessor):
+    def __init__(self, tokenizer, tool_names: List[str]):
+        """
+        Args:
+            tokenizer: LLM 토크나이저 (SentencePiece 기반)
+            tool_names: Action에 허용할 Tool 이름 목록
+        """
+        special_ids = set(tokenizer.all_special_ids)
+        # 토큰 id → 텍스트 조각 (특수 토큰은 None: 제한 구간에서는 허용하지 않음)
+        self._pieces: List[Optional[str]] = []
+        for token_id, token in enumerate(tokenizer.convert_ids_to_tokens(list(range(len(tokenizer))))):
+            if token_id in special_ids or token is None:
+                self._pieces.append(None)
+            else:
+                self._pieces.append(token.replace("▁", " "))
+        self._tool_targets = tuple(f" {name} {ACTION_INPUT_MARKER}" for name in tool_names) + (f" {NO_TOOL}",)
+        # (구간 텍스트, 앞 공백 무시 여부, 후보 목록) → 허용 토큰 id
+        self._allowed_cache = {}
+
+    def _decode(self, token_ids: List[int]) -> str:
+        return "".join(self._pieces[token_id] or "" for token_id in token_ids if token_id < len(self._pieces))
+
+    def _constraint(self, text: str) -> Optional[tuple]:
+        """
+        현재까지 생성된 텍스트 기준으로 따라야 할 (구간 텍스트, 후보 목록, 앞 공백 무시 여부)
+        자유 생성 구간이면 None
+        """
+        stripped = _normalize(text).lstrip()
+
+        # 1. 출력 시작 부분: 세 가지 시작어 중 하나가 완성될 때까지
+        if not any(stripped.startswith(opener) for opener in REACT_OPENERS):
+            return stripped, REACT_OPENERS, True
+
+        # 2. 마지막 "Action:" 뒤에 "Action Input:"이 아직 없으면 Tool 이름 구간
+        #    ("No tool needed"를 끝까지 쓰면 이후는 자유 생성 → Thought / Final Answer)
+        index = stripped.rfind(ACTION_MARKER)
+        if index >= 0:
+            tail = stripped[index + len(ACTION_MARKER):]
+            if ACTION_INPUT_MARKER not in tail and not tail.startswith(f" {NO_TOOL}"):
+                return tail, self._tool_targets, False
+
+        return None
+
+    @staticmethod
+    def _is_allowed(candidate: str, targets) -> bool:
+        # 후보가 목표의 앞부분이거나, 목표를 완성하고 더 이어지는 경우 허용
+        return any(target.startswith(candidate) or candidate.startswith(target) for target in targets)
+
+    def _allowed_ids(self, segment: str, targets, strip_leading: bool) -> List[int]:
+        key = (segment, strip_leading, targets)
+        allowed = self._allowed_cache.get(key)
+        if allowed is None:
+            allowed = self._scan_vocab(segment, targets, strip_leading)
+            # 후보의 앞부분인 구간만 저장 (그 외는 제한이 풀리는 경우라 다시 나오지 않음)
+            if any(target.startswith(segment) for target in targets):
+                self._allowed_cache[key] = allowed
+        return allowed
+
+    def _scan_vocab(self, segment: str, targets, strip_leading: bool) -> List[int]:
+        allowed = []
+        for token_id, piece in enumerate(self._pieces):
+            if piece is None:
+                continue
+            candidate = _normalize(segment + piece)
+            if strip_leading:
+                candidate = candidate.lstrip()
+                if not candidate:
+                    continue
+            if self._is_allowed(candidate, targets):
+                allowed.append(token_id)
+        return allowed
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor) -> torch.FloatTensor:
+        for row in range(input_ids.shape[0]):
+            # seq2seq의 decoder 입력: 첫 토큰(decoder_start)은 특수 토큰이라 빈 문자열로 처리됨
+            constraint = self._constraint(self._decode(input_ids[row].tolist()))
+            if constraint is None:
+                continue
+
+            allowed = self._allowed_ids(*constraint)
+            if not allowed:
+                continue
+            mask = torch.full_like(scores[row], float("-inf"))
+            mask[allowed] = 0
+            scores[row] = scores[row] + mask
+        return scores
@@ -0,0 +1,122 @@
+# app/AImodels/replica_pool.py
+"""
+모델 레플리카 풀
+같은 모델 인스턴스에서 두 스레드가 동시에 generate를 호출하지 않도록 레플리카 단위로 대여/반납하고
+메모리가 허용하면 여러 개의 복사본을 두어 동시에 추론
+
+- 대여 순서 보장(FIFO): 먼저 기다린 스레드가 먼저 레플리카를 받음
+- torch intra-op 스레드 수 제한: 레플리카가 모두 동시에 추론해도 CPU 코어 수를 넘지 않도록 (과다 구독 방지)
+  torch.set_num_threads는 호출 스레드가 아니라 프로세스 전체 설정이므로 대여할 때마다 바꾸지 않고
+  풀을 만들 때 한 번만 설정 (풀이 여러 개면 가장 작은 값 유지)
+- 대기 시간/사용 중 레플리카 수 메트릭
+"""
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, List, Optional
+import os
+import threading
+import time
+import logging
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# 이 프로세스에 설정한 torch intra-op 스레드 수 (None이면 아직 설정 안 함)
+_process_threads: Optional[int] = None
+_threads_lock = threading.Lock()
+
+
+def _set_torch_threads(num_threads: int) -> None:
+    import torch
+    torch.set_num_threads(num_threads)
+
+
+def reserve_threads(threads_per_replica: int) -> int:
+    """
+    프로세스 전체 torch intra-op 스레드 수를 threads_per_replica 이하로 제한 (줄이기만 하고 늘리지 않음)
+
+    Returns:
+        적용된 스레드 수
+    """
+    global _process_threads
+    with _threads_lock:
+        if _process_threads is None or threads_per_replica < _process_threads:
+            _set_torch_threads(threads_per_replica)
+            _process_threads = threads_per_replica
+        return _process_threads
+
+
+class ReplicaPool:
+    def __init__(
+        self,
+        name: str,
+        factory: Callable[[], Any],
+        size: int = 1,
+        threads_per_replica: Optional[int] = None
+    ):
+        """
+        Args:
+            name: 메트릭/로그 이름
+            factory: 레플리카 하나를 생성해서 반환하는 함수 (size번 호출)
+            size: 레플리카 수
+            threads_per_replica: 추론 한 번이 쓰는 torch intra-op 스레드 수 (None이면 CPU 코어 수 / size)
+                - 프로세스 전체 설정이라 여러 풀 중 가장 작은 값이 적용됨
+        """
+        self.name = name
+        self.size = max(1, size)
+        self.threads_per_replica = reserve_threads(
+            threads_per_replica or max(1, (os.cpu_count() or 1) // self.size)
+        )
+        self.replicas: List[Any] = []
+        for i in range(self.size):
+            logger.info(f"📦 [{name}] 레플리카 {i + 1}/{self.size} 생성")
+            self.replicas.append(factory())
+
+        self._free = deque(self.replicas)
+        self._waiters: deque = deque()
+        self._cond = threading.Condition()
+        logger.info(f"✅ [{name}] 레플리카 풀 준비: {self.size}개, 레플리카당 스레드 {self.threads_per_replica}개")
+
+    @property
+    def primary(self) -> Any:
+        """토크나이저 등 읽기 전용 용도로 쓰는 첫 번째 레플리카"""
+        return self.replicas[0]
+
+    def _acquire(self) -> Any:
+        ticket = object()
+        with self._cond:
+            self._waiters.append(ticket)
+            metrics.set_gauge(f"{self.name}.replica_waiters", len(self._waiters))
+            # 빈 레플리카가 있어도 앞에 기다리는 스레드가 있으면 순서를 지킴
+            while not self._free or self._waiters[0] is not ticket:
+                self._cond.wait()
+            self._waiters.popleft()
+            replica = self._free.popleft()
+            metrics.set_gauge(f"{self.name}.replica_waiters", len(self._waiters))
+            metrics.set_gauge(f"{self.name}.replicas_in_use", self.size - len(self._free))
+            # 다음 대기자가 남은 레플리카를 받을 수 있도록 깨움
+            self._cond.notify_all()
+            return replica
+
+    def _release(self, replica: Any) -> None:
+        with self._cond:
+            self._free.append(replica)
+            metrics.set_gauge(f"{self.name}.replicas_in_use", self.size - len(self._free))
+            self._cond.notify_all()
+
+    @contextmanager
+    def checkout(self) -> Iterator[Any]:
+        """
+        레플리카 대여 (with 블록이 끝나면 반납)
+
+        Example:
+            with pool.checkout() as model:
+                model.generate(...)
+        """
+        started_at = time.perf_counter()
+        replica = self._acquire()
+        metrics.observe(f"{self.name}.replica_wait_ms", (time.perf_counter() - started_at) * 1000)
+        try:
+            yield replica
+        finally:
+            self._release(replica)
@@ -0,0 +1,56 @@
+# app/AImodels/stopping.py
+"""
+요청 취소/마감 시간을 model.generate에 전달하는 StoppingCriteria
+디코딩 스텝마다 행(요청)별로 확인해서 취소된 행만 멈추고, 모든 행이 멈추면 generate 종료
+
+이번 단계 마감 시각(step_deadline)이 지나서 멈춘 행은 출력이 잘렸으므로 요청 토큰을 DEADLINE_EXCEEDED로 취소
+→ 호출한 쪽(generate 후 raise_if_cancelled)이 잘린 텍스트를 답변으로 쓰지 않고 RequestCancelled 발생
+"""
+from typing import Collection, List, Optional, Tuple
+import time
+import torch
+from transformers import StoppingCriteria
+from app.core.cancellation import CancellationToken, DEADLINE_EXCEEDED
+from app.core.metrics import metrics
+
+# 행별 (취소 토큰, 이번 단계 마감 시각) - 둘 다 없으면 None
+RowCancel = Optional[Tuple[Optional[CancellationToken], Optional[float]]]
+
+
+class CancellationStoppingCriteria(StoppingCriteria):
+    def __init__(self, rows: List[RowCancel], done_token_ids: Collection[int] = ()):
+        """
+        Args:
+            rows: 배치 행 순서대로 (token, step_deadline) 또는 None
+            done_token_ids: 마지막 토큰이 이 값이면 이미 생성이 끝난 행 (eos/pad - 마감이 지나도 잘린 것이 아님)
+        """
+        self.rows = rows
+        self.done_token_ids = {token_id for token_id in done_token_ids if token_id is not None}
+        self._stopped = set()
+
+    @staticmethod
+    def any_active(rows: List[RowCancel]) -> bool:
+        """취소/마감이 설정된 행이 하나라도 있는지 (없으면 criteria를 붙이지 않음)"""
+        return any(row is not None for row in rows)
+
+    def __call__(self, input_ids, scores, **kwargs):
+        now = time.monotonic()
+        stop = []
+        for index, row in enumerate(self.rows):
+            if row is None:
+                stop.append(False)
+                continue
+            token, step_deadline = row
+            cancelled = token is not None and token.cancelled
+            expired = step_deadline is not None and now >= step_deadline
+            if (cancelled or expired) and index not in self._stopped:
+                self._stopped.add(index)
+                finished = int(input_ids[index, -1]) in self.done_token_ids
+                if not cancelled and not finished:
+                    metrics.inc("generation.step_deadline")
+                    if token is not None:
+                        token.cancel(DEADLINE_EXCEEDED)
+                elif cancelled:
+                    metrics.inc("generation.cancelled")
+            stop.append(cancelled or expired)
+        return torch.tensor(stop, dtype=torch.bool, device=input_ids.device)
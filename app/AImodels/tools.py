@@ -1,16 +1,35 @@
 # app/AImodels/tools.py
 from langchain.tools import BaseTool, Tool
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Iterator, Optional, List
+from contextlib import contextmanager
+from contextvars import ContextVar
 from app.services.drug_service import get_drug_info
 from app.services.ai_service import ai_service
+from app.services.prescription_analysis import analyze_prescription_image, PrescriptionNotFound, DEFAULT_ANALYSIS_PROMPT
+from app.AImodels.intent_router import remember_drug_name, VL_QUESTION_SEPARATOR
+from app.core.cancellation import RequestCancelled
 from PIL import Image
+import re
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Agent를 실행 중인 사용자 (VL Tool은 이 사용자의 처방전만 분석)
+_tool_user: ContextVar[Optional[str]] = ContextVar("tool_user", default=None)
+
+
+@contextmanager
+def tool_user_scope(user_id: str) -> Iterator[None]:
+    """이 범위에서 실행되는 Tool을 user_id 사용자 권한으로 제한"""
+    reset = _tool_user.set(str(user_id))
+    try:
+        yield
+    finally:
+        _tool_user.reset(reset)
+
+
 # [A] 사용자 정의 Tool 함수
-# app/AImodels/tools.py 중 run_vl_model_inference 함수만 수정
 
 def run_vl_model_inference(image_identifier: str) -> str:
     """
@@ -18,93 +37,31 @@ def run_vl_model_inference(image_identifier: str) -> str:
     
     Args:
         image_identifier: prescription_id 또는 file_key
+                          (같은 이미지에 대한 후속 질문은 "prescription_id|질문" - 질문을 VL 모델 프롬프트로 사용)
         
     Returns:
         VL 모델 분석 결과 텍스트
     """
     try:
-        from supabase import create_client
-        from app.core.config import settings
-        from app.services.s3_service import s3_service
-        from app.services.ai_service import ai_service
-        from PIL import Image
-        from io import BytesIO
+        from app.core.database import supabase_client
         
         logger.info(f"🖼️ VL Tool 호출: {image_identifier}")
+        identifier, _, question = image_identifier.partition(VL_QUESTION_SEPARATOR)
+        prompt = question.strip() or DEFAULT_ANALYSIS_PROMPT
         
-        # Supabase 클라이언트 생성
-        supabase = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+        # 프로세스 공용 Supabase 클라이언트 (커넥션 재사용)
+        supabase = supabase_client()
         
-        # prescription_id로 조회 시도
-        try:
-            prescription_id = int(image_identifier)
-            result = supabase.table("prescriptions").select("file_key, ai_analysis").eq(
-                "id", prescription_id
-            ).execute()
-            
-            if not result.data:
-                return f"처방전 ID {image_identifier}를 찾을 수 없습니다."
-            
-            # 이미 분석된 결과가 있으면 반환
-            if result.data[0].get('ai_analysis'):
-                logger.info(f"✅ 기존 분석 결과 사용: prescription_id={image_identifier}")
-                return str(result.data[0]['ai_analysis'])
-            
-            file_key = result.data[0]['file_key']
-            
-        except ValueError:
-            # 숫자가 아니면 file_key로 간주
-            file_key = image_identifier
-        
-        # S3에서 이미지 다운로드
-        logger.info(f"📥 S3에서 이미지 다운로드: {file_key}")
-        image_bytes = s3_service.download_prescription(file_key)
-        
-        if not image_bytes:
-            return f"이미지를 다운로드할 수 없습니다: {file_key}"
-        
-        # PIL Image로 변환
-        image = Image.open(BytesIO(image_bytes)).convert("RGB")
-        
-        # VL 모델 실행 (동기 버전 사용)
-        prompt = "这张处方上写了什么？"
-        analysis_result = ai_service.analyze_prescription_sync(image, prompt)
-        
-        # 👇 추가: 메모리 정리
-        import gc
-        import torch
-        
-        del image  # 이미지 객체 삭제
-        gc.collect()  # 가비지 컬렉션
-        if torch.cuda.is_available():
-            torch.cuda.empty_cache()  # GPU 캐시 비우기
-
-        logger.info(f"✅ VL 분석 완료: {image_identifier}")
-
-        # 👇 추가: DB 업데이트
-        try:
-            prescription_id = int(image_identifier)
-            supabase.table("prescriptions").update({
-                "ai_analysis": analysis_result,
-                "analysis_status": "completed"
-            }).eq("id", prescription_id).execute()
-            logger.info(f"💾 DB updated: prescription_id={prescription_id}")
-        except ValueError:
-            # file_key인 경우는 업데이트 생략
-            pass
-        
-        return analysis_result
+        # 분석 캐시 확인 → (비전 인코더 캐시가 없으면) S3 다운로드 → VL 모델 실행 → DB 업데이트
+        # Agent가 질문 텍스트에서 고른 ID일 수 있으므로 현재 사용자 소유 처방전만 허용
+        return analyze_prescription_image(supabase, identifier.strip(), prompt, owner_id=_tool_user.get())
         
+    except PrescriptionNotFound as e:
+        return str(e)
+    except RequestCancelled:
+        # 취소는 Tool 결과가 아니라 Agent 실행 전체를 중단
+        raise
     except Exception as e:
-        # 에러 시에도 상태 업데이트
-        try:
-            prescription_id = int(image_identifier)
-            supabase.table("prescriptions").update({
-                "analysis_status": "failed"
-            }).eq("id", prescription_id).execute()
-        except:
-            pass
-        
         return f"이미지 분석 중 오류가 발생했습니다: {str(e)}"
 
 
@@ -125,6 +82,9 @@ def call_public_data_api(search_query: str) -> str:
         
         if result["status"] == "success":
             data = result["data"]
+            # 제품명이 검색어와 정확히 일치했을 때만 라우터가 다음부터 바로 인식 (괄호 안 성분명 제외)
+            if result.get("exact"):
+                remember_drug_name(re.sub(r"\(.*?\)", "", data.get("itemName", "")))
             response = f"""
 약물명: {data.get('itemName', '정보없음')}
 제조사: {data.get('entpName', '정보없음')}
@@ -149,7 +109,8 @@ vl_tool = Tool(
     description=(
         "사용자가 이미지 파일을 업로드했거나, 이미지에 대한 분석/추론이 필요한 질문을 했을 때 사용합니다. "
         "특히 질문에 'prescription_id: 숫자' 형식이 포함되어 있으면 반드시 이 도구를 사용해야 합니다. "
-        "입력은 prescription_id 또는 이미지 파일 경로(file_key)여야 합니다."
+        "입력은 prescription_id 또는 이미지 파일 경로(file_key)여야 합니다. "
+        "이미 올린 처방전 이미지에 대한 추가 질문은 'prescription_id|질문' 형식으로 입력합니다."
     )
 )
 
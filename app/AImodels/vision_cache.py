@@ -0,0 +1,94 @@
+# app/AImodels/vision_cache.py
+"""
+Qwen2-VL 비전 인코더 캐시
+같은 처방전 이미지에 대한 후속 질문은 이미지 전처리(pixel_values)와 vision tower를 다시 돌리지 않고
+캐시된 image embedding을 재사용해서 언어 모델 prefill/decode 비용만 지불
+
+- 키: 이미지 content hash (prescription 이미지 해시)
+- 값: 전처리 결과(pixel_values, image_grid_thw) → vision tower 실행 후에는 image_embeds로 교체
+- 메모리(텐서 바이트) 기준 LRU 제거
+"""
+from collections import OrderedDict
+from typing import Optional
+import os
+import threading
+import logging
+import torch
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+VL_VISION_CACHE_MB = int(os.getenv("VL_VISION_CACHE_MB", "512"))
+
+
+def _entry_bytes(entry: dict) -> int:
+    return sum(
+        value.numel() * value.element_size()
+        for value in entry.values()
+        if isinstance(value, torch.Tensor)
+    )
+
+
+class VisionFeatureCache:
+    def __init__(self, max_bytes: int):
+        """
+        Args:
+            max_bytes: 캐시에 보관할 텐서 총 바이트 (0이면 비활성화)
+        """
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _update_gauges(self) -> None:
+        metrics.set_gauge("vision_cache.bytes", self._bytes)
+        metrics.set_gauge("vision_cache.entries", len(self._entries))
+
+    def get(self, key: str) -> Optional[dict]:
+        """
+        캐시 항목 조회
+
+        Returns:
+            {"image_grid_thw", "pixel_values" 또는 "image_embeds"} (없으면 None)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                metrics.inc("vision_cache.miss")
+                return None
+            self._entries.move_to_end(key)
+            metrics.inc("vision_cache.hit" if "image_embeds" in entry else "vision_cache.pixel_hit")
+            return entry
+
+    def put(self, key: str, entry: dict) -> None:
+        """항목 저장 (같은 키가 있으면 교체) 후 max_bytes를 넘으면 오래된 항목부터 제거"""
+        size = _entry_bytes(entry)
+        if not self.enabled or size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= _entry_bytes(old)
+            self._entries[key] = entry
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= _entry_bytes(evicted)
+                metrics.inc("vision_cache.evicted")
+            self._update_gauges()
+
+    def put_embeds(self, key: str, image_grid_thw: torch.Tensor, image_embeds: torch.Tensor) -> None:
+        """vision tower 결과 저장 (pixel_values는 더 이상 필요 없으므로 버림)"""
+        self.put(key, {"image_grid_thw": image_grid_thw, "image_embeds": image_embeds.detach()})
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+
+# 싱글톤 인스턴스
+vision_cache = VisionFeatureCache(max_bytes=VL_VISION_CACHE_MB * 1024 * 1024)
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Query, Depends, HTTPException
-from supabase import Client
-from app.core.database import get_supabase
+from supabase import AsyncClient
+from app.core.database import get_async_supabase
+from app.repositories import hospital_repository
 
 router = APIRouter(prefix="/hospitals", tags=["hospitals"])
 
@@ -8,21 +9,17 @@ router = APIRouter(prefix="/hospitals", tags=["hospitals"])
 async def get_hospitals(
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
-    supabase: Client = Depends(get_supabase)
+    supabase: AsyncClient = Depends(get_async_supabase)
 ):
     """
     병원 목록 조회 (무한 스크롤)
     """ 
    
-    response = supabase.table('hospitals')\
-        .select('*')\
-        .range(offset, offset + limit - 1)\
-        .order('created_at', desc=False)\
-        .execute()
+    hospitals = await hospital_repository.list_hospitals(supabase, offset=offset, limit=limit)
     
     return {
-        "hospitals": response.data,
-        "count": len(response.data),
+        "hospitals": hospitals,
+        "count": len(hospitals),
         "offset": offset,
         "limit": limit
     }
\ No newline at end of file
@@ -1,24 +1,163 @@
 # app/api/prescription.py
-from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException
+from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException, Request, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional
+from datetime import datetime, timezone
 # from app.services.ai_service import ai_service
 from app.services.s3_service import s3_service
-from app.services.chat_service import process_chat_with_db, save_message_to_db
-from supabase import create_client, Client
+from app.services.chat_service import process_chat_with_db, save_turn_to_db, AgentStreamHandler
+from app.services.chat_writer import chat_writer
+from app.services.inference_executor import inference_executor, InferenceQueueFull
+from app.services.analysis_worker import analysis_workers
+from app.AImodels.agent_factory import llm_model, AGENT_MAX_ITERATIONS
+from app.AImodels.model_loader import ModelUnavailable
+from app.AImodels.intent_router import prescription_route
+from app.core.cancellation import (
+    CancellationToken,
+    RequestCancelled,
+    cancellation_scope,
+    cancel_on_disconnect,
+    CLIENT_DISCONNECTED,
+    DEADLINE_EXCEEDED,
+)
+from app.core import analysis_status
+from app.core.metrics import metrics
+from app.core.pagination import InvalidCursor
+from app.core.priority import priority_of
+from app.repositories import prescription_repository, chat_repository
+from supabase import Client, AsyncClient
 # from PIL import Image
 # from io import BytesIO
 import os
+import json
+import asyncio
 import logging
 from app.core.config import settings
+from app.core.database import get_supabase, get_async_supabase, supabase_client
 from app.core.security import get_current_user
 
 router = APIRouter(prefix="/prescriptions", tags=["prescriptions"])
 logger = logging.getLogger(__name__)
 
-# Supabase 클라이언트
-def get_supabase() -> Client:
-    return create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+def _queue_full_exception() -> HTTPException:
+    """추론 대기열이 가득 찼을 때 반환할 503 에러"""
+    return HTTPException(
+        status_code=503,
+        detail="요청이 많아 잠시 후 다시 시도해주세요.",
+        headers={"Retry-After": "5"}
+    )
+
+def _model_unavailable_exception(e: ModelUnavailable) -> HTTPException:
+    """로드에 실패한 모델이 백그라운드에서 다시 로드되는 동안 반환할 503 에러"""
+    return HTTPException(
+        status_code=503,
+        detail="AI 모델을 다시 불러오는 중입니다. 잠시 후 다시 시도해주세요.",
+        headers={"Retry-After": str(int(e.retry_after))}
+    )
+
+def _ensure_inference_available(priority: int) -> None:
+    """LLM이 아직 로딩 중이거나(로드 실패 후 백그라운드 재시도 포함) 추론 대기열(해당 우선순위 클래스)이 가득 찼으면 바로 503"""
+    if llm_model.state == llm_model.LOADING:
+        raise HTTPException(
+            status_code=503,
+            detail="AI 모델을 불러오는 중입니다. 잠시 후 다시 시도해주세요.",
+            headers={"Retry-After": "30"}
+        )
+    if llm_model.state == llm_model.FAILED:
+        raise _model_unavailable_exception(ModelUnavailable(llm_model.name, llm_model.retry_after, llm_model.error))
+    if inference_executor.is_full(priority):
+        raise _queue_full_exception()
+
+def _new_cancellation_token() -> CancellationToken:
+    """요청 시간 예산을 Agent 최대 반복 수만큼 나눠 쓰는 취소 토큰"""
+    return CancellationToken(
+        timeout=settings.REQUEST_TIMEOUT_SECONDS or None,
+        steps=AGENT_MAX_ITERATIONS
+    )
+
+async def _run_cancellable(http_request: Request, priority: int, fn, **kwargs):
+    """
+    추론 스레드 풀에서 실행하되 클라이언트 연결이 끊기거나 시간 예산을 넘기면 생성 중단
+    
+    Args:
+        priority: 추론 우선순위 (app.core.priority)
+    
+    Raises:
+        RequestCancelled: 취소된 경우
+        InferenceQueueFull: 대기열이 가득 찬 경우
+    """
+    token = _new_cancellation_token()
+    watcher = asyncio.create_task(cancel_on_disconnect(http_request, token))
+    try:
+        with cancellation_scope(token):
+            return await inference_executor.run(fn, priority=priority, **kwargs)
+    finally:
+        watcher.cancel()
+
+def _cancelled_exception(e: RequestCancelled) -> HTTPException:
+    """취소된 요청의 응답 (연결이 끊긴 경우 클라이언트는 받지 못함)"""
+    metrics.inc(f"requests.cancelled.{e.reason}")
+    if e.reason == DEADLINE_EXCEEDED:
+        return HTTPException(status_code=504, detail="응답 시간이 초과되었습니다. 다시 시도해주세요.")
+    return HTTPException(status_code=499, detail="클라이언트 연결이 끊어졌습니다.")
+
+async def _gather_logged(**calls) -> dict:
+    """
+    서로 독립적인 DB 호출을 동시에 실행 (실패한 호출은 로그만 남기고 None)
+    
+    Returns:
+        dict: 이름 → 결과
+    """
+    results = await asyncio.gather(*calls.values(), return_exceptions=True)
+    named = {}
+    for name, result in zip(calls, results):
+        if isinstance(result, Exception):
+            logger.error(f"{name} 실패: {result}")
+            result = None
+        named[name] = result
+    return named
+
+async def _load_history(supabase: AsyncClient, user_id: str) -> Optional[list]:
+    """
+    Agent 메모리용 채팅 기록 (write-behind 대기 중인 메시지 포함)
+    조회에 실패하면 None → process_chat_with_db가 다시 조회
+    """
+    limit = chat_repository.history_limit()
+    try:
+        history = await chat_repository.load_history(supabase, user_id, limit=limit)
+    except Exception as e:
+        logger.error(f"채팅 기록 조회 실패: {e}")
+        return None
+    return chat_writer.with_pending(history, user_id, limit=limit)
+
+async def _release_to_pending(supabase: AsyncClient, prescription_id: Optional[int]) -> None:
+    """/upload가 끝내지 못한 분석을 pending으로 돌려놓음 (다음 복구 때 분석 워커가 처리, 실패는 로그만)"""
+    if not prescription_id:
+        return
+    try:
+        await prescription_repository.update_analysis_status(
+            supabase, prescription_id, analysis_status.PENDING, only_if=analysis_status.ANALYZING
+        )
+    except Exception as e:
+        logger.error(f"처방전 상태 되돌리기 실패: {e}")
+
+async def _save_turn(
+    supabase: AsyncClient,
+    user_id: str,
+    prescription_id: Optional[int],
+    user_message: str,
+    ai_response: str,
+    received_at: datetime
+) -> None:
+    """
+    대화 한 턴(사용자 메시지 + AI 응답)을 INSERT 한 번으로 저장
+    CHAT_WRITE_BEHIND=True면 대기열에 넣고 바로 반환 (가득 차면 바로 저장)
+    """
+    rows = chat_repository.turn_rows(user_id, prescription_id, user_message, ai_response, received_at)
+    if chat_writer.enabled and await asyncio.to_thread(chat_writer.enqueue, rows):
+        return
+    await chat_repository.save_messages(supabase, rows)
 
 # Response 모델
 class ChatResponse(BaseModel):
@@ -30,17 +169,23 @@ class ChatResponse(BaseModel):
 
 @router.post("/upload", response_model=ChatResponse)
 async def upload_prescription(
+    http_request: Request,
     current_user: dict = Depends(get_current_user),
     query: Optional[str] = Form(None),
     file: Optional[UploadFile] = File(None),
-    supabase: Client = Depends(get_supabase)
+    supabase: AsyncClient = Depends(get_async_supabase)
 ):
     """통합 엔드포인트: 이미지 업로드 + 채팅"""
+    received_at = datetime.now(timezone.utc)
     user_id = current_user["id"]
     prescription_id = None
     user_message = query
     # prescription_analysis_result = None
     
+    # 모델 로딩 중이거나 추론 대기열이 가득 찼으면 업로드 전에 바로 거절
+    priority = priority_of(settings.PRIORITY_UPLOAD)
+    _ensure_inference_available(priority)
+    
     # Case 1: 파일이 있는 경우
     if file and file.filename:
         logger.info(f"📤 File upload detected: {file.filename}")
@@ -50,17 +195,19 @@ async def upload_prescription(
             upload_result = await s3_service.upload_prescription(file, user_id)
             
             # 1-3. Supabase DB에 저장
+            # 이 요청이 직접 분석하므로 'analyzing' (분석 워커 복구 대상인 'pending'과 구분)
             data = {
                 "user_id": user_id,
                 "file_url": upload_result['file_url'],
                 "file_key": upload_result['file_key'],
                 "original_filename": upload_result['original_filename'],
-                "analysis_status": "pending"
+                "analysis_status": analysis_status.ANALYZING,
+                "claimed_at": received_at.isoformat()
             }
             
-            result = supabase.table("prescriptions").insert(data).execute()
-            logger.info(f"✅ Prescription saved to DB: {result.data}")
-            prescription_id = result.data[0]['id']
+            prescription = await prescription_repository.create_prescription(supabase, data)
+            logger.info(f"✅ Prescription saved to DB: {prescription}")
+            prescription_id = prescription['id']
             
             # 1-4. 기본 프롬프트 설정
             if not query or query.strip() == "":
@@ -85,57 +232,52 @@ async def upload_prescription(
             )
         logger.info(f"💬 Text-only query received")
     
-    # 공통: 사용자 메시지 DB 저장
-    try:
-        save_message_to_db(
-            supabase=supabase,
-            user_id=str(user_id),
-            prescription_id=prescription_id,
-            message=user_message,
-            sender_type="user"
-        )
-    except Exception as e:
-        logger.error(f"사용자 메시지 저장 실패: {e}")
+    # 공통: Agent 메모리용 채팅 기록 조회 (사용자 메시지는 AI 응답과 함께 마지막에 저장)
+    chat_history = await _load_history(supabase, str(user_id))
     
     # 공통: Agent 실행
     try:
-        # prescription_id를 Agent에 전달
+        # 방금 올린 처방전은 질문 텍스트가 아니라 Route로 전달 (텍스트 속 prescription_id는 신뢰하지 않음)
         if prescription_id:
-            # 이미지가 있는 경우: prescription_id와 함께 질문 전달
-            enhanced_query = f"prescription_id: {prescription_id}\n사용자 질문: {user_message}"
+            # 이미지가 있는 경우: 기본 분석 후 질문에 답변
+            route = prescription_route(prescription_id)
             logger.info(f"🖼️ Calling Agent with prescription_id={prescription_id}")
         else:
             # 텍스트만 있는 경우
-            enhanced_query = user_message
+            route = None
             logger.info(f"💬 Calling Agent (text only)")
         
-        # Agent 실행
-        ai_response = process_chat_with_db(
-            supabase=supabase,
+        # Agent 실행 (추론 전용 스레드 풀에서 실행, 연결 끊김/시간 초과 시 중단)
+        ai_response = await _run_cancellable(
+            http_request,
+            priority,
+            process_chat_with_db,
+            supabase=supabase_client(),
             user_id=str(user_id),
-            user_query=enhanced_query,
-            prescription_analysis=None  # 더 이상 전달 안 함
+            user_query=user_message,
+            prescription_analysis=None,  # 더 이상 전달 안 함
+            chat_history=chat_history,
+            route=route
         )
         
         logger.info(f"✅ Agent response generated")
-    
-        # 👇 추가: prescription이 있고 아직 pending 상태면 "completed"로 변경
-        if prescription_id:
-            try:
-                # 현재 상태 확인
-                current = supabase.table("prescriptions").select("analysis_status").eq(
-                    "id", prescription_id
-                ).execute()
-                
-                # pending 상태면 completed로 업데이트
-                if current.data and current.data[0]['analysis_status'] == 'pending':
-                    supabase.table("prescriptions").update({
-                        "analysis_status": "completed"
-                    }).eq("id", prescription_id).execute()
-                    logger.info(f"💾 Prescription status updated: completed")
-            except Exception as e:
-                logger.error(f"Status update failed: {e}")
+        # prescription이 있고 아직 analyzing 상태면 "completed"로 변경 (AI 응답 저장과 동시에)
+        final_status = (analysis_status.COMPLETED, analysis_status.ANALYZING)
         
+    except InferenceQueueFull:
+        # 처방전은 pending으로 돌려서 분석 워커 복구 대상으로 남기고 바로 거절
+        logger.warning("⏳ Inference queue full")
+        await _release_to_pending(supabase, prescription_id)
+        raise _queue_full_exception()
+    except ModelUnavailable as e:
+        logger.warning(f"⏳ Model unavailable: {e}")
+        await _release_to_pending(supabase, prescription_id)
+        raise _model_unavailable_exception(e)
+    except RequestCancelled as e:
+        # 분석이 끝나지 않았으므로 처방전은 pending으로 돌려놓음 (대화도 저장하지 않음)
+        logger.warning(f"🛑 Upload request cancelled: {e.reason} (prescription_id={prescription_id})")
+        await _release_to_pending(supabase, prescription_id)
+        raise _cancelled_exception(e)
     except Exception as e:
         logger.error(f"❌ Agent execution failed: {e}")
         import traceback
@@ -144,25 +286,20 @@ async def upload_prescription(
         ai_response = "죄송합니다. 응답 생성 중 오류가 발생했습니다."
         
         # 에러 발생 시 prescription 상태 업데이트
-        if prescription_id:
-            try:
-                supabase.table("prescriptions").update({
-                    "analysis_status": "failed"
-                }).eq("id", prescription_id).execute()
-            except:
-                pass
-    
-    # 공통: AI 응답 DB 저장
-    try:
-        save_message_to_db(
-            supabase=supabase,
-            user_id=str(user_id),
-            prescription_id=prescription_id,
-            message=ai_response,
-            sender_type="ai"
+        final_status = (analysis_status.FAILED, None)
+    
+    # 공통: 대화 저장(사용자 메시지 + AI 응답) + 처방전 상태 업데이트 (동시에 실행)
+    writes = {
+        "대화 저장": _save_turn(
+            supabase, str(user_id), prescription_id, user_message, ai_response, received_at
         )
-    except Exception as e:
-        logger.error(f"AI 응답 저장 실패: {e}")
+    }
+    if prescription_id:
+        status, only_if = final_status
+        writes["처방전 상태 업데이트"] = prescription_repository.update_analysis_status(
+            supabase, prescription_id, status, only_if=only_if
+        )
+    await _gather_logged(**writes)
     
     # 최종 응답 반환
     return ChatResponse(
@@ -173,33 +310,148 @@ async def upload_prescription(
         prescription_analysis=None
     )
 
+@router.post("/upload/async", status_code=202)
+async def upload_prescription_async(
+    current_user: dict = Depends(get_current_user),
+    file: UploadFile = File(...),
+    supabase: AsyncClient = Depends(get_async_supabase)
+):
+    """
+    처방전 업로드 후 바로 반환 (분석은 백그라운드 워커가 처리)
+    
+    Returns:
+        dict: {
+            "success": bool,
+            "prescription_id": int,
+            "analysis_status": "pending",
+            "queued": bool,  # False면 큐가 가득 차서 다음 서버 시작 시 복구됨
+            "poll_url": str  # 분석 상태/결과 조회 URL
+        }
+    
+    Note:
+        - 클라이언트는 poll_url(GET /prescriptions/{id}/analysis)로 analysis_status가
+          completed/failed가 될 때까지 폴링 (pending → processing → completed/failed)
+    """
+    user_id = current_user["id"]
+    
+    # 분석 큐가 가득 찼으면 업로드 전에 바로 거절
+    if analysis_workers.is_full():
+        raise _queue_full_exception()
+    
+    upload_result = await s3_service.upload_prescription(file, user_id)
+    
+    prescription = await prescription_repository.create_prescription(supabase, {
+        "user_id": user_id,
+        "file_url": upload_result['file_url'],
+        "file_key": upload_result['file_key'],
+        "original_filename": upload_result['original_filename'],
+        "analysis_status": analysis_status.PENDING
+    })
+    prescription_id = prescription['id']
+    
+    queued = analysis_workers.enqueue(prescription_id)
+    logger.info(f"📥 Async analysis queued: prescription_id={prescription_id} (queued={queued})")
+    
+    return {
+        "success": True,
+        "prescription_id": prescription_id,
+        "analysis_status": analysis_status.PENDING,
+        "queued": queued,
+        "poll_url": f"/prescriptions/{prescription_id}/analysis"
+    }
+
+# /{prescription_id}보다 먼저 등록 (뒤에 있으면 "messages"가 prescription_id로 매칭되어 422)
+@router.get("/messages")
+async def get_chat_messages(
+    user_id: str,
+    prescription_id: Optional[int] = None,
+    limit: int = Query(25, ge=1, le=100),
+    cursor: Optional[str] = None,
+    supabase: AsyncClient = Depends(get_async_supabase)
+):
+    """
+    사용자의 채팅 메시지 조회 (프론트엔드용)
+    
+    Args:
+        user_id (str): 사용자 ID (= session_id)
+        prescription_id (int, optional): 특정 처방전 관련 메시지만 필터링
+        limit (int): 조회할 최대 메시지 개수 (기본값: 25, 최대 100)
+        cursor (str, optional): 이전 응답의 next_cursor - 그보다 오래된 메시지 조회 (위로 스크롤)
+        supabase (AsyncClient): 비동기 Supabase 클라이언트
+    
+    Returns:
+        dict: {
+            "success": bool,
+            "user_id": str,
+            "total_messages": int,
+            "messages": list,  # 시간 순서대로 정렬 (오래된 것부터)
+            "has_more": bool,  # 더 오래된 메시지가 있는지
+            "next_cursor": str | None  # 더 오래된 페이지 조회용
+        }
+    
+    Raises:
+        HTTPException: 잘못된 커서 400, 메시지 조회 실패 시 500 에러
+    
+    Note:
+        - 옵션 1 (단일 세션): user_id = session_id
+        - 모든 대화가 하나의 세션에 저장됨
+        - prescription_id로 특정 처방전 관련 메시지만 필터링 가능
+        - 프론트엔드가 앱 시작 시 대화 기록을 로드하는 데 사용
+    """
+    try:
+        # user_id(+ prescription_id)로 필터링, 커서보다 오래된 최근 limit개를 시간 순서로 (오래된 것부터 - 채팅 UI 표시용)
+        messages, has_more, next_cursor = await chat_repository.list_messages(
+            supabase, user_id, prescription_id, limit, cursor
+        )
+        if cursor is None:
+            # 아직 저장되지 않은 최근 대화도 표시 (CHAT_WRITE_BEHIND)
+            # 커서는 DB 행 기준이므로 자르지 않고 덧붙임
+            messages = chat_writer.with_pending(messages, user_id, prescription_id=prescription_id)
+        
+        logger.info(f"📨 Retrieved {len(messages)} messages for user {user_id}")
+        
+        return {
+            "success": True,
+            "user_id": user_id,
+            "total_messages": len(messages),
+            "messages": messages,
+            "has_more": has_more,
+            "next_cursor": next_cursor
+        }
+        
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"❌ 메시지 조회 실패: {e}")
+        raise HTTPException(status_code=500, detail=f"메시지 조회 중 오류 발생: {str(e)}")
+
 @router.get("/{prescription_id}")
 async def get_prescription(
     prescription_id: int,
     current_user: dict = Depends(get_current_user),
-    supabase: Client = Depends(get_supabase)
+    supabase: AsyncClient = Depends(get_async_supabase)
 ):
     """처방전 정보 조회"""
-    result = supabase.table("prescriptions").select("*").eq("id", prescription_id).execute()
-    if not result.data: 
+    prescription = await prescription_repository.get_prescription(supabase, prescription_id)
+    if not prescription: 
         raise HTTPException(status_code=404, detail="처방전을 찾을 수 없습니다.")
     
     return {
         "success": True,
-        "data": result.data[0]
+        "data": prescription
     }
 
 @router.get("/{prescription_id}/image-path")
 async def get_prescription_image_path(
     prescription_id: int,
-    supabase: Client = Depends(get_supabase)
+    supabase: AsyncClient = Depends(get_async_supabase)
 ):
     """
     처방전 이미지 경로 조회 (LangChain Tool용)
     
     Args:
         prescription_id (int): 처방전 ID
-        supabase (Client): Supabase 클라이언트 (의존성 주입)
+        supabase (AsyncClient): 비동기 Supabase 클라이언트 (의존성 주입)
     
     Returns:
         dict: {
@@ -217,47 +469,63 @@ async def get_prescription_image_path(
         - 인증이 필요 없는 공개 엔드포인트입니다 (Tool에서 접근).
     """
     # Supabase에서 해당 처방전의 file_url만 조회
-    result = supabase.table("prescriptions").select("file_url").eq("id", prescription_id).execute()
+    prescription = await prescription_repository.get_prescription(supabase, prescription_id, "file_url")
     
     # 처방전이 존재하지 않으면 404 에러
-    if not result.data:
+    if not prescription:
         raise HTTPException(status_code=404, detail="처방전을 찾을 수 없습니다.")
     
     # 성공 응답 반환
     return {
         "success": True,
         "prescription_id": prescription_id,
-        "file_url": result.data[0]['file_url']
+        "file_url": prescription['file_url']
     }
 
 @router.get("/user/{user_id}")
 async def get_user_prescriptions(
     user_id: str,
-    supabase: Client = Depends(get_supabase)
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    supabase: AsyncClient = Depends(get_async_supabase)
 ):
-    """사용자의 모든 처방전 조회"""
-    result = supabase.table("prescriptions").select("*").eq("user_id", user_id).order("created_at", desc=True).execute()
+    """
+    사용자의 처방전 목록 (최신순, 커서 페이지네이션)
+    
+    목록 화면용 컬럼만 반환 (ai_analysis는 GET /prescriptions/{id}/analysis)
+    다음 페이지는 응답의 next_cursor를 cursor로 전달 (has_more가 False면 마지막 페이지)
+    """
+    try:
+        prescriptions, has_more, next_cursor = await prescription_repository.list_user_prescriptions(
+            supabase, user_id, limit, cursor
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     return {
         "success": True,
-        "data": result.data,
-        "count": len(result.data)
+        "data": prescriptions,
+        "count": len(prescriptions),
+        "has_more": has_more,
+        "next_cursor": next_cursor
     }
 
 @router.delete("/{prescription_id}")
 async def delete_prescription(
     prescription_id: int,
-    supabase: Client = Depends(get_supabase)
+    supabase: AsyncClient = Depends(get_async_supabase)
 ):
     """처방전 삭제"""
-    result = supabase.table("prescriptions").select("file_key").eq("id", prescription_id).execute()
+    prescription = await prescription_repository.get_prescription(supabase, prescription_id, "file_key")
     
-    if not result.data:
+    if not prescription:
         raise HTTPException(status_code=404, detail="처방전을 찾을 수 없습니다.")
     
-    file_key = result.data[0]['file_key']
-    s3_deleted = s3_service.delete_prescription(file_key)
-    supabase.table("prescriptions").delete().eq("id", prescription_id).execute()
+    # S3 삭제(동기 boto3)와 DB 삭제를 동시에 실행
+    s3_deleted, _ = await asyncio.gather(
+        asyncio.to_thread(s3_service.delete_prescription, prescription['file_key']),
+        prescription_repository.delete_prescription(supabase, prescription_id)
+    )
     
     return {
         "success": True,
@@ -269,15 +537,15 @@ async def delete_prescription(
 async def get_presigned_url(
     prescription_id: int,
     expiration: int = 3600,
-    supabase: Client = Depends(get_supabase)
+    supabase: AsyncClient = Depends(get_async_supabase)
 ):
     """처방전의 임시 접근 URL 생성"""
-    result = supabase.table("prescriptions").select("file_key").eq("id", prescription_id).execute()
+    prescription = await prescription_repository.get_prescription(supabase, prescription_id, "file_key")
     
-    if not result.data:
+    if not prescription:
         raise HTTPException(status_code=404, detail="처방전을 찾을 수 없습니다.")
     
-    file_key = result.data[0]['file_key']
+    file_key = prescription['file_key']
     presigned_url = s3_service.generate_presigned_url(file_key, expiration)
     
     if not presigned_url:
@@ -292,18 +560,16 @@ async def get_presigned_url(
 @router.get("/{prescription_id}/analysis")
 async def get_prescription_analysis(
     prescription_id: int,
-    supabase: Client = Depends(get_supabase)
+    supabase: AsyncClient = Depends(get_async_supabase)
 ):
     """처방전 분석 결과 조회"""
-    result = supabase.table("prescriptions").select(
-        "id, ai_analysis, analysis_status, created_at, original_filename"
-    ).eq("id", prescription_id).execute()
+    prescription = await prescription_repository.get_prescription(
+        supabase, prescription_id, "id, ai_analysis, analysis_status, created_at, original_filename"
+    )
     
-    if not result.data:
+    if not prescription:
         raise HTTPException(status_code=404, detail="처방전을 찾을 수 없습니다.")
     
-    prescription = result.data[0]
-    
     return {
         "success": True,
         "data": {
@@ -318,85 +584,160 @@ async def get_prescription_analysis(
 @router.post("/chat")
 async def chat_with_prescription(
     request: dict,
+    http_request: Request,
     current_user: dict = Depends(get_current_user),
-    supabase: Client = Depends(get_supabase)
+    supabase: AsyncClient = Depends(get_async_supabase)
 ):
-    """텍스트 채팅 엔드포인트"""
+    """
+    텍스트 채팅 엔드포인트
+    
+    Body:
+        message: 사용자 메시지
+        prescription_id: (옵션) 이미 올린 처방전 이미지에 대한 후속 질문
+                         message를 VL 모델 질문으로 그대로 전달 (같은 이미지는 비전 인코더 캐시 재사용)
+    """
+    received_at = datetime.now(timezone.utc)
     user_message = request.get("message", "")
     user_id = current_user["id"]
+    prescription_id = request.get("prescription_id")
+    
+    priority = priority_of(settings.PRIORITY_CHAT)
+    _ensure_inference_available(priority)
+    
+    route = None
+    if prescription_id is not None:
+        if type(prescription_id) is not int:
+            raise HTTPException(status_code=400, detail="prescription_id는 정수여야 합니다.")
+        if not user_message.strip():
+            raise HTTPException(status_code=400, detail="질문을 입력해주세요.")
+        prescription = await prescription_repository.get_prescription(supabase, prescription_id, "id, user_id")
+        if not prescription or prescription["user_id"] != user_id:
+            raise HTTPException(status_code=404, detail="처방전을 찾을 수 없습니다.")
+        # 소유권을 확인한 처방전만 VL Tool 입력 "prescription_id|질문"으로 바로 보냄
+        route = prescription_route(prescription_id, user_message)
+    
+    # Agent 메모리용 채팅 기록은 이벤트 루프에서 비동기로 조회 (추론 스레드가 DB를 기다리지 않도록)
+    chat_history = await _load_history(supabase, str(user_id))
+    
+    # Agent 실행 (추론 전용 스레드 풀에서 실행, 연결 끊김/시간 초과 시 중단)
+    try:
+        ai_response = await _run_cancellable(
+            http_request,
+            priority,
+            process_chat_with_db,
+            supabase=supabase_client(),
+            user_id=str(user_id),
+            user_query=user_message,
+            prescription_analysis=None,
+            chat_history=chat_history,
+            route=route
+        )
+    except InferenceQueueFull:
+        raise _queue_full_exception()
+    except ModelUnavailable as e:
+        raise _model_unavailable_exception(e)
+    except RequestCancelled as e:
+        raise _cancelled_exception(e)
     
-    # Agent 실행
-    ai_response = process_chat_with_db(
-        supabase=supabase,
-        user_id=str(user_id),
-        user_query=user_message,
-        prescription_analysis=None
-    )
-    
-    # 메시지 DB 저장
-    save_message_to_db(supabase, str(user_id), None, user_message, "user")
-    save_message_to_db(supabase, str(user_id), None, ai_response, "ai")
+    # 사용자 메시지 + AI 응답을 INSERT 한 번으로 저장 (created_at을 직접 지정해서 순서 유지)
+    await _save_turn(supabase, str(user_id), prescription_id, user_message, ai_response, received_at)
     
     return {
         "ai_response": ai_response
     }
 
-@router.get("/messages")
-async def get_chat_messages(
-    user_id: str,
-    prescription_id: Optional[int] = None,
-    limit: int = 25,
+def _sse_event(event_type: str, payload: dict) -> str:
+    """Server-Sent Events 포맷으로 변환"""
+    return f"event: {event_type}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+@router.post("/chat/stream")
+async def chat_with_prescription_stream(
+    request: dict,
+    http_request: Request,
+    current_user: dict = Depends(get_current_user),
     supabase: Client = Depends(get_supabase)
 ):
     """
-    사용자의 채팅 메시지 조회 (프론트엔드용)
+    텍스트 채팅 스트리밍 엔드포인트 (Server-Sent Events)
     
-    Args:
-        user_id (str): 사용자 ID (= session_id)
-        prescription_id (int, optional): 특정 처방전 관련 메시지만 필터링
-        limit (int): 조회할 최대 메시지 개수 (기본값: 25)
-        supabase (Client): Supabase 클라이언트
+    이벤트 순서:
+        - start: 스트림 시작 (바로 전송되어 첫 바이트 시간 단축)
+        - tool_start / tool_end: Agent의 Tool 선택 및 실행 완료
+        - token: 최종 답변 토큰 (생성되는 대로 전달)
+        - done: 전체 답변 ({"ai_response"}) - DB 저장 후 전송
+    """
+    received_at = datetime.now(timezone.utc)
+    user_message = request.get("message", "")
+    user_id = str(current_user["id"])
     
-    Returns:
-        dict: {
-            "success": bool,
-            "user_id": str,
-            "total_messages": int,
-            "messages": list  # 시간 순서대로 정렬 (오래된 것부터)
-        }
+    priority = priority_of(settings.PRIORITY_CHAT)
+    _ensure_inference_available(priority)
     
-    Raises:
-        HTTPException: 메시지 조회 실패 시 500 에러
+    loop = asyncio.get_running_loop()
+    events: asyncio.Queue = asyncio.Queue()
     
-    Note:
-        - 옵션 1 (단일 세션): user_id = session_id
-        - 모든 대화가 하나의 세션에 저장됨
-        - prescription_id로 특정 처방전 관련 메시지만 필터링 가능
-        - 프론트엔드가 앱 시작 시 대화 기록을 로드하는 데 사용
-    """
-    try:
-        # 기본 쿼리: user_id로 필터링
-        query = supabase.table("prescription_chats").select("*").eq("user_id", user_id)
-        
-        # prescription_id 필터링 (옵션)
-        if prescription_id is not None:
-            query = query.eq("prescription_id", prescription_id)
-        
-        # 최근 메시지부터 조회 후 limit 적용
-        result = query.order("created_at", desc=True).limit(limit).execute()
+    def emit(event: dict) -> None:
+        # 추론 스레드 → 이벤트 루프로 전달
+        loop.call_soon_threadsafe(events.put_nowait, event)
+    
+    def run_and_save() -> str:
+        ai_response = process_chat_with_db(
+            supabase=supabase,
+            user_id=user_id,
+            user_query=user_message,
+            prescription_analysis=None,
+            callbacks=[AgentStreamHandler(emit)]
+        )
         
-        # 시간 순서로 정렬 (오래된 것부터 - 채팅 UI 표시용)
-        messages = list(reversed(result.data)) if result.data else []
+        # 취소되지 않고 끝까지 생성된 경우에만 대화 저장 (INSERT 한 번)
+        try:
+            save_turn_to_db(supabase, user_id, None, user_message, ai_response, received_at)
+        except Exception as e:
+            logger.error(f"스트리밍 메시지 저장 실패: {e}")
+        return ai_response
+    
+    token = _new_cancellation_token()
+    try:
+        with cancellation_scope(token):
+            future = inference_executor.submit(run_and_save, priority=priority)
+    except InferenceQueueFull:
+        raise _queue_full_exception()
+    watcher = asyncio.create_task(cancel_on_disconnect(http_request, token))
+    
+    # 작업이 끝나면 스트림 종료 신호
+    future.add_done_callback(lambda _: loop.call_soon_threadsafe(events.put_nowait, None))
+    
+    async def event_stream():
+        try:
+            yield _sse_event("start", {"user_id": user_id})
+            
+            while True:
+                event = await events.get()
+                if event is None:
+                    break
+                yield _sse_event(event.pop("type"), event)
+        finally:
+            watcher.cancel()
+            # 스트림이 끝나기 전에 클라이언트가 떠났으면 생성 중단
+            if not future.done():
+                token.cancel(CLIENT_DISCONNECTED)
         
-        logger.info(f"📨 Retrieved {len(messages)} messages for user {user_id}")
+        try:
+            ai_response = future.result()
+        except RequestCancelled as e:
+            metrics.inc(f"requests.cancelled.{e.reason}")
+            ai_response = "응답 시간이 초과되었습니다. 다시 시도해주세요."
+        except Exception as e:
+            logger.error(f"❌ Streaming chat failed: {e}")
+            ai_response = "죄송합니다. 응답 생성 중 오류가 발생했습니다."
         
-        return {
-            "success": True,
-            "user_id": user_id,
-            "total_messages": len(messages),
-            "messages": messages
+        yield _sse_event("done", {"ai_response": ai_response})
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"  # nginx 버퍼링 비활성화
         }
-        
-    except Exception as e:
-        logger.error(f"❌ 메시지 조회 실패: {e}")
-        raise HTTPException(status_code=500, detail=f"메시지 조회 중 오류 발생: {str(e)}")
\ No newline at end of file
+    )
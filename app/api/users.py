@@ -3,7 +3,8 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from app.models.user import UserProfileUpdate, UserResponse
 from app.services.user_service import update_user_profile #get_user_by_id
 from app.core.security import get_current_user
-from app.core.database import get_supabase
+from app.core.database import get_async_supabase
+from app.repositories import user_repository
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -11,28 +12,28 @@ router = APIRouter(prefix="/users", tags=["users"])
 @router.get("/me/profile", response_model=UserResponse)
 async def getMyProfile(
     current_user: dict = Depends(get_current_user),
-    supabase = Depends(get_supabase)
+    supabase = Depends(get_async_supabase)
 ):
     """현재 로그인한 사용자의 정보 조회"""
     
     user_id = current_user["id"]
     
     # Supabase에서 사용자 정보 조회
-    response = supabase.table("users").select("*").eq("id", user_id).single().execute()
+    user = await user_repository.get_user(supabase, user_id)
     
-    if not response.data:
+    if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="사용자를 찾을 수 없습니다"
         )
     
-    return response.data
+    return user
 
 @router.patch("/me/profile", response_model=UserResponse)
 async def updateMyProfile(
     profile_data: UserProfileUpdate,
     current_user: dict = Depends(get_current_user),
-    supabase = Depends(get_supabase)
+    supabase = Depends(get_async_supabase)
 ):
     """현재 로그인한 사용자의 기본정보 업데이트"""
     
@@ -0,0 +1,26 @@
+# app/core/analysis_status.py
+"""
+prescriptions.analysis_status 값과 상태 흐름
+
+    pending ──(분석 워커 조건부 UPDATE, claimed_at 기록)──▶ processing ──▶ completed / failed
+    (POST /upload가 직접 분석하며 생성, claimed_at 기록)     analyzing  ──▶ completed / failed
+
+- pending: POST /upload/async로 올라와 분석 대기 중 (분석 워커 복구 대상)
+- processing: 분석 워커가 가져감 (여러 워커/프로세스 중 한 곳만 성공)
+- analyzing: POST /upload 요청이 직접 분석 중 (워커가 가져가지 않음)
+    취소되거나 추론 대기열이 가득 차면 pending으로 되돌림
+- completed / failed: 분석 완료 / 실패
+- processing/analyzing 상태로 ANALYSIS_CLAIM_TIMEOUT_SECONDS가 지난 행은 중단된 것으로 보고 워커가 다시 가져감
+
+DB 제약(마이그레이션 0007)의 허용 값 목록도 ALL_STATUSES와 같게 유지
+"""
+
+PENDING = "pending"
+PROCESSING = "processing"
+ANALYZING = "analyzing"
+COMPLETED = "completed"
+FAILED = "failed"
+
+ALL_STATUSES = (PENDING, PROCESSING, ANALYZING, COMPLETED, FAILED)
+# 분석이 진행 중인 상태 (claimed_at 기준으로 중단 여부 판단)
+IN_PROGRESS_STATUSES = (PROCESSING, ANALYZING)
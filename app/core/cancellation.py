@@ -0,0 +1,113 @@
+# app/core/cancellation.py
+"""
+요청 취소/마감 시간 전파
+클라이언트가 연결을 끊거나 요청 시간 예산(REQUEST_TIMEOUT_SECONDS)을 넘기면
+Agent 루프와 model.generate(디코딩 스텝마다 확인)를 중단
+
+- 요청마다 CancellationToken을 만들어 contextvar로 전달 (추론 스레드 풀로도 복사됨)
+- 시간 예산은 Agent 단계(LLM 호출)마다 남은 시간 / 남은 단계 수로 나눠서 한 단계가 전부 쓰지 않도록 함
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+import asyncio
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+CLIENT_DISCONNECTED = "client_disconnected"
+DEADLINE_EXCEEDED = "deadline_exceeded"
+
+
+class RequestCancelled(Exception):
+    """요청이 취소된 경우 (클라이언트 연결 끊김 또는 마감 시간 초과)"""
+
+    def __init__(self, reason: str):
+        super().__init__(f"요청이 취소되었습니다: {reason}")
+        self.reason = reason
+
+
+class CancellationToken:
+    def __init__(self, timeout: Optional[float] = None, steps: int = 1):
+        """
+        Args:
+            timeout: 요청 전체 시간 예산(초, None이면 마감 없음)
+            steps: 시간 예산을 나눌 단계 수 (Agent 최대 LLM 호출 수)
+        """
+        self.deadline = time.monotonic() + timeout if timeout else None
+        self.steps = max(1, steps)
+        self._steps_started = 0
+        self._reason: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def cancel(self, reason: str) -> None:
+        """취소 (처음 사유만 기록)"""
+        with self._lock:
+            if self._reason is None:
+                self._reason = reason
+                logger.info(f"🛑 요청 취소: {reason}")
+
+    @property
+    def reason(self) -> Optional[str]:
+        return self._reason
+
+    @property
+    def cancelled(self) -> bool:
+        if self._reason is None and self.deadline is not None and time.monotonic() >= self.deadline:
+            self.cancel(DEADLINE_EXCEEDED)
+        return self._reason is not None
+
+    def raise_if_cancelled(self) -> None:
+        if self.cancelled:
+            raise RequestCancelled(self._reason)
+
+    def next_step_deadline(self) -> Optional[float]:
+        """
+        다음 단계(LLM 호출)의 마감 시각: 남은 시간을 남은 단계 수로 나눔
+
+        Returns:
+            time.monotonic() 기준 시각 (마감이 없으면 None)
+        """
+        if self.deadline is None:
+            return None
+        with self._lock:
+            remaining_steps = max(1, self.steps - self._steps_started)
+            self._steps_started += 1
+        now = time.monotonic()
+        return now + max(0.0, self.deadline - now) / remaining_steps
+
+
+_current_token: ContextVar[Optional[CancellationToken]] = ContextVar("cancellation_token", default=None)
+
+
+def current_token() -> Optional[CancellationToken]:
+    """현재 요청의 취소 토큰 (없으면 None)"""
+    return _current_token.get()
+
+
+@contextmanager
+def cancellation_scope(token: CancellationToken) -> Iterator[CancellationToken]:
+    """이 블록 안에서 제출한 추론 작업이 token을 사용하도록 설정"""
+    reset = _current_token.set(token)
+    try:
+        yield token
+    finally:
+        _current_token.reset(reset)
+
+
+async def cancel_on_disconnect(request, token: CancellationToken, interval: float = 0.5) -> None:
+    """
+    클라이언트 연결이 끊기면 token 취소 (작업이 끝나면 호출한 쪽에서 task.cancel())
+
+    Args:
+        request: starlette Request
+        token: 취소할 토큰
+        interval: 연결 상태 확인 주기(초)
+    """
+    while not token.cancelled:
+        if await request.is_disconnected():
+            token.cancel(CLIENT_DISCONNECTED)
+            return
+        await asyncio.sleep(interval)
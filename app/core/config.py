@@ -6,6 +6,21 @@ class Settings(BaseSettings):
     DATABASE_URL: str
     SUPABASE_URL: str
     SUPABASE_KEY: str
+    # 프로세스 공용 Supabase 클라이언트의 HTTP 커넥션 풀 (keep-alive로 TLS 핸드셰이크 재사용)
+    SUPABASE_HTTP2: bool = True  # h2 패키지가 없으면 HTTP/1.1로 동작
+    SUPABASE_MAX_CONNECTIONS: int = 20  # 최대 동시 연결 수
+    SUPABASE_MAX_KEEPALIVE: int = 10  # 유지할 유휴 연결 수
+    SUPABASE_KEEPALIVE_EXPIRY: float = 30.0  # 유휴 연결 유지 시간(초)
+    SUPABASE_CONNECT_TIMEOUT: float = 5.0  # 연결 대기 시간(초)
+    SUPABASE_TIMEOUT: float = 15.0  # 응답 대기 시간(초)
+    # 자주 쓰는 조회(채팅 기록, 처방전 조회, 메시지 저장)의 실행 경로
+    # "postgrest": Supabase REST API | "sql": DATABASE_URL로 Postgres에 직접 연결 (커넥션 풀 + prepared statement)
+    DB_BACKEND: str = "postgrest"
+    DB_PREPARED_STATEMENTS: bool = True  # 서버측 PREPARE 사용 (PgBouncer transaction 모드 풀러를 거치면 False)
+    DB_POOL_SIZE: int = 5  # SQLAlchemy 커넥션 풀 크기
+    DB_MAX_OVERFLOW: int = 10  # 최대 추가 연결 수
+    DB_POOL_RECYCLE: int = 1800  # 연결 재생성 주기(초, 서버측 유휴 연결 종료 대비)
+    DB_ECHO: bool = False  # SQL 쿼리 로깅 (개발 중에만 True)
     
     AWS_ACCESS_KEY_ID: str
     AWS_SECRET_ACCESS_KEY: str
@@ -23,11 +38,63 @@ class Settings(BaseSettings):
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
     
     AI_SERVER_URL: str = "http://localhost:8001"
+    # VL 모델 실행 위치: "local" (API 프로세스에서 로드) | "remote" (app/vqa_server.py에 요청)
+    VL_BACKEND: str = "local"
+    AI_SERVER_SOCKET: str = ""  # 설정 시 AI_SERVER_URL 대신 Unix 도메인 소켓으로 연결
+    AI_SERVER_TIMEOUT: float = 120.0  # 추론 응답 대기 시간(초)
+    AI_SERVER_MAX_CONNECTIONS: int = 16  # 커넥션 풀 크기
 
     # 식약처 의약품 API
     DRUG_API_SERVICE_KEY: str
     DRUG_API_BASE_URL: str = "http://apis.data.go.kr/1471000/DrbEasyDrugInfoService/getDrbEasyDrugList"
-    
+
+    # 채팅 메모리 설정
+    # "bounded": 최근 N개만 DB에서 조회 + 토큰 예산으로 자르고 오래된 대화는 요약으로 유지
+    # "full": 기존 방식 (전체 기록 로드)
+    CHAT_MEMORY_MODE: str = "bounded"
+    CHAT_HISTORY_WINDOW: int = 12  # 메모리에 넣을 최근 메시지 최대 수
+    CHAT_HISTORY_TOKEN_BUDGET: int = 192  # 메모리에 넣을 최근 대화의 최대 토큰 수
+    CHAT_SUMMARY_TOKEN_BUDGET: int = 64  # 오래된 대화 요약의 최대 토큰 수
+    CHAT_SUMMARY_SOURCE_MESSAGES: int = 8  # 요약을 만들 때 윈도우 밖에서 함께 조회할 이전 메시지 수
+    # 채팅 메시지 write-behind 저장 (턴마다 두 메시지를 모아 응답 후 배치로 저장)
+    # False면 턴이 끝날 때 두 메시지를 INSERT 한 번으로 바로 저장
+    # True로 켜기 전에 마이그레이션 0003 (client_message_id) 적용 필요
+    CHAT_WRITE_BEHIND: bool = False
+    CHAT_WRITE_BATCH_SIZE: int = 50  # 이만큼 모이면 바로 저장
+    CHAT_WRITE_FLUSH_SECONDS: float = 0.5  # 덜 모여도 이 시간이 지나면 저장
+    CHAT_WRITE_MAX_PENDING: int = 1000  # 저장 대기 가능한 메시지 수 (초과 시 요청 안에서 바로 저장)
+    CHAT_WRITE_MAX_ATTEMPTS: int = 5  # 배치 저장이 이만큼 연속 실패하면 실패하는 메시지를 골라 dead-letter 파일(스풀 경로 + .dead)로 옮김
+    CHAT_WRITE_SPOOL_PATH: str = "chat_write_spool.jsonl"  # 저장 전 메시지 로컬 기록 (재시작 시 다시 저장, 워커 프로세스마다 잠금으로 .1, .2 … 슬롯 파일 사용)
+
+    # 추론 전용 스레드 풀 (이벤트 루프 블로킹 방지)
+    INFERENCE_WORKERS: int = 1  # 동시에 실행할 추론 작업 수
+    INFERENCE_QUEUE_SIZE: int = 8  # 대기 가능한 작업 수 (초과 시 503 반환)
+    # 추론 우선순위 ("interactive" | "background") - 엔드포인트별 설정
+    PRIORITY_CHAT: str = "interactive"  # POST /prescriptions/chat, /chat/stream
+    PRIORITY_UPLOAD: str = "interactive"  # POST /prescriptions/upload
+    PRIORITY_ANALYSIS: str = "background"  # 백그라운드 분석 워커 (upload/async)
+    PRIORITY_AGING_SECONDS: float = 10.0  # 이만큼 기다릴 때마다 한 단계 우선 (0이면 aging 없음)
+    # 요청당 추론 시간 예산(초, 0이면 제한 없음) - Agent 단계마다 나눠 쓰고 초과 시 생성 중단
+    REQUEST_TIMEOUT_SECONDS: float = 120.0
+
+    # 모델 로딩 (False면 첫 요청 시 로드)
+    MODEL_PRELOAD: bool = True  # 서버 시작 후 백그라운드에서 LLM 로드
+    VL_MODEL_PRELOAD: bool = True  # 서버 시작 후 백그라운드에서 VL 모델 로드
+
+    # 처방전 분석 결과 캐시 (같은 이미지 재분석 방지)
+    VL_ANALYSIS_CACHE_SIZE: int = 1000  # 메모리 캐시 최대 항목 수
+    # True면 메모리 캐시 뒤에 vl_analysis_cache 테이블도 사용 (프로세스 재시작/다른 워커와 공유)
+    # True로 켜기 전에 마이그레이션 0001, 0002, 0005 적용 필요
+    VL_CACHE_DB: bool = False
+    VL_CACHE_PERCEPTUAL_HASH: bool = False  # 비슷한 사진(다시 찍은 처방전)도 재사용
+    VL_CACHE_PERCEPTUAL_MAX_DISTANCE: int = 4  # 같은 이미지로 볼 dHash 최대 비트 차이
+
+    # 백그라운드 처방전 분석 (POST /prescriptions/upload/async)
+    ANALYSIS_WORKERS: int = 1  # 분석 워커 스레드 수
+    ANALYSIS_QUEUE_SIZE: int = 100  # 대기 가능한 분석 작업 수
+    ANALYSIS_RECOVER_PENDING: bool = True  # 서버 시작 시 pending / 오래된 분석 중 처방전 다시 큐에 넣기
+    ANALYSIS_CLAIM_TIMEOUT_SECONDS: int = 900  # 이 시간 안에 끝나지 않은 분석(processing/analyzing)은 중단된 것으로 보고 다시 처리
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
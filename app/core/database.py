@@ -2,16 +2,25 @@ from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
-from supabase import create_client, Client
-from typing import Generator
+from app.core.db_stats import SYNC_EVENT_HOOKS, ASYNC_EVENT_HOOKS
+from supabase import create_client, acreate_client, Client, AsyncClient, ClientOptions, AsyncClientOptions
+from typing import Optional
+import importlib.util
+import asyncio
+import threading
+import logging
+import httpx
+
+logger = logging.getLogger(__name__)
 
 # SQLAlchemy 엔진 생성
 engine = create_engine(
     settings.DATABASE_URL,
     pool_pre_ping=True,  # 연결 상태 확인 (연결이 끊어졌으면 자동 재연결)
-    echo=True,  # SQL 쿼리 로깅 (개발 중에만 True, 프로덕션에서는 False)
-    pool_size=5,  # 커넥션 풀 크기
-    max_overflow=10  # 최대 추가 연결 수
+    echo=settings.DB_ECHO,  # SQL 쿼리 로깅 (개발 중에만 True, 프로덕션에서는 False)
+    pool_size=settings.DB_POOL_SIZE,  # 커넥션 풀 크기
+    max_overflow=settings.DB_MAX_OVERFLOW,  # 최대 추가 연결 수
+    pool_recycle=settings.DB_POOL_RECYCLE
 )
 
 # 세션 팩토리
@@ -40,21 +49,125 @@ def get_db():
     finally:
         db.close()
 
-# Supabase 클라이언트 생성
-def get_supabase() -> Generator[Client, None, None]:
+# ============================================
+# Supabase 클라이언트 (프로세스 공용)
+# ============================================
+# 요청/Tool 호출마다 create_client를 만들면 매번 새 HTTP 세션과 TLS 핸드셰이크 비용이 듦
+# → 커넥션 풀(keep-alive)을 가진 클라이언트 하나를 모든 요청이 공유 (httpx.Client는 스레드 안전)
+_supabase: Optional[Client] = None
+_http_client: Optional[httpx.Client] = None
+_supabase_lock = threading.Lock()
+
+# async 엔드포인트용 (이벤트 루프를 막지 않음)
+_async_supabase: Optional[AsyncClient] = None
+_async_http_client: Optional[httpx.AsyncClient] = None
+_async_supabase_lock = asyncio.Lock()
+
+
+def _http_client_options() -> dict:
+    """커넥션 풀/타임아웃 설정 (동기/비동기 httpx 클라이언트 공통, PostgREST 요청에 사용)"""
+    http2 = settings.SUPABASE_HTTP2 and importlib.util.find_spec("h2") is not None
+    if settings.SUPABASE_HTTP2 and not http2:
+        logger.info("ℹ️ h2 패키지가 없어 Supabase 연결은 HTTP/1.1 keep-alive로 동작")
+    return {
+        "http2": http2,
+        "timeout": httpx.Timeout(settings.SUPABASE_TIMEOUT, connect=settings.SUPABASE_CONNECT_TIMEOUT),
+        "limits": httpx.Limits(
+            max_connections=settings.SUPABASE_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.SUPABASE_MAX_KEEPALIVE,
+            keepalive_expiry=settings.SUPABASE_KEEPALIVE_EXPIRY
+        ),
+        "follow_redirects": True,
+    }
+
+
+def supabase_client() -> Client:
     """
-    Supabase 클라이언트를 생성하여 반환합니다.
+    프로세스 공용 Supabase 클라이언트 (처음 호출 시 생성)
+    
+    요청 밖(백그라운드 워커, Agent Tool)에서도 이 함수로 같은 클라이언트를 사용
+    로그인/회원가입처럼 클라이언트의 auth 세션을 바꾸는 호출에는 사용하지 말 것
+    (세션이 바뀌면 이후 모든 쿼리가 그 사용자 토큰으로 나감 - auth_service 참고)
+    """
+    global _supabase, _http_client
+    if _supabase is None:
+        with _supabase_lock:
+            if _supabase is None:
+                # event hook으로 요청별 DB 왕복 횟수/대기 시간 집계 (app.core.db_stats)
+                _http_client = httpx.Client(**_http_client_options(), event_hooks=SYNC_EVENT_HOOKS)
+                client = create_client(
+                    settings.SUPABASE_URL,
+                    settings.SUPABASE_KEY,
+                    options=ClientOptions(
+                        httpx_client=_http_client,
+                        postgrest_client_timeout=settings.SUPABASE_TIMEOUT
+                    )
+                )
+                # PostgREST 세션을 미리 만들어서 여러 스레드가 동시에 초기화하지 않도록
+                client.postgrest
+                _supabase = client
+                logger.info("🔌 Supabase 공용 클라이언트 생성")
+    return _supabase
+
+
+def close_supabase() -> None:
+    """서버 종료 시 커넥션 풀 정리"""
+    global _supabase, _http_client
+    with _supabase_lock:
+        if _http_client is not None:
+            _http_client.close()
+        _supabase = None
+        _http_client = None
+
+
+async def async_supabase_client() -> AsyncClient:
+    """프로세스 공용 비동기 Supabase 클라이언트 (async 엔드포인트/리포지토리용, 처음 호출 시 생성)"""
+    global _async_supabase, _async_http_client
+    if _async_supabase is None:
+        async with _async_supabase_lock:
+            if _async_supabase is None:
+                _async_http_client = httpx.AsyncClient(**_http_client_options(), event_hooks=ASYNC_EVENT_HOOKS)
+                client = await acreate_client(
+                    settings.SUPABASE_URL,
+                    settings.SUPABASE_KEY,
+                    options=AsyncClientOptions(
+                        httpx_client=_async_http_client,
+                        postgrest_client_timeout=settings.SUPABASE_TIMEOUT
+                    )
+                )
+                client.postgrest
+                _async_supabase = client
+                logger.info("🔌 Supabase 공용 비동기 클라이언트 생성")
+    return _async_supabase
+
+
+async def close_async_supabase() -> None:
+    global _async_supabase, _async_http_client
+    if _async_http_client is not None:
+        await _async_http_client.aclose()
+    _async_supabase = None
+    _async_http_client = None
+
+
+# FastAPI 의존성 주입용 함수
+async def get_async_supabase() -> AsyncClient:
+    """
+    비동기 Supabase 클라이언트를 반환합니다. (app.repositories 함수에 전달)
+    
+    사용 예시:
+    @app.get("/hospitals")
+    async def get_hospitals(supabase: AsyncClient = Depends(get_async_supabase)):
+        return await hospital_repository.list_hospitals(supabase, offset=0, limit=20)
+    """
+    return await async_supabase_client()
+
+def get_supabase() -> Client:
+    """
+    프로세스 공용 Supabase 클라이언트를 반환합니다.
     
     사용 예시:
     @app.get("/users")
     def get_users(supabase: Client = Depends(get_supabase)):
         return supabase.table("users").select("*").execute()
     """
-    supabase: Client = create_client(
-        settings.SUPABASE_URL,
-        settings.SUPABASE_KEY
-    )
-    try:
-        yield supabase
-    finally:
-        pass  # Supabase 클라이언트는 명시적 종료 불필요
\ No newline at end of file
+    return supabase_client()
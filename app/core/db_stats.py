@@ -0,0 +1,88 @@
+# app/core/db_stats.py
+"""
+요청별 DB 왕복 통계
+Supabase(PostgREST) HTTP 요청마다 왕복 횟수와 대기 시간(응답 본문 수신까지)을 현재 요청의 통계에 누적
+
+- 요청마다 DBStats를 contextvar로 설정 (main.py 미들웨어) → 추론 스레드 풀로도 복사되므로
+  Agent/Tool 안에서 실행한 조회도 같은 요청에 집계됨
+- 공용 Supabase 클라이언트의 httpx event hook으로 수집 (app.core.database)
+- 직접 SQL 경로는 SQLAlchemy cursor 이벤트로 수집 (app.repositories.sql_repository)
+"""
+from contextvars import ContextVar
+from typing import Optional
+import threading
+import time
+from app.core.metrics import metrics
+
+_STARTED_AT = "db_stats_started_at"
+
+
+class DBStats:
+    def __init__(self):
+        self.round_trips = 0
+        self.wait_ms = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, elapsed_ms: float) -> None:
+        with self._lock:
+            self.round_trips += 1
+            self.wait_ms += elapsed_ms
+
+    def headers(self) -> dict:
+        """응답 헤더 (클라이언트/부하 테스트에서 확인용)"""
+        return {
+            "X-DB-Round-Trips": str(self.round_trips),
+            "X-DB-Time-Ms": f"{self.wait_ms:.1f}",
+        }
+
+
+_current_stats: ContextVar[Optional[DBStats]] = ContextVar("db_stats", default=None)
+
+
+def current_db_stats() -> Optional[DBStats]:
+    """현재 요청의 DB 통계 (요청 밖이면 None)"""
+    return _current_stats.get()
+
+
+def start_db_stats() -> DBStats:
+    """현재 컨텍스트(요청)에 새 통계 설정"""
+    stats = DBStats()
+    _current_stats.set(stats)
+    return stats
+
+
+def record_round_trip(started_at: Optional[float]) -> None:
+    """started_at(time.perf_counter)부터 지금까지를 DB 왕복 1회로 기록"""
+    if started_at is None:
+        return
+    elapsed_ms = (time.perf_counter() - started_at) * 1000
+    metrics.observe("db.round_trip_ms", elapsed_ms)
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record(elapsed_ms)
+
+
+# ============================================
+# httpx event hooks
+# ============================================
+
+def _on_request(request) -> None:
+    request.extensions[_STARTED_AT] = time.perf_counter()
+
+
+def _on_response(response) -> None:
+    response.read()
+    record_round_trip(response.request.extensions.get(_STARTED_AT))
+
+
+async def _on_request_async(request) -> None:
+    request.extensions[_STARTED_AT] = time.perf_counter()
+
+
+async def _on_response_async(response) -> None:
+    await response.aread()
+    record_round_trip(response.request.extensions.get(_STARTED_AT))
+
+
+SYNC_EVENT_HOOKS = {"request": [_on_request], "response": [_on_response]}
+ASYNC_EVENT_HOOKS = {"request": [_on_request_async], "response": [_on_response_async]}
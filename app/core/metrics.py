@@ -0,0 +1,74 @@
+# app/core/metrics.py
+"""
+프로세스 내부 메트릭 수집기
+카운터, 게이지, 지연시간(최근 샘플 기반 p50/p95) 제공 → /metrics 엔드포인트에서 조회
+"""
+from collections import deque
+from typing import Dict
+import threading
+
+
+class MetricsRegistry:
+    def __init__(self, max_samples: int = 1000):
+        self._lock = threading.Lock()
+        self._max_samples = max_samples
+        self._counters: Dict[str, float] = {}
+        self._gauges: Dict[str, float] = {}
+        self._samples: Dict[str, deque] = {}
+
+    def inc(self, name: str, value: float = 1) -> None:
+        """카운터 증가"""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def set_gauge(self, name: str, value: float) -> None:
+        """현재 값 기록 (큐 길이, 메모리 사용량 등)"""
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name: str, value: float) -> None:
+        """지연시간 등 분포 샘플 기록 (최근 max_samples개 유지)"""
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self._max_samples)
+            samples.append(value)
+
+    def get_counter(self, name: str) -> float:
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    @staticmethod
+    def _percentile(sorted_values: list, ratio: float) -> float:
+        index = min(int(round(ratio * (len(sorted_values) - 1))), len(sorted_values) - 1)
+        return sorted_values[index]
+
+    def summary(self, name: str) -> dict:
+        """샘플 분포 요약 (count/avg/p50/p95/max)"""
+        with self._lock:
+            values = sorted(self._samples.get(name, ()))
+        if not values:
+            return {"count": 0}
+        return {
+            "count": len(values),
+            "avg": round(sum(values) / len(values), 3),
+            "p50": round(self._percentile(values, 0.5), 3),
+            "p95": round(self._percentile(values, 0.95), 3),
+            "max": round(values[-1], 3),
+        }
+
+    def snapshot(self) -> dict:
+        """전체 메트릭 스냅샷"""
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            names = list(self._samples.keys())
+        return {
+            "counters": counters,
+            "gauges": gauges,
+            "timings": {name: self.summary(name) for name in names},
+        }
+
+
+# 싱글톤 인스턴스
+metrics = MetricsRegistry()
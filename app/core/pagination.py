@@ -0,0 +1,69 @@
+# app/core/pagination.py
+"""
+목록 API 커서 페이지네이션 (keyset)
+정렬 기준 (created_at, id)의 마지막 값을 불투명한 문자열 커서로 주고받음
+- 클라이언트는 응답의 next_cursor를 다음 요청의 cursor로 그대로 전달
+- offset과 달리 페이지가 깊어져도 인덱스에서 바로 이어서 읽음 (최신순 목록 → 더 오래된 항목)
+"""
+from datetime import datetime
+from typing import Optional
+import base64
+import json
+
+
+class InvalidCursor(ValueError):
+    """해석할 수 없는 커서 (엔드포인트에서 400으로 변환)"""
+
+
+def encode_cursor(row: dict) -> str:
+    """행의 (created_at, id)로 커서 생성"""
+    raw = json.dumps([row["created_at"], row["id"]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """
+    Returns:
+        tuple: (created_at ISO 문자열, id)
+
+    Raises:
+        InvalidCursor: 형식이 맞지 않는 커서
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, row_id = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f"잘못된 커서: {cursor}") from e
+    if not isinstance(created_at, str) or type(row_id) is not int:
+        raise InvalidCursor(f"잘못된 커서: {cursor}")
+    # 필터 문자열에 그대로 들어가므로 날짜로 파싱해서 다시 만든 값만 사용
+    try:
+        created_at = datetime.fromisoformat(created_at.replace("Z", "+00:00")).isoformat()
+    except ValueError as e:
+        raise InvalidCursor(f"잘못된 커서: {cursor}") from e
+    return created_at, row_id
+
+
+def older_than_filter(cursor: str) -> str:
+    """
+    최신순 목록에서 커서보다 오래된 행만 남기는 PostgREST or 필터
+    created_at < c OR (created_at = c AND id < i)
+
+    Raises:
+        InvalidCursor: 형식이 맞지 않는 커서
+    """
+    created_at, row_id = decode_cursor(cursor)
+    return f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt.{row_id})'
+
+
+def page(rows: list, limit: int) -> tuple:
+    """
+    limit + 1개 조회한 결과를 한 페이지로 자름
+
+    Returns:
+        tuple: (limit개 이하의 행, has_more, next_cursor - 더 없으면 None)
+    """
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor: Optional[str] = encode_cursor(rows[-1]) if has_more else None
+    return rows, has_more, next_cursor
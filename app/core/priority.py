@@ -0,0 +1,58 @@
+# app/core/priority.py
+"""
+추론 작업 우선순위 클래스
+대화형 채팅(interactive)을 백그라운드/대량 분석(background)보다 먼저 실행하고
+오래 기다린 작업은 aging으로 우선순위를 올려서 굶지 않도록 함
+
+- 값이 작을수록 먼저 실행
+- 실행 중인 작업의 우선순위는 contextvar로 전달 (MicroBatcher가 배치 순서 결정에 사용)
+"""
+from contextvars import ContextVar
+import time
+from app.core.config import settings
+
+INTERACTIVE = 0
+BACKGROUND = 1
+
+PRIORITY_CLASSES = {
+    "interactive": INTERACTIVE,
+    "background": BACKGROUND,
+}
+PRIORITY_NAMES = {value: name for name, value in PRIORITY_CLASSES.items()}
+
+_current_priority: ContextVar[int] = ContextVar("inference_priority", default=INTERACTIVE)
+
+
+def priority_of(name: str) -> int:
+    """설정 문자열("interactive"/"background") → 우선순위 값"""
+    try:
+        return PRIORITY_CLASSES[name.lower()]
+    except KeyError:
+        raise ValueError(f"알 수 없는 우선순위 클래스: {name} (허용: {list(PRIORITY_CLASSES)})")
+
+
+def priority_name(priority: int) -> str:
+    return PRIORITY_NAMES.get(priority, str(priority))
+
+
+def current_priority() -> int:
+    """현재 실행 중인 추론 작업의 우선순위"""
+    return _current_priority.get()
+
+
+def set_current_priority(priority: int) -> None:
+    _current_priority.set(priority)
+
+
+def effective_priority(priority: int, enqueued_at: float, now: float = None) -> float:
+    """
+    aging 적용 우선순위: PRIORITY_AGING_SECONDS만큼 기다릴 때마다 한 단계씩 올라감
+
+    Args:
+        priority: 기본 우선순위
+        enqueued_at: 대기 시작 시각 (time.perf_counter 기준)
+    """
+    if settings.PRIORITY_AGING_SECONDS <= 0:
+        return priority
+    waited = (now if now is not None else time.perf_counter()) - enqueued_at
+    return priority - waited / settings.PRIORITY_AGING_SECONDS
@@ -1,19 +1,33 @@
-from fastapi import FastAPI, Depends
+import time
+
+# 시작 시간 측정 (import 시간 / 포트 오픈까지 걸린 시간 리포트용)
+_IMPORT_STARTED_AT = time.perf_counter()
+
+from fastapi import FastAPI, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from contextlib import asynccontextmanager
+import asyncio
 import logging
 
-from app.core.database import get_db
+from app.core.config import settings
+from app.core.database import get_db, close_supabase, close_async_supabase
+from app.core.db_stats import start_db_stats
+from app.core.metrics import metrics
 from app.api import prescription
 from app.api.auth import router as auth_router
 from app.api.users import router as users_router
 from app.api.hospitals import router as hospitals_router
 from app.api.drug import router as drug_router
 
-# Agent 초기화 함수 import
-from app.AImodels.agent_factory import initialize_global_agent
+# 지연 로딩 모델 (import 시점에는 가중치를 로드하지 않음)
+from app.AImodels.agent_factory import llm_model
+from app.AImodels.model_loader import model_statuses, memory_report
+from app.services.ai_service import ai_service
+from app.services.analysis_worker import analysis_workers
+from app.services.chat_writer import chat_writer
 
 # 로깅 설정
 logging.basicConfig(
@@ -22,30 +36,55 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# 시작 시간 리포트 (/health/startup)
+STARTUP_REPORT = {
+    "import_seconds": round(time.perf_counter() - _IMPORT_STARTED_AT, 3),
+    "time_to_listen_seconds": None,
+}
+
 # Lifespan 이벤트 (앱 시작/종료 시 실행)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """앱 시작 시 Agent 초기화"""
+    """앱 시작 시 모델을 백그라운드에서 로드 (포트는 바로 열림)"""
     logger.info("=" * 80)
     logger.info("🚀 새로이안 백엔드 서버 시작 중...")
     logger.info("=" * 80)
     
-    try:
-        logger.info("📦 LangChain Agent 초기화 중...")
-        initialize_global_agent()
-        logger.info("✅ LangChain Agent 초기화 완료")
-    except Exception as e:
-        logger.error(f"❌ Agent 초기화 실패: {e}")
-        logger.warning("⚠️  채팅 기능이 제한될 수 있습니다.")
+    if settings.MODEL_PRELOAD:
+        logger.info("📦 LangChain Agent 백그라운드 로드 시작...")
+        llm_model.load_in_background()
+    if settings.VL_MODEL_PRELOAD and ai_service.vl_model is not None:
+        logger.info("📦 VL 모델 백그라운드 로드 시작...")
+        ai_service.vl_model.load_in_background()
+    
+    # 백그라운드 처방전 분석 워커
+    analysis_workers.start()
+    if settings.ANALYSIS_RECOVER_PENDING:
+        try:
+            analysis_workers.recover_pending()
+        except Exception as e:
+            logger.error(f"❌ Pending 분석 작업 복구 실패: {e}")
+    
+    # 채팅 메시지 write-behind 저장 (CHAT_WRITE_BEHIND, 스풀 파일에 남은 메시지부터 저장)
+    chat_writer.start()
+    
+    STARTUP_REPORT["time_to_listen_seconds"] = round(time.perf_counter() - _IMPORT_STARTED_AT, 3)
     
     logger.info("=" * 80)
-    logger.info("✅ 서버 시작 완료!")
+    logger.info(
+        f"✅ 서버 시작 완료! (import {STARTUP_REPORT['import_seconds']}s, "
+        f"listen {STARTUP_REPORT['time_to_listen_seconds']}s)"
+    )
     logger.info("=" * 80)
     
     yield
     
     logger.info("👋 서버 종료 중...")
+    # 남은 메시지 저장 (Supabase 클라이언트를 닫기 전에)
+    await asyncio.to_thread(chat_writer.stop)
+    close_supabase()
+    await close_async_supabase()
 
 # FastAPI 앱 인스턴스
 app = FastAPI(
@@ -63,31 +102,93 @@ app.add_middleware(
     max_age=3600,
 )
 
+@app.middleware("http")
+async def db_stats_middleware(request: Request, call_next):
+    """
+    요청별 DB 왕복 횟수/대기 시간 집계 (app.core.db_stats)
+    응답 헤더 X-DB-Round-Trips / X-DB-Time-Ms 로 반환하고 메트릭에 기록
+    (스트리밍 응답은 헤더를 보내기 전까지의 호출만 포함)
+    """
+    stats = start_db_stats()
+    response = await call_next(request)
+    response.headers.update(stats.headers())
+    metrics.observe("db.round_trips_per_request", stats.round_trips)
+    metrics.observe("db.wait_ms_per_request", stats.wait_ms)
+    return response
+
 @app.get("/")
 def root():
     return {"message": "새로이안 API"}
 
-@app.get("/health")
-def health_check(db: Session = Depends(get_db)):
-    """데이터베이스 및 Agent 상태 확인"""
+def _check_database(db: Session) -> str:
     try:
         db.execute(text("SELECT 1"))
-        db_status = "connected ✅"
+        return "connected ✅"
     except Exception as e:
-        db_status = f"disconnected ❌: {str(e)}"
+        return f"disconnected ❌: {str(e)}"
+
+@app.get("/health")
+def health_check(db: Session = Depends(get_db)):
+    """데이터베이스 및 Agent 상태 확인"""
+    db_status = _check_database(db)
     
     # Agent 상태 확인
     from app.AImodels.agent_factory import initial_agent, huggingfacehub
     
-    return {
+    health = {
         "status": "healthy" if "✅" in db_status else "unhealthy",
         "database": db_status,
         "langchain_agent": {
             "initialized": initial_agent is not None and initial_agent,
             "llm_loaded": huggingfacehub is not None
+        },
+        "models": model_statuses(),
+        "model_memory": memory_report()
+    }
+    # VL_BACKEND=remote: VL 모델은 VQA 서버 상태로 확인
+    if ai_service.client is not None:
+        health["vqa_server"] = ai_service.client.health()
+    return health
+
+@app.get("/health/live")
+def liveness_check():
+    """프로세스가 살아서 요청을 받는지만 확인 (모델/DB 상태와 무관)"""
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+def readiness_check(db: Session = Depends(get_db)):
+    """
+    트래픽을 받을 준비가 됐는지 확인
+    - DB 연결 + 채팅용 LLM 사용 가능(로드 완료, 또는 첫 요청 때 로드할 예정) 시 200, 아니면 503
+    - 모델별 로드 상태(not_loaded/loading/ready/failed)와 로드 시간 포함
+    """
+    db_status = _check_database(db)
+    # 아직 로드 전(MODEL_PRELOAD=False)이거나 메모리 예산 때문에 내려간 LLM은 다음 요청에서 로드되므로 준비 상태로 봄
+    # 로딩 중이거나 로드에 실패했을 때만 준비 안 됨
+    ready = "✅" in db_status and llm_model.is_available
+    
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if ready else "not_ready",
+            "database": db_status,
+            "models": model_statuses()
         }
+    )
+
+@app.get("/health/startup")
+def startup_report():
+    """시작 시간 리포트 (import 시간, 포트 오픈까지 시간, 모델별 로드 시간)"""
+    return {
+        **STARTUP_REPORT,
+        "models": model_statuses()
     }
 
+@app.get("/metrics")
+def get_metrics():
+    """프로세스 내부 메트릭 조회 (추론 대기시간/실행시간 등)"""
+    return metrics.snapshot()
+
 # 라우터 등록
 app.include_router(auth_router)
 app.include_router(users_router)
@@ -0,0 +1,141 @@
+# app/repositories/chat_repository.py
+"""
+prescription_chats 테이블 비동기 접근 (async 엔드포인트용)
+DB_BACKEND=sql이면 기록 조회/메시지 저장은 직접 SQL 경로(sql_repository) 사용
+"""
+from datetime import datetime, timedelta, timezone
+from supabase import AsyncClient
+from typing import Optional
+import asyncio
+from app.core.config import settings
+from app.core.pagination import older_than_filter, page
+from app.repositories import sql_repository
+
+TABLE = "prescription_chats"
+
+
+def history_limit() -> Optional[int]:
+    """
+    Agent 메모리에 필요한 최근 메시지 수 (full 모드면 None = 전체)
+    bounded 모드는 윈도우 + 요약을 만들 이전 메시지
+    """
+    if settings.CHAT_MEMORY_MODE == "full":
+        return None
+    return settings.CHAT_HISTORY_WINDOW + settings.CHAT_SUMMARY_SOURCE_MESSAGES
+
+
+async def load_history(supabase: AsyncClient, user_id: str, limit: Optional[int] = None) -> list:
+    """
+    사용자의 채팅 기록 (시간 순서, 오래된 것부터)
+    chat_service.load_chat_history_from_db의 비동기 버전
+    
+    Args:
+        limit: 최근 N개만 조회 (None이면 전체)
+    """
+    if sql_repository.enabled():
+        return await asyncio.to_thread(sql_repository.load_history, user_id, limit)
+    
+    if limit is None:
+        result = await supabase.table(TABLE).select("*").eq(
+            "user_id", user_id
+        ).order("created_at").execute()
+        return result.data or []
+    
+    result = await supabase.table(TABLE).select(
+        "id, message, sender_type, created_at"
+    ).eq("user_id", user_id).order("created_at", desc=True).limit(limit).execute()
+    return list(reversed(result.data)) if result.data else []
+
+
+async def save_message(
+    supabase: AsyncClient,
+    user_id: str,
+    prescription_id: Optional[int],
+    message: str,
+    sender_type: str
+) -> Optional[dict]:
+    """채팅 메시지 저장 후 저장된 행 반환"""
+    if sql_repository.enabled():
+        return await asyncio.to_thread(
+            sql_repository.insert_message, user_id, prescription_id, message, sender_type
+        )
+    
+    result = await supabase.table(TABLE).insert({
+        "user_id": user_id,
+        "prescription_id": prescription_id,
+        "message": message,
+        "sender_type": sender_type
+    }).execute()
+    return result.data[0] if result.data else None
+
+
+def turn_rows(
+    user_id: str,
+    prescription_id: Optional[int],
+    user_message: str,
+    ai_response: str,
+    user_created_at: Optional[datetime] = None
+) -> list:
+    """
+    대화 한 턴(사용자 메시지 + AI 응답)의 저장할 행
+
+    한 번에 INSERT하면 두 행의 기본값 created_at(now())이 같아지므로 시간을 직접 지정
+    - 사용자 메시지: 요청을 받은 시각 (user_created_at, 없으면 지금)
+    - AI 응답: 지금 (항상 사용자 메시지보다 뒤)
+    """
+    now = datetime.now(timezone.utc)
+    user_created_at = user_created_at or now
+    ai_created_at = max(now, user_created_at + timedelta(milliseconds=1))
+    return [
+        {
+            "user_id": user_id,
+            "prescription_id": prescription_id,
+            "message": message,
+            "sender_type": sender_type,
+            "created_at": created_at.isoformat()
+        }
+        for message, sender_type, created_at in (
+            (user_message, "user", user_created_at),
+            (ai_response, "ai", ai_created_at),
+        )
+    ]
+
+
+async def save_messages(supabase: AsyncClient, rows: list) -> list:
+    """채팅 메시지 여러 건을 INSERT 한 번으로 저장 후 저장된 행 반환"""
+    if sql_repository.enabled():
+        return await asyncio.to_thread(sql_repository.insert_messages, rows)
+    
+    result = await supabase.table(TABLE).insert(rows).execute()
+    return result.data or []
+
+
+async def list_messages(
+    supabase: AsyncClient,
+    user_id: str,
+    prescription_id: Optional[int] = None,
+    limit: int = 25,
+    cursor: Optional[str] = None
+) -> tuple:
+    """
+    메시지 한 페이지 - 커서보다 오래된 최근 limit개 ((created_at, id) keyset)
+    
+    Args:
+        cursor: 이전 페이지의 next_cursor (None이면 가장 최근 페이지)
+    
+    Returns:
+        tuple: (메시지 - 시간 순서, 오래된 것부터 - 채팅 UI 표시용, has_more, next_cursor)
+    
+    Raises:
+        InvalidCursor: 형식이 맞지 않는 커서
+    """
+    query = supabase.table(TABLE).select(
+        "id, user_id, prescription_id, message, sender_type, created_at"
+    ).eq("user_id", user_id)
+    if prescription_id is not None:
+        query = query.eq("prescription_id", prescription_id)
+    if cursor:
+        query = query.or_(older_than_filter(cursor))
+    result = await query.order("created_at", desc=True).order("id", desc=True).limit(limit + 1).execute()
+    messages, has_more, next_cursor = page(result.data or [], limit)
+    return list(reversed(messages)), has_more, next_cursor
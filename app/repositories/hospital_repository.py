@@ -0,0 +1,15 @@
+# app/repositories/hospital_repository.py
+"""
+hospitals 테이블 비동기 접근 (async 엔드포인트용)
+"""
+from supabase import AsyncClient
+
+TABLE = "hospitals"
+
+
+async def list_hospitals(supabase: AsyncClient, offset: int, limit: int) -> list:
+    """병원 목록 (등록순, offset부터 limit개)"""
+    result = await supabase.table(TABLE).select("*").range(
+        offset, offset + limit - 1
+    ).order("created_at", desc=False).execute()
+    return result.data or []
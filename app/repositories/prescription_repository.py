@@ -0,0 +1,82 @@
+# app/repositories/prescription_repository.py
+"""
+prescriptions 테이블 비동기 접근 (async 엔드포인트용)
+이벤트 루프를 막지 않도록 비동기 Supabase 클라이언트(app.core.database.get_async_supabase) 사용
+DB_BACKEND=sql이면 단건 조회는 직접 SQL 경로(sql_repository) 사용
+"""
+from supabase import AsyncClient
+from typing import Optional
+import asyncio
+from app.core.pagination import older_than_filter, page
+from app.repositories import sql_repository
+
+TABLE = "prescriptions"
+
+# 목록 화면에 필요한 컬럼 (ai_analysis 전문은 단건 조회에서만)
+LIST_COLUMNS = "id, user_id, file_url, original_filename, analysis_status, created_at"
+
+
+async def create_prescription(supabase: AsyncClient, data: dict) -> dict:
+    """처방전 저장 후 저장된 행 반환"""
+    result = await supabase.table(TABLE).insert(data).execute()
+    return result.data[0]
+
+
+async def get_prescription(supabase: AsyncClient, prescription_id: int, columns: str = "*") -> Optional[dict]:
+    """처방전 조회 (없으면 None)"""
+    if sql_repository.enabled():
+        return await asyncio.to_thread(sql_repository.get_prescription, prescription_id, columns)
+    
+    result = await supabase.table(TABLE).select(columns).eq("id", prescription_id).execute()
+    return result.data[0] if result.data else None
+
+
+async def list_user_prescriptions(
+    supabase: AsyncClient,
+    user_id: str,
+    limit: int,
+    cursor: Optional[str] = None
+) -> tuple:
+    """
+    사용자의 처방전 목록 한 페이지 (최신순, (created_at, id) keyset)
+    
+    Args:
+        cursor: 이전 페이지의 next_cursor (None이면 첫 페이지)
+    
+    Returns:
+        tuple: (처방전 목록 - LIST_COLUMNS만, has_more, next_cursor)
+    
+    Raises:
+        InvalidCursor: 형식이 맞지 않는 커서
+    """
+    query = supabase.table(TABLE).select(LIST_COLUMNS).eq("user_id", user_id)
+    if cursor:
+        query = query.or_(older_than_filter(cursor))
+    result = await query.order("created_at", desc=True).order("id", desc=True).limit(limit + 1).execute()
+    return page(result.data or [], limit)
+
+
+async def update_analysis_status(
+    supabase: AsyncClient,
+    prescription_id: int,
+    status: str,
+    only_if: Optional[str] = None
+) -> bool:
+    """
+    analysis_status 변경
+    
+    Args:
+        only_if: 현재 상태가 이 값일 때만 변경 (조회 + 변경을 한 번의 조건부 UPDATE로 처리)
+    
+    Returns:
+        변경된 행이 있는지 여부
+    """
+    query = supabase.table(TABLE).update({"analysis_status": status}).eq("id", prescription_id)
+    if only_if is not None:
+        query = query.eq("analysis_status", only_if)
+    result = await query.execute()
+    return bool(result.data)
+
+
+async def delete_prescription(supabase: AsyncClient, prescription_id: int) -> None:
+    await supabase.table(TABLE).delete().eq("id", prescription_id).execute()
@@ -0,0 +1,178 @@
+# app/repositories/sql_repository.py
+"""
+자주 쓰는 조회의 직접 SQL 경로 (DB_BACKEND=sql)
+PostgREST(HTTPS) 대신 DATABASE_URL의 Postgres에 SQLAlchemy 커넥션 풀로 직접 연결
+
+- 채팅 기록 조회 / 처방전 단건 조회 / 채팅 메시지 저장 (단건, 여러 건 한 번에)
+- DB_PREPARED_STATEMENTS=True: 커넥션에서 처음 실행할 때 PREPARE 해두고 EXECUTE로 실행 (파싱/플랜 재사용)
+  PREPARE가 실패하면(스키마 불일치 등) 그 커넥션에서는 그 쿼리만 text()로 실행 (다른 쿼리/커넥션은 영향 없음)
+  PgBouncer transaction 모드 풀러(Supabase 6543 포트 등)는 연결 간 prepared statement를 공유하지 못하므로 False
+- False: 모듈 수준 text() 구문 (SQLAlchemy 컴파일 캐시 재사용)
+
+동기 함수 (psycopg2) - async 리포지토리에서는 asyncio.to_thread로 호출
+반환 형식은 PostgREST와 같게 맞춤 (dict, 날짜는 ISO 문자열)
+"""
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Optional
+import time
+import logging
+from sqlalchemy import event, text
+from sqlalchemy.exc import DBAPIError
+from app.core.config import settings
+from app.core.database import engine
+from app.core.db_stats import record_round_trip
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+CHAT_COLUMNS = "id, user_id, prescription_id, message, sender_type, created_at"
+# SELECT *는 PREPARE 시점의 행 형식으로 고정되어 컬럼이 추가/삭제되면 EXECUTE가 실패하므로 컬럼을 명시
+PRESCRIPTION_COLUMNS = "id, user_id, file_url, file_key, original_filename, ai_analysis, analysis_status, created_at"
+
+# 풀 커넥션 info에 저장하는 PREPARE 결과 (이름 → 성공 여부, 커넥션이 다시 만들어지면 비어 있음)
+_PREPARED_KEY = "prepared_statements"
+
+# 이름 → (PREPARE 본문, 같은 쿼리의 text() 버전)
+_STATEMENTS = {
+    "load_chat_history": (
+        # LIMIT NULL = 전체
+        f"""SELECT * FROM (
+                SELECT {CHAT_COLUMNS} FROM prescription_chats
+                WHERE user_id = $1 ORDER BY created_at DESC LIMIT $2
+            ) recent ORDER BY created_at""",
+        text(f"""SELECT * FROM (
+                SELECT {CHAT_COLUMNS} FROM prescription_chats
+                WHERE user_id = :user_id ORDER BY created_at DESC LIMIT :limit
+            ) recent ORDER BY created_at"""),
+    ),
+    "get_prescription": (
+        f"SELECT {PRESCRIPTION_COLUMNS} FROM prescriptions WHERE id = $1",
+        text(f"SELECT {PRESCRIPTION_COLUMNS} FROM prescriptions WHERE id = :prescription_id"),
+    ),
+    "insert_chat_message": (
+        f"""INSERT INTO prescription_chats (user_id, prescription_id, message, sender_type)
+            VALUES ($1, $2, $3, $4) RETURNING {CHAT_COLUMNS}""",
+        text(f"""INSERT INTO prescription_chats (user_id, prescription_id, message, sender_type)
+            VALUES (:user_id, :prescription_id, :message, :sender_type) RETURNING {CHAT_COLUMNS}"""),
+    ),
+}
+
+
+def enabled() -> bool:
+    return settings.DB_BACKEND == "sql"
+
+
+# ============================================
+# 커넥션 이벤트
+# ============================================
+
+@event.listens_for(engine, "before_cursor_execute")
+def _before_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info["db_stats_started_at"] = time.perf_counter()
+
+
+@event.listens_for(engine, "after_cursor_execute")
+def _after_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    # 직접 SQL 경로도 요청별 DB 왕복 통계에 포함
+    record_round_trip(conn.info.pop("db_stats_started_at", None))
+
+
+# ============================================
+# 실행
+# ============================================
+
+def _prepare(conn, name: str) -> bool:
+    """
+    이 커넥션에서 name을 처음 실행하면 PREPARE (커넥션이 살아 있는 동안 유지)
+
+    Returns:
+        bool: EXECUTE로 실행할 수 있는지 (PREPARE가 실패했으면 이 커넥션에서는 계속 False)
+    """
+    prepared = conn.connection.info.setdefault(_PREPARED_KEY, {})
+    if name not in prepared:
+        try:
+            # 실패해도 바깥 트랜잭션은 계속 쓸 수 있도록 SAVEPOINT 안에서 실행
+            with conn.begin_nested():
+                conn.exec_driver_sql(f"PREPARE {name} AS {_STATEMENTS[name][0]}")
+            prepared[name] = True
+        except DBAPIError as e:
+            prepared[name] = False
+            metrics.inc("db.prepare_failures")
+            logger.warning(f"⚠️ PREPARE {name} 실패, 이 커넥션에서는 prepared statement 없이 실행: {e}")
+    return prepared[name]
+
+
+def _execute(conn, name: str, params: dict):
+    if settings.DB_PREPARED_STATEMENTS and _prepare(conn, name):
+        placeholders = ", ".join(["%s"] * len(params))
+        return conn.exec_driver_sql(f"EXECUTE {name}({placeholders})", tuple(params.values()))
+    return conn.execute(_STATEMENTS[name][1], params)
+
+
+def _to_dict(row) -> dict:
+    """PostgREST 응답과 같은 형식 (날짜는 ISO 문자열)"""
+    return {
+        key: value.isoformat() if isinstance(value, (datetime, date)) else value
+        for key, value in row._mapping.items()
+    }
+
+
+def load_history(user_id: str, limit: Optional[int] = None) -> list:
+    """채팅 기록 (시간 순서, 오래된 것부터, limit이 None이면 전체)"""
+    with engine.connect() as conn:
+        result = _execute(conn, "load_chat_history", {"user_id": user_id, "limit": limit})
+        return [_to_dict(row) for row in result]
+
+
+def get_prescription(prescription_id: int, columns: str = "*") -> Optional[dict]:
+    """처방전 단건 조회 (columns는 PostgREST select 문자열과 같은 형식, "*"와 각 컬럼은 PRESCRIPTION_COLUMNS 범위)"""
+    with engine.connect() as conn:
+        row = _execute(conn, "get_prescription", {"prescription_id": prescription_id}).first()
+    if row is None:
+        return None
+    prescription = _to_dict(row)
+    if columns.strip() == "*":
+        return prescription
+    return {name.strip(): prescription[name.strip()] for name in columns.split(",")}
+
+
+@lru_cache(maxsize=32)
+def _bulk_insert_statement(columns: tuple, row_count: int, skip_duplicates: bool):
+    """여러 행 INSERT 구문 (컬럼/행 수별로 한 번만 만들어 재사용, 행 수가 바뀌므로 PREPARE 대신 text())"""
+    rows = ", ".join(
+        "(" + ", ".join(f":{column}_{i}" for column in columns) + ")" for i in range(row_count)
+    )
+    conflict = " ON CONFLICT (client_message_id) DO NOTHING" if skip_duplicates else ""
+    return text(
+        f"INSERT INTO prescription_chats ({', '.join(columns)}) VALUES {rows}{conflict} RETURNING {CHAT_COLUMNS}"
+    )
+
+
+def insert_messages(rows: list, skip_duplicates: bool = False) -> list:
+    """
+    채팅 메시지 여러 건을 INSERT 한 번으로 저장 후 저장된 행 반환
+
+    Args:
+        rows: 저장할 행 (모두 같은 컬럼)
+        skip_duplicates: client_message_id가 이미 있는 행은 건너뜀 (write-behind 재전송)
+    """
+    if not rows:
+        return []
+    columns = tuple(rows[0])
+    params = {f"{column}_{i}": row[column] for i, row in enumerate(rows) for column in columns}
+    with engine.begin() as conn:
+        result = conn.execute(_bulk_insert_statement(columns, len(rows), skip_duplicates), params)
+        return [_to_dict(row) for row in result]
+
+
+def insert_message(user_id: str, prescription_id: Optional[int], message: str, sender_type: str) -> dict:
+    """채팅 메시지 저장 후 저장된 행 반환"""
+    with engine.begin() as conn:
+        row = _execute(conn, "insert_chat_message", {
+            "user_id": user_id,
+            "prescription_id": prescription_id,
+            "message": message,
+            "sender_type": sender_type,
+        }).first()
+    return _to_dict(row)
@@ -0,0 +1,19 @@
+# app/repositories/user_repository.py
+"""
+users 테이블 비동기 접근 (async 엔드포인트용)
+"""
+from supabase import AsyncClient
+from typing import Optional
+
+TABLE = "users"
+
+
+async def get_user(supabase: AsyncClient, user_id: int) -> Optional[dict]:
+    result = await supabase.table(TABLE).select("*").eq("id", user_id).execute()
+    return result.data[0] if result.data else None
+
+
+async def update_user(supabase: AsyncClient, user_id: int, data: dict) -> Optional[dict]:
+    """사용자 정보 변경 후 변경된 행 반환 (없으면 None)"""
+    result = await supabase.table(TABLE).update(data).eq("id", user_id).execute()
+    return result.data[0] if result.data else None
@@ -1,78 +1,244 @@
 # app/services/ai_service.py
 import os
+import time
 from PIL import Image
 from dotenv import load_dotenv
-from app.AImodels.qwen_model import QwenModel
-from typing import Optional
+from app.AImodels.model_loader import LazyModel, ModelUnavailable
+from app.AImodels.batching import MicroBatcher
+from app.AImodels.image_preprocess import preprocess_signature
+from app.core.config import settings
+from app.core.cancellation import CancellationToken, RequestCancelled, DEADLINE_EXCEEDED, current_token
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple, Union
 
 # .env 로드
 load_dotenv()
 hf_token = os.getenv("HUGGINGFACE_TOKEN")
 
+VL_MODEL_NAME = os.getenv("VL_MODEL_NAME", "Rfy23/qwen2vl-ko-zh")
+# 분석 결과 캐시 키에 포함 (모델/가중치가 바뀌면 값을 올려서 캐시 무효화)
+VL_MODEL_VERSION = os.getenv("VL_MODEL_VERSION", VL_MODEL_NAME)
+VL_MAX_NEW_TOKENS = int(os.getenv("VL_MAX_NEW_TOKENS", "128"))
+# 동시에 들어온 처방전 분석을 한 번의 generate로 묶음 (VL_BATCH_MAX_SIZE=1이면 비활성화)
+# LLM 배칭과 같이 추론 워커(INFERENCE_WORKERS)가 2개 이상일 때만 기본으로 켬 (워커 1개면 묶을 요청 없이 max_wait만 기다림)
+VL_BATCH_MAX_SIZE = int(os.getenv("VL_BATCH_MAX_SIZE", "4" if settings.INFERENCE_WORKERS > 1 else "1"))
+VL_BATCH_MAX_WAIT_MS = float(os.getenv("VL_BATCH_MAX_WAIT_MS", "20"))
+# 모델 복사본 수 (메모리가 허용하면 늘려서 동시에 추론) / 추론 한 번의 torch 스레드 수 (0이면 코어 수 / 복사본 수)
+# torch 스레드 수는 프로세스 전체 설정이라 LLM/VL 중 작은 값이 적용됨 (replica_pool.reserve_threads)
+VL_REPLICAS = int(os.getenv("VL_REPLICAS", "1"))
+VL_THREADS_PER_REPLICA = int(os.getenv("VL_THREADS_PER_REPLICA", "0"))
+# 로드 전 예상 메모리 (MODEL_MEMORY_BUDGET_MB 계산용, Qwen2-VL-2B float32 기준)
+VL_FOOTPRINT_MB = int(os.getenv("VL_FOOTPRINT_MB", "9000"))
+DEFAULT_PROMPT = "这张处方上写了什么？"
+
+
+def _load_qwen_model():
+    # transformers/qwen_vl_utils import도 무거워서 로드 시점까지 미룸
+    from app.AImodels.qwen_model import QwenModel
+    from app.AImodels.vision_cache import vision_cache
+    from app.AImodels.image_preprocess import VL_MIN_PIXELS, VL_MAX_PIXELS
+    from app.AImodels.replica_pool import ReplicaPool
+    return ReplicaPool(
+        "vl",
+        lambda: QwenModel(
+            model_name=VL_MODEL_NAME,
+            vision_cache=vision_cache,
+            min_pixels=VL_MIN_PIXELS,
+            max_pixels=VL_MAX_PIXELS
+        ),
+        size=VL_REPLICAS,
+        threads_per_replica=VL_THREADS_PER_REPLICA or None
+    )
+
+
 class AIService:
-    def __init__(self):
-        # 모델 인스턴스 한 번만 생성
-        self.qwen_model = QwenModel()
-    
-    async def analyze_prescription(self, image: Image.Image, prompt: Optional[str] = None) -> str:
+    def __init__(self, backend: str = settings.VL_BACKEND):
         """
-        처방전 이미지 분석 (비동기)
-        
         Args:
-            image: PIL.Image 객체
-            prompt: 분석 프롬프트 (기본값: 중국어 질문)
-        
-        Returns:
-            str: 모델 예측 텍스트
+            backend: "local" (이 프로세스에서 모델 로드) | "remote" (VQA 서버에 요청, 모델 메모리 없음)
         """
-        if prompt is None:
-            prompt = "这张处方上写了什么？"
+        self.backend = backend.lower()
+        # 분석 캐시 키: 모델 버전 + 전처리 설정 (흑백/자르기/픽셀 예산이 바뀌면 이전 결과를 재사용하지 않음)
+        self.model_version = f"{VL_MODEL_VERSION}+{preprocess_signature()}"
+        self.vl_model = None
+        self.batcher = None
+        self.client = None
         
-        messages = [
+        if self.backend == "remote":
+            from app.services.vqa_client import create_vqa_client
+            self.client = create_vqa_client()
+            return
+        
+        # 모델은 import 시점이 아니라 처음 사용할 때(또는 백그라운드에서) 한 번만 로드
+        self.vl_model = LazyModel("vl", _load_qwen_model, footprint_mb=VL_FOOTPRINT_MB * VL_REPLICAS)
+        if VL_BATCH_MAX_SIZE > 1:
+            self.batcher = MicroBatcher(
+                run_batch=self._run_batch,
+                max_batch_size=VL_BATCH_MAX_SIZE,
+                max_wait_ms=VL_BATCH_MAX_WAIT_MS,
+                name="vl_batch",
+                num_workers=VL_REPLICAS  # 레플리카마다 배치 하나씩 동시에 실행
+            )
+    
+    @property
+    def replicas(self):
+        """QwenModel 레플리카 풀 (checkout()으로 대여해서 사용)"""
+        return self.vl_model.get()
+    
+    def cached_image_features(self, image_key: Optional[str]) -> Optional[dict]:
+        """
+        같은 이미지의 비전 인코더 캐시 항목 (후속 질문은 이미지 다운로드/전처리 없이 analyze_prescription_sync에 전달)
+        원격 백엔드(캐시는 VQA 서버에 있음)이거나 모델을 한 번도 로드하지 않았으면 None
+        """
+        if not image_key or self.vl_model is None or self.vl_model.load_count == 0:
+            return None
+        from app.AImodels.vision_cache import vision_cache
+        return vision_cache.get(image_key)
+    
+    @staticmethod
+    def _build_messages(image: Union[Image.Image, dict], prompt: str) -> list:
+        # 캐시 항목(dict)이면 이미지 자리만 남김 (이미지 토큰 수는 캐시의 image_grid_thw로 계산)
+        return [
             {
                 "role": "user",
                 "content": [
-                    {"type": "image", "image": image},
+                    {"type": "image", "image": None if isinstance(image, dict) else image},
                     {"type": "text", "text": f"<image>\n{prompt}"} 
                 ]
             }
         ]
+    
+    def _run_batch(self, payloads: List[tuple]) -> List[str]:
+        """MicroBatcher용: (image, prompt, max_new_tokens, image_key, cancel) 리스트를 한 번에 추론"""
+        messages_list = [self._build_messages(payload[0], payload[1]) for payload in payloads]
+        # 추론 중에는 메모리 예산 때문에 언로드되지 않음
+        with self.vl_model.use() as replicas, replicas.checkout() as qwen_model:
+            return qwen_model.predict_batch(
+                messages_list,
+                max_new_tokens=[payload[2] for payload in payloads],
+                image_keys=[payload[3] for payload in payloads],
+                cancels=[payload[4] for payload in payloads],
+                image_entries=[payload[0] if isinstance(payload[0], dict) else None for payload in payloads]
+            )
+    
+    def analyze_prescriptions_batch(
+        self,
+        images: List[Image.Image],
+        prompts: Optional[List[str]] = None,
+        max_new_tokens: Optional[List[int]] = None,
+        image_keys: Optional[List[str]] = None
+    ) -> List[str]:
+        """
+        여러 처방전 이미지를 한 번의 generate 호출로 분석
+        
+        Args:
+            images: PIL.Image 리스트
+            prompts: 이미지별 프롬프트 (기본값: 중국어 질문)
+            max_new_tokens: 이미지별 최대 생성 토큰 수 (기본값: VL_MAX_NEW_TOKENS)
+            image_keys: 이미지별 비전 인코더 캐시 키 (예: content hash)
         
+        Returns:
+            List[str]: 이미지 순서대로 모델 예측 텍스트
+        """
+        prompts = prompts or [DEFAULT_PROMPT] * len(images)
+        max_new_tokens = max_new_tokens or [VL_MAX_NEW_TOKENS] * len(images)
+        image_keys = image_keys or [None] * len(images)
         try:
-            output_text_list = self.qwen_model.predict(messages)
-            return output_text_list[0] if output_text_list else ""
+            if self.client is not None:
+                # 원격: 동시에 보내면 VQA 서버에서 한 배치로 묶임
+                with ThreadPoolExecutor(max_workers=len(images)) as pool:
+                    return list(pool.map(self.client.predict, images, prompts, max_new_tokens, image_keys))
+            return self._run_batch(
+                [(*item, None) for item in zip(images, prompts, max_new_tokens, image_keys)]
+            )
         except Exception as e:
             raise Exception(f"AI 분석 중 오류 발생: {str(e)}")
     
-    def analyze_prescription_sync(self, image: Image.Image, prompt: Optional[str] = None) -> str:
+    async def analyze_prescription(self, image: Image.Image, prompt: Optional[str] = None) -> str:
         """
-        처방전 이미지 분석 (동기) - Tool에서 사용
+        처방전 이미지 분석 (비동기)
         
         Args:
             image: PIL.Image 객체
             prompt: 분석 프롬프트 (기본값: 중국어 질문)
         
+        Returns:
+            str: 모델 예측 텍스트
+        """
+        return self.analyze_prescription_sync(image, prompt)
+    
+    def _predict_remote(
+        self,
+        image: Image.Image,
+        prompt: str,
+        max_new_tokens: int,
+        image_key: Optional[str],
+        token: Optional[CancellationToken]
+    ) -> str:
+        """
+        VQA 서버 호출 (요청 마감 시각까지 남은 시간만 기다리고, 요청이 취소되면 연결을 끊어서 서버 디코딩도 중단)
+        
+        Raises:
+            RequestCancelled: 클라이언트 연결 끊김 또는 마감 시각까지 응답이 없는 경우 (분석 실패가 아니라 취소로 처리)
+        """
+        from app.services.vqa_client import VQAServerTimeout
+        
+        remaining = None
+        if token is not None and token.deadline is not None:
+            remaining = max(0.0, token.deadline - time.monotonic())
+        try:
+            return self.client.predict(image, prompt, max_new_tokens, image_key, timeout=remaining, cancel=token)
+        except VQAServerTimeout:
+            if remaining is not None and remaining < self.client.timeout:
+                token.cancel(DEADLINE_EXCEEDED)
+                raise RequestCancelled(token.reason)
+            raise
+    
+    def analyze_prescription_sync(
+        self,
+        image: Union[Image.Image, dict],
+        prompt: Optional[str] = None,
+        max_new_tokens: int = VL_MAX_NEW_TOKENS,
+        image_key: Optional[str] = None
+    ) -> str:
+        """
+        처방전 이미지 분석 (동기) - Tool에서 사용
+        동시에 들어온 다른 분석 요청과 배치로 묶여 실행될 수 있음
+        
+        Args:
+            image: PIL.Image 객체 또는 cached_image_features()가 반환한 캐시 항목 (로컬 백엔드만)
+            prompt: 분석 프롬프트 (기본값: 중국어 질문)
+            max_new_tokens: 최대 생성 토큰 수
+            image_key: 비전 인코더 캐시 키 (같은 이미지의 후속 질문은 vision tower 생략)
+        
         Returns:
             str: 모델 예측 텍스트
         """
         if prompt is None:
-            prompt = "这张处方上写了什么？"
+            prompt = DEFAULT_PROMPT
         
-        messages = [
-            {
-                "role": "user",
-                "content": [
-                    {"type": "image", "image": image},
-                    {"type": "text", "text": f"<image>\n{prompt}"} 
-                ]
-            }
-        ]
+        # 요청 취소 토큰 (클라이언트 연결 끊김/마감 시간 초과 시 디코딩 중단)
+        token = current_token()
+        if token is not None:
+            token.raise_if_cancelled()
+        cancel = (token, None) if token is not None else None
         
         try:
-            output_text_list = self.qwen_model.predict(messages)
-            return output_text_list[0] if output_text_list else ""
+            if self.client is not None:
+                result = self._predict_remote(image, prompt, max_new_tokens, image_key, token)
+            elif self.batcher is not None:
+                result = self.batcher.run((image, prompt, max_new_tokens, image_key, cancel))
+            else:
+                result = self._run_batch([(image, prompt, max_new_tokens, image_key, cancel)])[0]
+        except (RequestCancelled, ModelUnavailable):
+            raise
         except Exception as e:
             raise Exception(f"AI 분석 중 오류 발생: {str(e)}")
+        
+        # 생성 도중 취소됐으면 잘린 결과는 버림
+        if token is not None:
+            token.raise_if_cancelled()
+        return result
 
 # 싱글톤 인스턴스
 ai_service = AIService()
\ No newline at end of file
@@ -0,0 +1,157 @@
+# app/services/analysis_cache.py
+"""
+처방전 이미지 분석 결과 캐시
+(이미지 content hash, 프롬프트, 모델 버전) 기준으로 VL 분석 결과를 저장해서
+같은 이미지를 다시 올리면 Qwen2-VL을 다시 돌리지 않고 바로 반환
+
+- 1차: 프로세스 메모리 LRU
+- 2차: Supabase vl_analysis_cache 테이블 (프로세스 재시작/다른 워커와 공유, VL_CACHE_DB=True일 때만)
+- 옵션: perceptual hash가 가까운(다시 찍은) 이미지도 메모리 캐시에서 재사용
+  (같은 사용자가 올린 이미지끼리만 - 다른 사용자의 비슷한 처방전 분석 결과를 돌려주지 않도록)
+"""
+from collections import OrderedDict
+from supabase import Client
+from typing import Optional
+import threading
+import logging
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.image_hash import hamming_distance
+
+logger = logging.getLogger(__name__)
+
+CACHE_TABLE = "vl_analysis_cache"
+
+
+class AnalysisCache:
+    def __init__(self, max_entries: int, use_db: bool):
+        """
+        Args:
+            max_entries: 메모리 캐시 최대 항목 수
+            use_db: vl_analysis_cache 테이블 사용 여부 (마이그레이션 적용 후 켬)
+        """
+        self.max_entries = max_entries
+        self.use_db = use_db
+        self._entries: "OrderedDict[tuple, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _record(self, result: str) -> None:
+        """hit/miss 집계 및 hit rate 갱신"""
+        metrics.inc(f"vl_cache.{result}")
+        hits = metrics.get_counter("vl_cache.hit") + metrics.get_counter("vl_cache.perceptual_hit")
+        total = hits + metrics.get_counter("vl_cache.miss")
+        metrics.set_gauge("vl_cache.hit_rate", round(hits / total, 4) if total else 0.0)
+
+    def _get_memory(self, key: tuple) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry["analysis"]
+
+    def _put_memory(self, key: tuple, analysis: str, perceptual_hash: Optional[str], user_id: Optional[int]) -> None:
+        with self._lock:
+            self._entries[key] = {"analysis": analysis, "perceptual_hash": perceptual_hash, "user_id": user_id}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _get_db(self, supabase: Client, key: tuple) -> Optional[str]:
+        """vl_analysis_cache 테이블 조회 (찾으면 메모리 캐시에도 저장, 조회 실패는 None)"""
+        content_hash, prompt, model_version = key
+        try:
+            result = supabase.table(CACHE_TABLE).select("analysis, perceptual_hash, user_id").eq(
+                "content_hash", content_hash
+            ).eq("prompt", prompt).eq("model_version", model_version).limit(1).execute()
+        except Exception as e:
+            logger.warning(f"분석 캐시 조회 실패 (메모리 캐시만 사용): {e}")
+            return None
+        if not result.data:
+            return None
+        row = result.data[0]
+        self._put_memory(key, row["analysis"], row.get("perceptual_hash"), row.get("user_id"))
+        return row["analysis"]
+
+    def _find_similar(self, prompt: str, model_version: str, perceptual_hash: str, user_id: int) -> Optional[str]:
+        """perceptual hash 거리가 임계값 이하인 항목 검색 (같은 사용자/프롬프트/모델 버전만)"""
+        threshold = settings.VL_CACHE_PERCEPTUAL_MAX_DISTANCE
+        with self._lock:
+            for (_, entry_prompt, entry_version), entry in reversed(self._entries.items()):
+                if entry_prompt != prompt or entry_version != model_version:
+                    continue
+                if entry["user_id"] is None or entry["user_id"] != user_id:
+                    continue
+                if entry["perceptual_hash"] and hamming_distance(entry["perceptual_hash"], perceptual_hash) <= threshold:
+                    return entry["analysis"]
+        return None
+
+    def get(
+        self,
+        supabase: Client,
+        content_hash: str,
+        prompt: str,
+        model_version: str,
+        perceptual_hash: Optional[str] = None,
+        user_id: Optional[int] = None
+    ) -> Optional[str]:
+        """
+        캐시된 분석 결과 조회
+        content hash가 같으면 사용자와 관계없이 재사용 (같은 바이트의 이미지),
+        perceptual hash 근사 매칭은 user_id가 같은 항목만 (user_id가 없으면 근사 매칭 안 함)
+
+        Returns:
+            분석 결과 텍스트 (없으면 None)
+        """
+        key = (content_hash, prompt, model_version)
+
+        analysis = self._get_memory(key)
+        if analysis is not None:
+            self._record("hit")
+            return analysis
+
+        if self.use_db:
+            analysis = self._get_db(supabase, key)
+            if analysis is not None:
+                self._record("hit")
+                return analysis
+
+        if perceptual_hash and user_id is not None:
+            analysis = self._find_similar(prompt, model_version, perceptual_hash, user_id)
+            if analysis is not None:
+                self._record("perceptual_hit")
+                return analysis
+
+        self._record("miss")
+        return None
+
+    def put(
+        self,
+        supabase: Client,
+        content_hash: str,
+        prompt: str,
+        model_version: str,
+        analysis: str,
+        perceptual_hash: Optional[str] = None,
+        user_id: Optional[int] = None
+    ) -> None:
+        """분석 결과 저장 (DB 저장 실패는 무시하고 메모리 캐시는 유지)"""
+        self._put_memory((content_hash, prompt, model_version), analysis, perceptual_hash, user_id)
+        if not self.use_db:
+            return
+
+        try:
+            supabase.table(CACHE_TABLE).upsert({
+                "content_hash": content_hash,
+                "prompt": prompt,
+                "model_version": model_version,
+                "perceptual_hash": perceptual_hash,
+                "user_id": user_id,
+                "analysis": analysis
+            }, on_conflict="content_hash,prompt,model_version").execute()
+        except Exception as e:
+            logger.warning(f"분석 캐시 저장 실패: {e}")
+
+
+# 싱글톤 인스턴스
+analysis_cache = AnalysisCache(max_entries=settings.VL_ANALYSIS_CACHE_SIZE, use_db=settings.VL_CACHE_DB)
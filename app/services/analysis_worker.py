@@ -0,0 +1,170 @@
+# app/services/analysis_worker.py
+"""
+Analysis Worker Module
+업로드 요청과 분리된 백그라운드 처방전 분석
+로컬 작업 큐에서 prescription_id를 꺼내 VL 분석 후 ai_analysis / analysis_status 저장
+클라이언트는 GET /prescriptions/{id}/analysis 로 상태를 폴링
+
+analysis_status 흐름은 app/core/analysis_status.py 참고
+(pending → processing → completed/failed, 오래된 processing/analyzing은 다시 가져감)
+
+분석은 추론 스레드 풀에 PRIORITY_ANALYSIS(기본 background) 우선순위로 제출해서
+대화형 채팅 요청이 먼저 실행되도록 함
+"""
+from datetime import datetime, timedelta, timezone
+import queue
+import threading
+import time
+import logging
+from app.core import analysis_status
+from app.core.config import settings
+from app.core.database import supabase_client
+from app.core.metrics import metrics
+from app.core.priority import priority_of
+from app.services.inference_executor import inference_executor, InferenceQueueFull
+from app.services.prescription_analysis import analyze_prescription_image
+
+logger = logging.getLogger(__name__)
+
+
+def _claimable_filter(now: datetime) -> str:
+    """워커가 가져갈 수 있는 행 (대기 중이거나 분석이 중단된 것으로 보이는 행)의 PostgREST or 필터"""
+    stale_before = (now - timedelta(seconds=settings.ANALYSIS_CLAIM_TIMEOUT_SECONDS)).isoformat()
+    in_progress = ",".join(analysis_status.IN_PROGRESS_STATUSES)
+    return (
+        f'analysis_status.eq.{analysis_status.PENDING},'
+        f'and(analysis_status.in.({in_progress}),claimed_at.lt."{stale_before}")'
+    )
+
+
+class AnalysisWorkerPool:
+    def __init__(self, num_workers: int, max_queue: int):
+        """
+        Args:
+            num_workers: 분석 워커 스레드 수
+            max_queue: 대기 가능한 분석 작업 수
+        """
+        self.num_workers = num_workers
+        self.priority = priority_of(settings.PRIORITY_ANALYSIS)
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._queued_ids = set()
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def start(self) -> None:
+        """워커 스레드 시작 (여러 번 호출해도 한 번만 시작)"""
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.num_workers):
+                thread = threading.Thread(target=self._worker_loop, name=f"analysis-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        logger.info(f"🧵 Analysis workers started: {self.num_workers}")
+
+    def is_full(self) -> bool:
+        return self._queue.full()
+
+    def enqueue(self, prescription_id: int) -> bool:
+        """
+        분석 작업 추가
+
+        Returns:
+            bool: 큐에 들어갔는지 여부 (이미 대기 중이면 True, 큐가 가득 찼으면 False)
+        """
+        with self._lock:
+            if prescription_id in self._queued_ids:
+                return True
+            try:
+                self._queue.put_nowait((prescription_id, time.perf_counter()))
+            except queue.Full:
+                metrics.inc("analysis_jobs.rejected")
+                return False
+            self._queued_ids.add(prescription_id)
+            metrics.set_gauge("analysis_jobs.queued", self._queue.qsize())
+        return True
+
+    def recover_pending(self, limit: int = 100) -> int:
+        """
+        서버 재시작으로 잃어버린 작업 복구: 대기 중(pending)이거나 오래된 분석 중(processing/analyzing) 처방전을 다시 큐에 넣음
+        다른 워커/요청이 처리 중인 행은 제외되고, 큐에 들어간 뒤에도 실제 처리는 _claim에 성공한 워커만 함
+
+        Returns:
+            다시 큐에 넣은 작업 수
+        """
+        supabase = supabase_client()
+        result = supabase.table("prescriptions").select("id").or_(
+            _claimable_filter(datetime.now(timezone.utc))
+        ).order("created_at").limit(limit).execute()
+
+        recovered = sum(1 for row in (result.data or []) if self.enqueue(row["id"]))
+        if recovered:
+            logger.info(f"♻️ Recovered {recovered} pending analysis jobs")
+        return recovered
+
+    def _submit(self, fn, *args):
+        """추론 스레드 풀에 제출 (대기열이 가득 차면 자리가 날 때까지 재시도)"""
+        while True:
+            try:
+                return inference_executor.submit(fn, *args, priority=self.priority)
+            except InferenceQueueFull:
+                metrics.inc("analysis_jobs.throttled")
+                time.sleep(1.0)
+
+    def _claim(self, supabase, prescription_id: int) -> bool:
+        """
+        처리할 행을 조건부 UPDATE 한 번으로 가져감 (여러 워커/프로세스가 동시에 시도해도 한 곳만 성공)
+
+        Returns:
+            bool: 가져왔는지 여부 (이미 다른 곳에서 처리 중이거나 끝난 행이면 False)
+        """
+        now = datetime.now(timezone.utc)
+        result = supabase.table("prescriptions").update({
+            "analysis_status": analysis_status.PROCESSING,
+            "claimed_at": now.isoformat()
+        }).eq("id", prescription_id).or_(_claimable_filter(now)).execute()
+        return bool(result.data)
+
+    def _run_job(self, prescription_id: int) -> None:
+        supabase = supabase_client()
+        try:
+            claimed = self._claim(supabase, prescription_id)
+        except Exception as e:
+            # 행 상태는 바뀌지 않았으므로 다음 복구 때 다시 처리
+            metrics.inc("analysis_jobs.failed")
+            logger.error(f"❌ Analysis claim failed: prescription_id={prescription_id}: {e}")
+            return
+        if not claimed:
+            metrics.inc("analysis_jobs.skipped")
+            logger.info(f"⏭️ Analysis already claimed or finished: prescription_id={prescription_id}")
+            return
+        started_at = time.perf_counter()
+        try:
+            # 실패 시 analyze_prescription_image가 analysis_status='failed'로 기록
+            self._submit(analyze_prescription_image, supabase, str(prescription_id)).result()
+            metrics.inc("analysis_jobs.completed")
+            logger.info(f"✅ Background analysis completed: prescription_id={prescription_id}")
+        except Exception as e:
+            metrics.inc("analysis_jobs.failed")
+            logger.error(f"❌ Background analysis failed: prescription_id={prescription_id}: {e}")
+        finally:
+            metrics.observe("analysis_jobs.execution_ms", (time.perf_counter() - started_at) * 1000)
+
+    def _worker_loop(self) -> None:
+        while True:
+            prescription_id, enqueued_at = self._queue.get()
+            with self._lock:
+                self._queued_ids.discard(prescription_id)
+                metrics.set_gauge("analysis_jobs.queued", self._queue.qsize())
+            metrics.observe("analysis_jobs.queue_wait_ms", (time.perf_counter() - enqueued_at) * 1000)
+            try:
+                self._run_job(prescription_id)
+            finally:
+                self._queue.task_done()
+
+
+# 싱글톤 인스턴스
+analysis_workers = AnalysisWorkerPool(
+    num_workers=settings.ANALYSIS_WORKERS,
+    max_queue=settings.ANALYSIS_QUEUE_SIZE
+)
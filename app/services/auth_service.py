@@ -2,24 +2,26 @@
 import httpx
 from supabase import create_client, Client
 from app.core.config import settings
+from app.core.database import supabase_client
 from app.core.security import create_access_token, create_refresh_token
 from app.models.user import UserCreate, UserInDB
 from typing import Optional
 
-# Supabase 클라이언트 초기화
-supabase: Client = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+# 로그인/회원가입 전용 Supabase 클라이언트
+# (auth 호출은 클라이언트의 세션을 바꾸므로 공용 클라이언트와 분리, 테이블 조회는 supabase_client() 사용)
+auth_client: Client = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
 
 # ============================================
 # 기존 이메일/비밀번호 로그인 (유지)
 # ============================================
 def sign_in(email, password):
     """이메일/비밀번호 로그인"""
-    user = supabase.auth.sign_in_with_password({"email": email, "password": password})
+    user = auth_client.auth.sign_in_with_password({"email": email, "password": password})
     return user
 
 def sign_up(email, password):
     """이메일/비밀번호 회원가입"""
-    user = supabase.auth.sign_up({"email": email, "password": password})
+    user = auth_client.auth.sign_up({"email": email, "password": password})
     return user
 
 # ============================================
@@ -41,6 +43,7 @@ def get_or_create_user(google_user_data: dict) -> UserInDB:
     """Google 사용자 정보로 DB에서 조회 또는 생성"""
     google_id = google_user_data.get("id")
     email = google_user_data.get("email")
+    supabase = supabase_client()
     
     # 기존 사용자 조회
     result = supabase.table("users").select("*").eq("google_id", google_id).execute()
@@ -5,35 +5,165 @@ Supabase DB 기반 채팅 메모리 관리 및 Agent 실행
 사용자당 하나의 세션 유지 (session_id = user_id)
 """
 from supabase import Client
-from app.AImodels.agent_factory import create_agent_executor
+from app.AImodels.agent_factory import (
+    run_agent,
+    compose_answer,
+    TOOLS_BY_NAME,
+    count_tokens,
+)
+from app.AImodels.intent_router import route_query, Route
+from app.AImodels.tools import tool_user_scope
+from app.AImodels.model_loader import ModelUnavailable
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.cancellation import CancellationToken, RequestCancelled, current_token
+from app.repositories import sql_repository, chat_repository
+from app.services.chat_writer import chat_writer
 from langchain.memory import ConversationBufferMemory
-from langchain.schema import HumanMessage, AIMessage
+from langchain.schema import HumanMessage, AIMessage, SystemMessage
+from langchain_core.callbacks import BaseCallbackHandler
+from datetime import datetime
+from typing import Any, Callable, Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
+# 요약에 남길 메시지당 최대 글자 수
+SUMMARY_SNIPPET_CHARS = 60
 
-def load_chat_history_from_db(supabase: Client, user_id: str) -> list:
+# ReAct 출력에서 최종 답변이 시작되는 표시
+FINAL_ANSWER_MARKER = "Final Answer:"
+
+
+def load_chat_history_from_db(supabase: Client, user_id: str, limit: Optional[int] = None) -> list:
     """
-    Supabase에서 사용자의 모든 채팅 기록 조회
+    Supabase에서 사용자의 채팅 기록 조회
+    
+    Args:
+        supabase: Supabase 클라이언트
+        user_id: 사용자 ID
+        limit: 최근 N개만 조회 (DB에서 limit 적용, None이면 전체)
+        
+    Returns:
+        시간 순서(오래된 것부터)로 정렬된 채팅 기록 (write-behind 대기 중인 메시지 포함)
     """
     try:
-        result = supabase.table("prescription_chats").select("*").eq(
-            "user_id", user_id
-        ).order("created_at").execute()
+        if sql_repository.enabled():
+            history = sql_repository.load_history(user_id, limit)
+        elif limit is None:
+            result = supabase.table("prescription_chats").select("*").eq(
+                "user_id", user_id
+            ).order("created_at").execute()
+            
+            history = result.data if result.data else []
+        else:
+            # 최근 메시지부터 limit개만 가져온 뒤 시간 순서로 뒤집기
+            result = supabase.table("prescription_chats").select(
+                "id, message, sender_type, created_at"
+            ).eq("user_id", user_id).order("created_at", desc=True).limit(limit).execute()
+            
+            history = list(reversed(result.data)) if result.data else []
         
-        return result.data if result.data else []
+        return chat_writer.with_pending(history, user_id, limit=limit)
     except Exception as e:
         logger.error(f"채팅 기록 조회 실패: {e}")
         return []
 
 
-def create_memory_from_history(chat_history: list) -> ConversationBufferMemory:
+def trim_history_to_budget(chat_history: list, token_budget: int, max_messages: int) -> tuple:
+    """
+    최신 메시지부터 토큰 예산 안에 들어가는 만큼만 유지
+    
+    Args:
+        chat_history: 시간 순서로 정렬된 채팅 기록
+        token_budget: 유지할 최대 토큰 수
+        max_messages: 유지할 최대 메시지 수
+        
+    Returns:
+        (유지할 메시지 리스트, 잘려나간 메시지 리스트) - 둘 다 시간 순서
+    """
+    used_tokens = 0
+    split_index = len(chat_history)
+    
+    for index in range(len(chat_history) - 1, -1, -1):
+        if len(chat_history) - index > max_messages:
+            break
+        tokens = count_tokens(chat_history[index]['message'])
+        if used_tokens + tokens > token_budget:
+            break
+        used_tokens += tokens
+        split_index = index
+    
+    return chat_history[split_index:], chat_history[:split_index]
+
+
+def summarize_messages(messages: list) -> str:
+    """
+    메모리에서 밀려난 메시지의 요약 (최근 메시지부터 CHAT_SUMMARY_TOKEN_BUDGET 안에 들어가는 만큼)
+    
+    LLM을 다시 호출하지 않고 메시지 앞부분만 발췌해서 요약을 만들기 때문에
+    대화가 길어져도 턴당 비용이 일정함. 매 턴 DB 기록에서 다시 만들므로
+    서버 재시작 / 다른 워커 프로세스에서도 같은 요약이 나옴
+    
+    Args:
+        messages: 메모리에서 빠진 메시지 (시간 순서)
+        
+    Returns:
+        요약 문자열 (없으면 빈 문자열)
+    """
+    lines = []
+    for msg in reversed(messages):
+        sender = "사용자" if msg['sender_type'] == 'user' else "AI"
+        snippet = " ".join(msg['message'].split())[:SUMMARY_SNIPPET_CHARS]
+        candidate = [f"{sender}: {snippet}"] + lines
+        if count_tokens("\n".join(candidate)) > settings.CHAT_SUMMARY_TOKEN_BUDGET:
+            break
+        lines = candidate
+    return "\n".join(lines)
+
+
+def create_bounded_memory(
+    supabase: Client,
+    user_id: str,
+    chat_history: Optional[list] = None
+) -> ConversationBufferMemory:
+    """
+    최근 대화 + 요약으로 구성된 크기 제한 메모리 생성
+    
+    - DB에서 최근 CHAT_HISTORY_WINDOW + CHAT_SUMMARY_SOURCE_MESSAGES개만 조회
+    - 토크나이저 기준 CHAT_HISTORY_TOKEN_BUDGET 안에 들어가는 최신 메시지만 유지 (최대 CHAT_HISTORY_WINDOW개)
+    - 나머지는 요약(CHAT_SUMMARY_TOKEN_BUDGET 이내)으로 유지
+    
+    Args:
+        supabase: Supabase 클라이언트
+        user_id: 사용자 ID
+        chat_history: 미리 조회한 최근 chat_repository.history_limit()개 기록 (None이면 DB에서 조회)
+        
+    Returns:
+        ConversationBufferMemory 인스턴스
+    """
+    if chat_history is None:
+        chat_history = load_chat_history_from_db(supabase, user_id, limit=chat_repository.history_limit())
+    
+    kept, dropped = trim_history_to_budget(
+        chat_history,
+        token_budget=settings.CHAT_HISTORY_TOKEN_BUDGET,
+        max_messages=settings.CHAT_HISTORY_WINDOW
+    )
+    summary = summarize_messages(dropped)
+    
+    logger.info(f"📚 Bounded memory: kept={len(kept)}, summarized={len(dropped)}")
+    
+    return create_memory_from_history(kept, summary=summary)
+
+
+def create_memory_from_history(chat_history: list, summary: Optional[str] = None) -> ConversationBufferMemory:
     """
     DB에서 가져온 채팅 기록을 LangChain Memory로 변환
     
     Args:
         chat_history: DB에서 조회한 채팅 기록
+        summary: 이전 대화 요약 (옵션, 메모리 맨 앞에 추가)
         
     Returns:
         ConversationBufferMemory 인스턴스
@@ -43,6 +173,9 @@ def create_memory_from_history(chat_history: list) -> ConversationBufferMemory:
         return_messages=True
     )
     
+    if summary:
+        memory.chat_memory.add_message(SystemMessage(content=f"이전 대화 요약:\n{summary}"))
+    
     # DB 기록을 메모리에 추가
     for msg in chat_history:
         if msg['sender_type'] == 'user':
@@ -55,11 +188,110 @@ def create_memory_from_history(chat_history: list) -> ConversationBufferMemory:
     return memory
 
 
+class AgentStreamHandler(BaseCallbackHandler):
+    """
+    Agent 실행 과정을 스트리밍 이벤트로 변환하는 콜백 핸들러
+    
+    이벤트 종류:
+        - tool_start: Tool 실행 시작 ({"tool", "tool_input"})
+        - tool_end: Tool 실행 완료 ({"tool", "output"})
+        - token: 최종 답변 토큰 ({"text"}) - "Final Answer:" 이후 텍스트 또는
+          "final_answer" 태그가 붙은 LLM 호출(라우터 경로 답변 작성)의 전체 텍스트
+    
+    콜백은 추론 스레드에서 호출되므로 emit은 스레드 안전해야 함
+    """
+    
+    def __init__(self, emit: Callable[[dict], None]):
+        self._emit = emit
+        self._buffer = ""
+        self._in_final_answer = False
+    
+    def on_llm_start(self, serialized: dict, prompts: list, **kwargs: Any) -> None:
+        # Agent 단계마다 LLM이 새로 호출되므로 버퍼 초기화
+        self._buffer = ""
+        self._in_final_answer = "final_answer" in (kwargs.get("tags") or [])
+    
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        if self._in_final_answer:
+            self._emit({"type": "token", "text": token})
+            return
+        
+        self._buffer += token
+        if FINAL_ANSWER_MARKER in self._buffer:
+            self._in_final_answer = True
+            remainder = self._buffer.split(FINAL_ANSWER_MARKER, 1)[1].lstrip()
+            if remainder:
+                self._emit({"type": "token", "text": remainder})
+    
+    def on_tool_start(self, serialized: dict, input_str: str, **kwargs: Any) -> None:
+        # 파싱 실패 시 LangChain이 넣는 내부 Tool은 제외
+        name = (serialized or {}).get("name") or kwargs.get("name")
+        if name == "_Exception":
+            return
+        self._emit({
+            "type": "tool_start",
+            "tool": name,
+            "tool_input": str(input_str)
+        })
+    
+    def on_tool_end(self, output: Any, **kwargs: Any) -> None:
+        name = kwargs.get("name")
+        if name == "_Exception":
+            return
+        self._emit({
+            "type": "tool_end",
+            "tool": name,
+            "output": str(output)[:500]
+        })
+
+
+class AgentRunStats(BaseCallbackHandler):
+    """요청 하나의 LLM 호출 수, 생성 토큰 수, ReAct 파싱 실패 수 집계"""
+    
+    def __init__(self):
+        self.llm_calls = 0
+        self.generated_tokens = 0
+        self.parse_failures = 0
+    
+    def on_llm_start(self, serialized: dict, prompts: list, **kwargs: Any) -> None:
+        self.llm_calls += 1
+    
+    def on_llm_end(self, response: Any, **kwargs: Any) -> None:
+        for generations in response.generations:
+            for generation in generations:
+                info = generation.generation_info or {}
+                self.generated_tokens += info.get("generated_tokens", 0)
+    
+    def on_agent_action(self, action: Any, **kwargs: Any) -> None:
+        # handle_parsing_errors=True일 때 파싱 실패는 "_Exception" 액션으로 들어옴
+        if action.tool == "_Exception":
+            self.parse_failures += 1
+
+
+class CancellationHandler(BaseCallbackHandler):
+    """Agent 단계(Tool 실행, 다음 액션) 사이마다 요청 취소 여부 확인"""
+    
+    # 콜백 예외를 무시하지 않고 Agent 실행까지 전파
+    raise_error = True
+    
+    def __init__(self, token: CancellationToken):
+        self.token = token
+    
+    def on_agent_action(self, action: Any, **kwargs: Any) -> None:
+        self.token.raise_if_cancelled()
+    
+    def on_tool_start(self, serialized: dict, input_str: str, **kwargs: Any) -> None:
+        self.token.raise_if_cancelled()
+
+
 def process_chat_with_db(
     supabase: Client,
     user_id: str,
     user_query: str,
-    prescription_analysis: dict = None
+    prescription_analysis: dict = None,
+    callbacks: Optional[list] = None,
+    chat_history: Optional[list] = None,
+    route: Optional[Route] = None
 ) -> str:
     """
     DB 기반 채팅 처리
@@ -69,16 +301,26 @@ def process_chat_with_db(
         user_id: 사용자 ID (= session_id)
         user_query: 사용자 질문
         prescription_analysis: 처방전 분석 결과 (옵션)
+        callbacks: Agent 실행 콜백 핸들러 (옵션, 스트리밍용)
+        chat_history: 엔드포인트에서 미리 조회한 채팅 기록 (옵션, chat_repository.history_limit()개)
+            - 없으면 여기서 DB 조회
+        route: 바로 실행할 Tool (옵션, 엔드포인트가 소유권을 확인한 처방전 - intent_router.prescription_route)
+            - 없으면 user_query로 약물 이름 라우팅, 그 외에는 ReAct Agent
         
     Returns:
         AI 응답
+    
+    Raises:
+        RequestCancelled: 클라이언트 연결 끊김 또는 요청 시간 예산 초과 (current_token() 기준)
     """
     try:
-        # 1. DB에서 과거 채팅 기록 로드 (최근 3개만)
-        chat_history = load_chat_history_from_db(supabase, user_id)
-        
-        # 2. 메모리 생성
-        memory = create_memory_from_history(chat_history)
+        # 1-2. DB에서 과거 채팅 기록 로드 후 메모리 생성
+        if settings.CHAT_MEMORY_MODE == "full":
+            if chat_history is None:
+                chat_history = load_chat_history_from_db(supabase, user_id)
+            memory = create_memory_from_history(chat_history)
+        else:
+            memory = create_bounded_memory(supabase, user_id, chat_history)
         
         # 3. 프롬프트 생성
         enhanced_query = user_query
@@ -92,15 +334,59 @@ def process_chat_with_db(
         
         logger.info(f"💬 Processing query for user: {user_id}")
         
-        # 4. Agent 실행
-        agent = create_agent_executor(memory)
-        result = agent.invoke({"input": enhanced_query})
-        ai_response = result.get("output", "응답을 생성할 수 없습니다.")
+        stats = AgentRunStats()
+        callbacks = (callbacks or []) + [stats]
+        token = current_token()
+        if token is not None:
+            token.raise_if_cancelled()
+            callbacks.append(CancellationHandler(token))
         
-        logger.info(f"🤖 AI response generated")
+        # 4. 의도가 명확하면 Tool을 바로 실행하고 LLM은 답변 작성에만 사용
+        if route is None and not prescription_analysis:
+            route = route_query(user_query)
+        # Tool(VL 분석)은 이 사용자의 처방전만 접근
+        with tool_user_scope(user_id):
+            if route is not None:
+                logger.info(f"⚡ Fast path: {route.tool_name}({route.tool_input})")
+                if token is not None:
+                    token.steps = 1  # 답변 작성 LLM 호출 1회에 남은 시간 예산 전부 사용
+                observation = TOOLS_BY_NAME[route.tool_name].invoke(
+                    route.tool_input,
+                    config={"callbacks": callbacks}
+                )
+                ai_response = compose_answer(
+                    enhanced_query, route.tool_name, str(observation), memory, callbacks=callbacks
+                )
+                metrics.inc("router.fast_path")
+            else:
+                # 5. 그 외에는 ReAct Agent 실행
+                result = run_agent(enhanced_query, memory, callbacks=callbacks)
+                ai_response = result.get("output", "응답을 생성할 수 없습니다.")
+                metrics.inc("router.agent")
+        
+        metrics.observe("chat.llm_calls_per_request", stats.llm_calls)
+        metrics.observe(
+            "chat.llm_calls_per_request.fast_path" if route else "chat.llm_calls_per_request.agent",
+            stats.llm_calls
+        )
+        metrics.observe("chat.generated_tokens_per_request", stats.generated_tokens)
+        metrics.observe("chat.parse_failures_per_request", stats.parse_failures)
+        metrics.inc("agent.parse_failures", stats.parse_failures)
+        
+        logger.info(
+            f"🤖 AI response generated (LLM calls: {stats.llm_calls}, "
+            f"tokens: {stats.generated_tokens}, parse failures: {stats.parse_failures})"
+        )
         
         return ai_response
         
+    except RequestCancelled as e:
+        metrics.inc(f"chat.cancelled.{e.reason}")
+        logger.info(f"🛑 Chat cancelled for user {user_id}: {e.reason}")
+        raise
+    except ModelUnavailable:
+        # 로드 실패 모델은 백그라운드에서 재시도 중 - 엔드포인트에서 503으로 응답
+        raise
     except Exception as e:
         logger.error(f"❌ Chat processing error: {e}")
         import traceback
@@ -130,6 +416,11 @@ def save_message_to_db(
         저장된 메시지 데이터
     """
     try:
+        if sql_repository.enabled():
+            saved = sql_repository.insert_message(user_id, prescription_id, message, sender_type)
+            logger.info(f"💾 Message saved: {sender_type}")
+            return saved
+        
         data = {
             "user_id": user_id,
             "prescription_id": prescription_id,
@@ -148,6 +439,36 @@ def save_message_to_db(
         raise
 
 
+def save_turn_to_db(
+    supabase: Client,
+    user_id: str,
+    prescription_id: Optional[int],
+    user_message: str,
+    ai_response: str,
+    user_created_at: Optional[datetime] = None
+) -> None:
+    """
+    대화 한 턴(사용자 메시지 + AI 응답)을 한 번에 저장
+    CHAT_WRITE_BEHIND=True면 write-behind 대기열에 넣고 바로 반환 (대기열이 가득 차면 바로 저장)
+    
+    Args:
+        user_created_at: 사용자 메시지 시각 (요청을 받은 시각, 없으면 지금)
+    """
+    rows = chat_repository.turn_rows(user_id, prescription_id, user_message, ai_response, user_created_at)
+    if chat_writer.enqueue(rows):
+        return
+    
+    try:
+        if sql_repository.enabled():
+            sql_repository.insert_messages(rows)
+        else:
+            supabase.table("prescription_chats").insert(rows).execute()
+        logger.info("💾 Turn saved: user + ai")
+    except Exception as e:
+        logger.error(f"대화 저장 실패: {e}")
+        raise
+
+
 # AI 파트 호환성을 위한 Alias 함수
 
 def get_history_from_supabase(session_id: str, supabase: Client = None) -> str:
@@ -197,10 +518,7 @@ def save_history_to_supabase(
         logger.warning(f"[{session_id}] Supabase 클라이언트가 없어 저장을 건너뜁니다.")
         return
     
-    # 사용자 메시지 저장
-    save_message_to_db(supabase, session_id, prescription_id, user_input, "user")
-    
-    # AI 응답 저장
-    save_message_to_db(supabase, session_id, prescription_id, ai_response, "ai")
+    # 사용자 메시지 + AI 응답 한 번에 저장
+    save_turn_to_db(supabase, session_id, prescription_id, user_input, ai_response)
     
     logger.info(f"[{session_id}] 대화 기록이 Supabase에 저장됨.")
\ No newline at end of file
@@ -0,0 +1,405 @@
+# app/services/chat_writer.py
+"""
+Chat Writer Module
+채팅 메시지 write-behind 저장 (CHAT_WRITE_BEHIND=True)
+엔드포인트는 메시지를 대기열에 넣고 바로 응답, 저장 스레드가 CHAT_WRITE_BATCH_SIZE개가 모이거나
+CHAT_WRITE_FLUSH_SECONDS가 지나면 여러 턴의 메시지를 INSERT 한 번으로 저장
+
+- 대기열에 넣기 전에 스풀 파일(JSONL)에 기록 후 fsync → 프로세스가 죽어도 재시작 시 다시 저장
+- 메시지마다 client_message_id를 정해두고 ON CONFLICT DO NOTHING으로 저장 (재전송해도 중복 없음)
+- 저장에 성공하면 스풀 파일을 남은 대기 메시지로 다시 씀
+- 배치가 CHAT_WRITE_MAX_ATTEMPTS번 연속 실패하면 반씩 나눠 저장해서 실패하는 메시지만 골라냄
+  다른 메시지는 저장되는데 혼자 실패하는 메시지(잘못된 행, 제약 위반)는 dead-letter 파일(스풀 경로 + .dead)로 옮김
+  전부 실패하면 DB 장애로 보고 아무것도 버리지 않고 계속 재시도
+- 워커 프로세스마다 다른 스풀 파일: CHAT_WRITE_SPOOL_PATH, .1, .2 … 중 잠기지 않은 슬롯을 잠가서 사용
+  (시작할 때 잠기지 않은 다른 슬롯 = 종료된 프로세스의 스풀도 가져와서 저장)
+- 대기열이 가득 차면 enqueue가 False → 호출한 쪽이 요청 안에서 바로 저장
+- 아직 저장되지 않은 메시지도 채팅 기록 조회에 포함 (with_pending)
+"""
+from datetime import datetime, timezone
+from typing import Optional
+import fcntl
+import json
+import os
+import threading
+import time
+import uuid
+import logging
+from app.core.config import settings
+from app.core.database import supabase_client
+from app.core.metrics import metrics
+from app.repositories import sql_repository
+
+logger = logging.getLogger(__name__)
+
+TABLE = "prescription_chats"
+
+# 저장 실패 시 재시도 간격(초, 실패할 때마다 두 배)
+RETRY_MIN_SECONDS = 0.5
+RETRY_MAX_SECONDS = 10.0
+
+# 같은 CHAT_WRITE_SPOOL_PATH를 쓸 수 있는 워커 프로세스 수 (프로세스마다 슬롯 하나)
+MAX_SPOOL_SLOTS = 64
+
+
+# 시간을 알 수 없는 행은 맨 앞으로
+_EARLIEST = datetime.min.replace(tzinfo=timezone.utc)
+
+
+def _slot_path(base: str, slot: int) -> str:
+    return base if slot == 0 else f"{base}.{slot}"
+
+
+def _try_lock(path: str):
+    """
+    스풀 파일의 잠금 파일(path.lock)에 배타적 잠금 (프로세스가 끝나면 자동으로 풀림)
+
+    Returns:
+        잠금을 유지하는 파일 객체 (다른 프로세스가 잡고 있으면 None)
+    """
+    lock_file = open(f"{path}.lock", "a")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return None
+    return lock_file
+
+
+def _parse_created_at(value) -> Optional[datetime]:
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+class ChatWriter:
+    def __init__(
+        self,
+        batch_size: int,
+        flush_seconds: float,
+        max_pending: int,
+        spool_path: str,
+        max_attempts: int = 5
+    ):
+        """
+        Args:
+            batch_size: 한 번에 저장할 최대 메시지 수
+            flush_seconds: 첫 메시지가 들어온 뒤 저장까지 최대 대기 시간(초)
+            max_pending: 저장 대기 가능한 메시지 수
+            spool_path: 스풀 파일 경로 (빈 문자열이면 스풀 없음, 실제 파일은 start()에서 슬롯을 잠가서 정함)
+            max_attempts: 배치 저장을 이만큼 연속 실패하면 실패하는 메시지를 골라냄
+        """
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.max_pending = max_pending
+        self.max_attempts = max(1, max_attempts)
+        self.spool_base = spool_path
+        self.spool_path = ""
+        self._spool_lock = None
+        # 저장 대기 메시지 (먼저 들어온 순서, 앞에서부터 저장)
+        self._pending = []
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopping = False
+
+    @property
+    def enabled(self) -> bool:
+        return settings.CHAT_WRITE_BEHIND
+
+    def start(self) -> None:
+        """
+        스풀 파일의 저장 안 된 메시지를 다시 대기열에 넣고 저장 스레드 시작
+
+        Raises:
+            RuntimeError: 스풀 슬롯이 모두 다른 프로세스에서 사용 중 (서버 시작 실패)
+        """
+        if not self.enabled:
+            return
+        with self._cond:
+            if self._thread is not None:
+                return
+            if self.spool_base and self._spool_lock is None:
+                self.spool_path = self._claim_spool()
+            recovered = self._read_spool(self.spool_path)
+            orphans = self._lock_orphan_spools()
+            for path, _ in orphans:
+                recovered.extend(self._read_spool(path))
+            self._pending.extend(recovered)
+            # 마지막 줄이 잘린 채로 남았을 수 있으므로 정리해서 다시 씀
+            self._rewrite_spool()
+            # 가져온 메시지가 내 스풀에 기록된 뒤에 종료된 프로세스의 스풀 삭제
+            for path, lock_file in orphans:
+                os.remove(path)
+                lock_file.close()
+            self._stopping = False
+            self._thread = threading.Thread(target=self._flush_loop, name="chat-writer", daemon=True)
+            self._thread.start()
+        if recovered:
+            logger.info(f"♻️ Recovered {len(recovered)} unsaved chat messages from spool")
+        logger.info("🧵 Chat writer started")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """남은 메시지 저장 후 종료 (시간 안에 못 끝낸 메시지는 스풀에 남아 다음 시작 때 저장)"""
+        with self._cond:
+            thread = self._thread
+            if thread is None:
+                return
+            self._stopping = True
+            self._cond.notify_all()
+        thread.join(timeout)
+        with self._cond:
+            self._thread = None
+            if self._pending:
+                logger.warning(f"⚠️ Chat writer stopped with {len(self._pending)} unsaved messages (kept in spool)")
+
+    def enqueue(self, rows: list) -> bool:
+        """
+        메시지 저장 요청 (스풀 파일에 기록 후 대기열에 추가, 파일 I/O가 있으므로 이벤트 루프 밖에서 호출)
+
+        Returns:
+            bool: 대기열에 들어갔는지 여부 (비활성 또는 가득 찼으면 False → 호출한 쪽에서 바로 저장)
+        """
+        if not self.enabled or self._thread is None:
+            return False
+        rows = [{**row, "client_message_id": uuid.uuid4().hex} for row in rows]
+        with self._cond:
+            if len(self._pending) + len(rows) > self.max_pending:
+                metrics.inc("chat_writes.rejected")
+                return False
+            self._append_spool(rows)
+            self._pending.extend(rows)
+            metrics.set_gauge("chat_writes.pending", len(self._pending))
+            self._cond.notify_all()
+        return True
+
+    def with_pending(
+        self,
+        history: list,
+        user_id: str,
+        limit: Optional[int] = None,
+        prescription_id: Optional[int] = None
+    ) -> list:
+        """
+        DB에서 조회한 채팅 기록(시간 순서)에 아직 저장되지 않은 메시지를 합침
+
+        Args:
+            limit: 합친 뒤 최근 N개만 (None이면 전체)
+            prescription_id: 이 처방전의 메시지만 (None이면 전체)
+        """
+        if not self.enabled:
+            return history
+        with self._cond:
+            pending = [
+                row for row in self._pending
+                if str(row["user_id"]) == str(user_id)
+                and (prescription_id is None or row["prescription_id"] == prescription_id)
+            ]
+        if not pending:
+            return history
+
+        # 저장 직후 아직 대기열에서 빠지기 전이면 DB 조회 결과에도 있으므로 제외
+        saved = {
+            (row.get("sender_type"), row.get("message"), _parse_created_at(row.get("created_at")))
+            for row in history
+        }
+        merged = list(history) + [
+            row for row in pending
+            if (row["sender_type"], row["message"], _parse_created_at(row["created_at"])) not in saved
+        ]
+        merged.sort(key=lambda row: _parse_created_at(row.get("created_at")) or _EARLIEST)
+        return merged if limit is None else merged[-limit:]
+
+    # ============================================
+    # 저장 스레드
+    # ============================================
+
+    def _flush_loop(self) -> None:
+        retry_seconds = RETRY_MIN_SECONDS
+        attempts = 0
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopping:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                # 배치가 찰 때까지 flush_seconds만큼 기다림
+                deadline = time.monotonic() + self.flush_seconds
+                while len(self._pending) < self.batch_size and not self._stopping:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._pending[:self.batch_size]
+
+            started_at = time.perf_counter()
+            try:
+                self._insert(batch)
+            except Exception as e:
+                metrics.inc("chat_writes.failed")
+                attempts += 1
+                if attempts >= self.max_attempts and not self._stopping:
+                    attempts = 0
+                    if self._isolate_failures(batch):
+                        retry_seconds = RETRY_MIN_SECONDS
+                        continue
+                logger.error(f"❌ Chat write failed ({len(batch)} messages, retry in {retry_seconds}s): {e}")
+                if self._stopping:
+                    return
+                time.sleep(retry_seconds)
+                retry_seconds = min(retry_seconds * 2, RETRY_MAX_SECONDS)
+                continue
+            attempts = 0
+            retry_seconds = RETRY_MIN_SECONDS
+            metrics.observe("chat_writes.flush_ms", (time.perf_counter() - started_at) * 1000)
+            metrics.observe("chat_writes.batch_size", len(batch))
+            self._remove_pending(batch)
+
+    def _remove_pending(self, rows: list) -> None:
+        """저장(또는 dead-letter)이 끝난 메시지를 대기열과 스풀에서 제거"""
+        done = {row["client_message_id"] for row in rows}
+        with self._cond:
+            # 이 스레드만 앞에서부터 빼므로 batch가 그대로 맨 앞에 있음
+            head = self._pending[:self.batch_size]
+            self._pending[:self.batch_size] = [row for row in head if row["client_message_id"] not in done]
+            self._rewrite_spool()
+            metrics.set_gauge("chat_writes.pending", len(self._pending))
+
+    def _insert_split(self, rows: list, saved: list, failed: list) -> None:
+        """반씩 나눠 한 번씩 저장 시도 (혼자서도 실패하는 메시지만 failed에 남음)"""
+        try:
+            self._insert(rows)
+        except Exception as e:
+            if len(rows) == 1:
+                failed.append((rows[0], e))
+                return
+            middle = len(rows) // 2
+            self._insert_split(rows[:middle], saved, failed)
+            self._insert_split(rows[middle:], saved, failed)
+            return
+        saved.extend(rows)
+
+    def _isolate_failures(self, batch: list) -> bool:
+        """
+        계속 실패하는 배치에서 저장 가능한 메시지는 저장하고 혼자 실패하는 메시지는 dead-letter로 옮김
+
+        Returns:
+            bool: 대기열 맨 앞이 바뀌었는지 여부 (False면 전부 실패 - DB 장애로 보고 그대로 재시도)
+        """
+        saved, failed = [], []
+        self._insert_split(batch, saved, failed)
+        if not saved:
+            # 한 건도 저장되지 않으면 메시지 문제인지 DB 장애인지 알 수 없으므로 버리지 않음
+            return False
+        if failed:
+            self._dead_letter(failed)
+        self._remove_pending(saved + [row for row, _ in failed])
+        metrics.observe("chat_writes.batch_size", len(saved))
+        return True
+
+    def _dead_letter(self, failed: list) -> None:
+        """다시 저장할 수 없는 메시지를 dead-letter 파일(JSONL)에 기록 (스풀이 없으면 로그에만 남김)"""
+        metrics.inc("chat_writes.dead_lettered", len(failed))
+        entries = [{"row": row, "error": str(error)} for row, error in failed]
+        logger.error(f"☠️ Moving {len(failed)} chat messages to dead letter: {entries}")
+        if not self.spool_path:
+            return
+        with open(f"{self.spool_path}.dead", "a", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _insert(self, rows: list) -> None:
+        if sql_repository.enabled():
+            sql_repository.insert_messages(rows, skip_duplicates=True)
+            return
+        supabase_client().table(TABLE).upsert(
+            rows, on_conflict="client_message_id", ignore_duplicates=True
+        ).execute()
+
+    # ============================================
+    # 스풀 파일 (self._cond를 잡은 상태에서 호출)
+    # ============================================
+
+    def _claim_spool(self) -> str:
+        """
+        잠기지 않은 첫 스풀 슬롯을 잠그고 경로 반환 (같은 파일을 두 프로세스가 쓰지 않도록)
+
+        Raises:
+            RuntimeError: 모든 슬롯이 다른 프로세스에서 사용 중
+        """
+        for slot in range(MAX_SPOOL_SLOTS):
+            path = _slot_path(self.spool_base, slot)
+            lock_file = _try_lock(path)
+            if lock_file is not None:
+                self._spool_lock = lock_file
+                logger.info(f"📝 Chat write spool: {path}")
+                return path
+        raise RuntimeError(
+            f"CHAT_WRITE_SPOOL_PATH={self.spool_base}의 스풀 슬롯 {MAX_SPOOL_SLOTS}개가 모두 사용 중입니다."
+        )
+
+    def _lock_orphan_spools(self) -> list:
+        """
+        종료된 프로세스가 남긴 다른 슬롯의 스풀 파일 (잠금을 잡은 채로 반환, 호출한 쪽에서 삭제 후 해제)
+
+        Returns:
+            list: (경로, 잠금 파일 객체)
+        """
+        if not self.spool_path:
+            return []
+        orphans = []
+        for slot in range(MAX_SPOOL_SLOTS):
+            path = _slot_path(self.spool_base, slot)
+            if path == self.spool_path or not os.path.exists(path):
+                continue
+            lock_file = _try_lock(path)
+            if lock_file is not None:
+                orphans.append((path, lock_file))
+        return orphans
+
+    def _append_spool(self, rows: list) -> None:
+        if not self.spool_path:
+            return
+        with open(self.spool_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(rows, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _rewrite_spool(self) -> None:
+        """스풀 파일을 현재 대기 메시지로 교체 (임시 파일에 쓴 뒤 rename)"""
+        if not self.spool_path:
+            return
+        tmp_path = f"{self.spool_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            if self._pending:
+                f.write(json.dumps(self._pending, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.spool_path)
+
+    @staticmethod
+    def _read_spool(path: str) -> list:
+        if not path or not os.path.exists(path):
+            return []
+        rows = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rows.extend(json.loads(line))
+                except json.JSONDecodeError:
+                    # 기록 도중 종료되어 잘린 줄 (대기열에 들어가지 않았으므로 응답도 나가지 않은 메시지)
+                    logger.warning("⚠️ Skipping truncated chat spool line")
+        return rows
+
+
+# 싱글톤 인스턴스
+chat_writer = ChatWriter(
+    batch_size=settings.CHAT_WRITE_BATCH_SIZE,
+    flush_seconds=settings.CHAT_WRITE_FLUSH_SECONDS,
+    max_pending=settings.CHAT_WRITE_MAX_PENDING,
+    spool_path=settings.CHAT_WRITE_SPOOL_PATH,
+    max_attempts=settings.CHAT_WRITE_MAX_ATTEMPTS
+)
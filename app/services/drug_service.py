@@ -1,4 +1,5 @@
 # app/services/drug_service.py
+import re
 import requests
 from typing import Optional, Dict, Any
 import logging
@@ -57,6 +58,8 @@ def get_drug_info(drug_name: str) -> Dict[str, Any]:
         # 주요 정보만 추출
         return {
             "status": "success",
+            # 제품명이 검색어와 같은지 (부분 검색 결과가 아닌지)
+            "exact": normalize_item_name(matched_item.get("itemName", "")) == normalize_item_name(drug_name),
             "data": {
                 "entpName": matched_item.get("entpName", ""),
                 "itemName": matched_item.get("itemName", ""),
@@ -81,6 +84,11 @@ def get_drug_info(drug_name: str) -> Dict[str, Any]:
         }
 
 
+def normalize_item_name(name: str) -> str:
+    """제품명 비교용 (괄호 안 성분명, 공백 제거, 소문자)"""
+    return re.sub(r"\(.*?\)|\s+", "", name).lower()
+
+
 def find_exact_match(items: list, drug_name: str) -> Optional[Dict]:
     """
     검색 결과에서 약품명이 정확히 일치하는 항목 찾기
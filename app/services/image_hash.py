@@ -0,0 +1,52 @@
+# app/services/image_hash.py
+"""
+처방전 이미지 해시 계산
+- content hash: 파일 바이트의 SHA-256 (완전히 같은 파일)
+- perceptual hash: 64bit dHash (같은 처방전을 다시 찍은 비슷한 사진)
+"""
+from PIL import Image
+from io import BytesIO
+from typing import Optional
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+# dHash 크기 (8x8 = 64bit)
+DHASH_SIZE = 8
+
+
+def compute_content_hash(content: bytes) -> str:
+    """파일 바이트의 SHA-256 hex"""
+    return hashlib.sha256(content).hexdigest()
+
+
+def compute_perceptual_hash(content: bytes) -> Optional[str]:
+    """
+    difference hash(dHash) 계산: 축소한 흑백 이미지에서 인접 픽셀 밝기 비교
+
+    Returns:
+        16자리 hex 문자열 (이미지로 읽을 수 없으면 None, 예: PDF)
+    """
+    try:
+        image = Image.open(BytesIO(content))
+        image.draft("L", (DHASH_SIZE * 4, DHASH_SIZE * 4))  # JPEG는 축소 디코딩으로 빠르게
+        pixels = list(
+            image.convert("L").resize((DHASH_SIZE + 1, DHASH_SIZE), Image.LANCZOS).getdata()
+        )
+    except Exception as e:
+        logger.warning(f"perceptual hash 계산 실패: {e}")
+        return None
+
+    bits = 0
+    for row in range(DHASH_SIZE):
+        for col in range(DHASH_SIZE):
+            left = pixels[row * (DHASH_SIZE + 1) + col]
+            right = pixels[row * (DHASH_SIZE + 1) + col + 1]
+            bits = (bits << 1) | int(left > right)
+    return f"{bits:016x}"
+
+
+def hamming_distance(hash_a: str, hash_b: str) -> int:
+    """두 perceptual hash의 서로 다른 비트 수"""
+    return bin(int(hash_a, 16) ^ int(hash_b, 16)).count("1")
@@ -0,0 +1,168 @@
+# app/services/inference_executor.py
+"""
+Inference Executor Module
+모델 추론(Agent 실행, VL 분석)을 이벤트 루프 밖의 전용 스레드 풀에서 실행
+대기열 길이를 제한해서 꽉 차면 바로 거절 (요청이 무한정 쌓이지 않도록)
+
+대기 중인 작업은 우선순위 클래스(interactive > background) 순서로 실행하고,
+오래 기다린 작업은 aging으로 우선순위를 올려서 굶지 않도록 함
+"""
+from concurrent.futures import CancelledError, Future
+import asyncio
+import contextvars
+import itertools
+import threading
+import time
+import logging
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.priority import (
+    INTERACTIVE,
+    PRIORITY_CLASSES,
+    effective_priority,
+    priority_name,
+    set_current_priority,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceQueueFull(Exception):
+    """추론 대기열이 가득 찬 경우"""
+    pass
+
+
+class _Task:
+    __slots__ = ("priority", "seq", "enqueued_at", "fn", "args", "kwargs", "context", "future")
+
+    def __init__(self, priority: int, seq: int, fn, args, kwargs, context):
+        self.priority = priority
+        self.seq = seq
+        self.enqueued_at = time.perf_counter()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.context = context
+        self.future: Future = Future()
+
+
+class InferenceExecutor:
+    def __init__(self, max_workers: int, queue_size: int):
+        """
+        Args:
+            max_workers: 동시에 실행할 추론 작업 수
+            queue_size: 우선순위 클래스별 실행 대기 가능한 작업 수 (초과 시 InferenceQueueFull)
+        """
+        self.max_workers = max_workers
+        self.queue_size = queue_size
+        # 클래스별 실행 중 + 대기 중 작업 수 제한 (백그라운드 작업이 대화형 요청 자리를 차지하지 않도록)
+        self._slots = {
+            priority: threading.BoundedSemaphore(max_workers + queue_size)
+            for priority in PRIORITY_CLASSES.values()
+        }
+        self._lock = threading.Lock()
+        self._in_flight = {priority: 0 for priority in PRIORITY_CLASSES.values()}
+        self._pending = []
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._workers = [
+            threading.Thread(target=self._worker_loop, name=f"inference-{i}", daemon=True)
+            for i in range(max_workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def _update_gauge(self, priority: int, delta: int) -> None:
+        with self._lock:
+            self._in_flight[priority] += delta
+            metrics.set_gauge("inference.in_flight", sum(self._in_flight.values()))
+            metrics.set_gauge(f"inference.in_flight.{priority_name(priority)}", self._in_flight[priority])
+
+    def is_full(self, priority: int = INTERACTIVE) -> bool:
+        """대기열이 가득 찼는지 확인 (요청 초반에 빠르게 거절하기 위한 용도)"""
+        with self._lock:
+            return self._in_flight[priority] >= self.max_workers + self.queue_size
+
+    def submit(self, fn, *args, priority: int = INTERACTIVE, **kwargs) -> Future:
+        """
+        추론 작업 제출
+
+        Args:
+            priority: 우선순위 클래스 (app.core.priority.INTERACTIVE / BACKGROUND)
+
+        Raises:
+            InferenceQueueFull: 대기열이 가득 찬 경우 (즉시 반환)
+        """
+        if not self._slots[priority].acquire(blocking=False):
+            metrics.inc("inference.rejected")
+            metrics.inc(f"inference.rejected.{priority_name(priority)}")
+            raise InferenceQueueFull("추론 대기열이 가득 찼습니다.")
+
+        self._update_gauge(priority, 1)
+        # 요청 컨텍스트(contextvars)를 작업 스레드로 전달
+        context = contextvars.copy_context()
+        # 작업 안에서 실행되는 배치 스케줄러도 같은 우선순위를 보도록
+        context.run(set_current_priority, priority)
+
+        task = _Task(priority, next(self._seq), fn, args, kwargs, context)
+        task.future.add_done_callback(lambda _future: self._release(priority))
+        with self._cond:
+            self._pending.append(task)
+            metrics.set_gauge("inference.pending", len(self._pending))
+            self._cond.notify()
+        return task.future
+
+    def _release(self, priority: int) -> None:
+        self._slots[priority].release()
+        self._update_gauge(priority, -1)
+
+    def _next_task(self) -> _Task:
+        """aging 적용 우선순위가 가장 높은(값이 작은) 작업, 같으면 먼저 들어온 작업"""
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+            now = time.perf_counter()
+            task = min(self._pending, key=lambda t: (effective_priority(t.priority, t.enqueued_at, now), t.seq))
+            self._pending.remove(task)
+            metrics.set_gauge("inference.pending", len(self._pending))
+            return task
+
+    def _worker_loop(self) -> None:
+        while True:
+            task = self._next_task()
+            if not task.future.set_running_or_notify_cancel():
+                continue
+
+            name = priority_name(task.priority)
+            started_at = time.perf_counter()
+            queue_wait_ms = (started_at - task.enqueued_at) * 1000
+            metrics.observe("inference.queue_wait_ms", queue_wait_ms)
+            metrics.observe(f"inference.queue_wait_ms.{name}", queue_wait_ms)
+            try:
+                result = task.context.run(task.fn, *task.args, **task.kwargs)
+            except (CancelledError, asyncio.CancelledError) as e:
+                # 작업 안에서 취소됨: 기다리는 쪽이 실패가 아니라 취소로 받도록 CancelledError로 전달
+                # (asyncio.wrap_future로 기다리는 엔드포인트에는 asyncio.CancelledError로 전달됨)
+                task.future.set_exception(CancelledError(*e.args))
+            except Exception as e:
+                task.future.set_exception(e)
+            else:
+                task.future.set_result(result)
+            finally:
+                if not task.future.done():
+                    # SystemExit/KeyboardInterrupt 등으로 작업 스레드가 종료됨 - 기다리는 쪽이 멈추지 않도록 실패 처리
+                    task.future.set_exception(RuntimeError("추론 작업 스레드가 종료되었습니다."))
+                finished_at = time.perf_counter()
+                metrics.observe("inference.execution_ms", (finished_at - started_at) * 1000)
+                metrics.observe(f"inference.latency_ms.{name}", (finished_at - task.enqueued_at) * 1000)
+
+    async def run(self, fn, *args, priority: int = INTERACTIVE, **kwargs):
+        """비동기 엔드포인트용: 이벤트 루프를 막지 않고 결과 대기"""
+        return await asyncio.wrap_future(self.submit(fn, *args, priority=priority, **kwargs))
+
+
+# 싱글톤 인스턴스
+inference_executor = InferenceExecutor(
+    max_workers=settings.INFERENCE_WORKERS,
+    queue_size=settings.INFERENCE_QUEUE_SIZE
+)
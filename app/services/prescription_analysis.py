@@ -0,0 +1,179 @@
+# app/services/prescription_analysis.py
+"""
+Prescription Analysis Module
+처방전 이미지(S3) → Qwen2-VL 분석 → prescriptions.ai_analysis 저장
+같은 이미지는 content hash 기준 분석 캐시에서 바로 반환
+같은 이미지에 대한 다른 질문(후속 질문)은 비전 인코더 캐시가 있으면 다운로드 없이 언어 모델만 실행
+"""
+from supabase import Client
+from typing import Optional
+import logging
+from app.services.s3_service import s3_service
+from app.services.ai_service import ai_service
+from app.services.analysis_cache import analysis_cache
+from app.services.image_hash import compute_content_hash, compute_perceptual_hash
+from app.AImodels.image_preprocess import preprocess_prescription_image
+from app.AImodels.model_loader import ModelUnavailable
+from app.core import analysis_status
+from app.core.config import settings
+from app.core.cancellation import RequestCancelled
+from app.core.metrics import metrics
+from app.repositories import sql_repository
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ANALYSIS_PROMPT = "这张处方上写了什么？"
+
+
+class PrescriptionNotFound(Exception):
+    """처방전 또는 이미지를 찾을 수 없는 경우"""
+    pass
+
+
+def _get_prescription(supabase: Client, prescription_id: int) -> Optional[dict]:
+    """분석에 필요한 컬럼만 조회 (DB_BACKEND=sql이면 직접 SQL 경로)"""
+    columns = "file_key, ai_analysis, user_id"
+    if sql_repository.enabled():
+        return sql_repository.get_prescription(prescription_id, columns)
+    result = supabase.table("prescriptions").select(columns).eq("id", prescription_id).execute()
+    return result.data[0] if result.data else None
+
+
+def _save_analysis(supabase: Client, prescription_id: int, analysis_result: str, prompt: str) -> None:
+    # 후속 질문(다른 프롬프트) 결과는 처방전 분석 결과로 저장하지 않음
+    if prompt != DEFAULT_ANALYSIS_PROMPT:
+        return
+    supabase.table("prescriptions").update({
+        "ai_analysis": analysis_result,
+        "analysis_status": analysis_status.COMPLETED
+    }).eq("id", prescription_id).execute()
+    logger.info(f"💾 DB updated: prescription_id={prescription_id}")
+
+
+def analyze_prescription_image(
+    supabase: Client,
+    image_identifier: str,
+    prompt: str = DEFAULT_ANALYSIS_PROMPT,
+    owner_id: Optional[str] = None
+) -> str:
+    """
+    처방전 이미지 분석
+
+    Args:
+        supabase: Supabase 클라이언트
+        image_identifier: prescription_id 또는 file_key
+        prompt: VL 모델 프롬프트
+        owner_id: 이 사용자의 처방전만 분석 (None이면 제한 없음 - 분석 워커용)
+            - 지정하면 file_key는 허용하지 않고, 다른 사용자의 처방전은 없는 것으로 처리
+
+    Returns:
+        VL 모델 분석 결과 텍스트
+
+    Raises:
+        PrescriptionNotFound: 처방전/이미지가 없는 경우
+        RequestCancelled: 요청 취소 (analysis_status는 바꾸지 않음 - 호출한 쪽이 pending으로 돌려놓거나 오래된 분석으로 복구됨)
+        Exception: 분석 실패 (prescription_id인 경우 analysis_status='failed'로 기록)
+    """
+    prescription_id = None
+    # perceptual hash 근사 매칭은 같은 사용자의 이미지끼리만 (file_key로 호출하면 사용자를 모르므로 정확히 일치만)
+    user_id = None
+    try:
+        # prescription_id로 조회 시도
+        try:
+            prescription_id = int(image_identifier)
+        except ValueError:
+            # 숫자가 아니면 file_key로 간주 (소유자를 확인할 수 없으므로 사용자 요청에서는 거절)
+            if owner_id is not None:
+                raise PrescriptionNotFound(f"처방전 ID {image_identifier}를 찾을 수 없습니다.")
+            file_key = image_identifier
+        else:
+            prescription = _get_prescription(supabase, prescription_id)
+
+            if not prescription or (owner_id is not None and str(prescription.get('user_id')) != str(owner_id)):
+                raise PrescriptionNotFound(f"처방전 ID {image_identifier}를 찾을 수 없습니다.")
+
+            # 이미 분석된 결과가 있으면 반환 (기본 프롬프트 분석 결과만 저장되어 있음)
+            if prompt == DEFAULT_ANALYSIS_PROMPT and prescription.get('ai_analysis'):
+                logger.info(f"✅ 기존 분석 결과 사용: prescription_id={image_identifier}")
+                return str(prescription['ai_analysis'])
+
+            file_key = prescription['file_key']
+            user_id = prescription.get('user_id')
+
+        # 같은 이미지를 이미 분석했으면 캐시에서 바로 반환 (다운로드/추론 생략)
+        hashes = s3_service.get_image_hashes(file_key)
+        if hashes:
+            cached = analysis_cache.get(
+                supabase, hashes['content_hash'], prompt, ai_service.model_version, hashes['perceptual_hash'], user_id
+            )
+            if cached is not None:
+                logger.info(f"♻️ 분석 캐시 사용: {image_identifier}")
+                if prescription_id is not None:
+                    _save_analysis(supabase, prescription_id, cached, prompt)
+                return cached
+
+        # 같은 이미지의 비전 인코더 결과가 캐시에 있으면 (후속 질문) 다운로드/전처리 없이 바로 추론
+        image = ai_service.cached_image_features(hashes['content_hash']) if hashes else None
+        if image is not None:
+            logger.info(f"♻️ 비전 인코더 캐시 사용 (다운로드 생략): {image_identifier}")
+        else:
+            # S3에서 이미지 다운로드
+            logger.info(f"📥 S3에서 이미지 다운로드: {file_key}")
+            image_bytes = s3_service.download_prescription(file_key)
+
+            if not image_bytes:
+                raise PrescriptionNotFound(f"이미지를 다운로드할 수 없습니다: {file_key}")
+
+            # 해시가 없는 이전 업로드는 다운로드한 바이트로 계산
+            if not hashes:
+                hashes = {
+                    'content_hash': compute_content_hash(image_bytes),
+                    'perceptual_hash': compute_perceptual_hash(image_bytes) if settings.VL_CACHE_PERCEPTUAL_HASH else None
+                }
+                cached = analysis_cache.get(
+                    supabase, hashes['content_hash'], prompt, ai_service.model_version, hashes['perceptual_hash'], user_id
+                )
+                if cached is not None:
+                    if prescription_id is not None:
+                        _save_analysis(supabase, prescription_id, cached, prompt)
+                    return cached
+
+            # 픽셀 예산/EXIF 회전/흑백 정규화/여백 자르기
+            image = preprocess_prescription_image(image_bytes)
+
+        # VL 모델 실행 (동기 버전 사용)
+        analysis_result = ai_service.analyze_prescription_sync(image, prompt, image_key=hashes['content_hash'])
+        # 모델 메모리 정리는 model_loader(메모리 예산 기반 언로드)에서 담당
+
+        logger.info(f"✅ VL 분석 완료: {image_identifier}")
+
+        analysis_cache.put(
+            supabase, hashes['content_hash'], prompt, ai_service.model_version,
+            analysis_result, hashes['perceptual_hash'], user_id
+        )
+
+        if prescription_id is not None:
+            _save_analysis(supabase, prescription_id, analysis_result, prompt)
+
+        return analysis_result
+
+    except PrescriptionNotFound:
+        raise
+    except RequestCancelled:
+        # 분석을 끝내지 못했으므로 completed/failed로 기록하지 않음
+        metrics.inc("analysis.cancelled")
+        logger.info(f"🛑 VL 분석 취소: {image_identifier}")
+        raise
+    except ModelUnavailable:
+        # 모델이 백그라운드에서 다시 로드되는 중 - failed로 기록하지 않고 다음 복구 때 다시 분석
+        raise
+    except Exception:
+        # 에러 시에도 상태 업데이트 (후속 질문 실패는 처방전 분석 상태와 무관)
+        if prescription_id is not None and prompt == DEFAULT_ANALYSIS_PROMPT:
+            try:
+                supabase.table("prescriptions").update({
+                    "analysis_status": analysis_status.FAILED
+                }).eq("id", prescription_id).execute()
+            except Exception:
+                pass
+        raise
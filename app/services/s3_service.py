@@ -8,9 +8,13 @@ import uuid
 from fastapi import UploadFile, HTTPException
 import logging
 from app.core.config import settings
+from app.services.image_hash import compute_content_hash, compute_perceptual_hash
 
 logger = logging.getLogger(__name__)
 
+# 이 프로세스에서 업로드한 파일의 해시 (S3 head_object 왕복 생략용)
+MAX_CACHED_HASHES = 10000
+
 class S3Service:
     def __init__(self):
         self.s3_client = boto3.client(
@@ -19,6 +23,7 @@ class S3Service:
         )
         self.bucket_name = settings.AWS_BUCKET_NAME
         self.prescription_folder = settings.S3_PRESCRIPTION_FOLDER
+        self._hashes_by_key = {}
         
     def _generate_unique_filename(self, original_filename: str) -> str:
         """유니크한 파일명 생성"""
@@ -43,7 +48,9 @@ class S3Service:
             dict: {
                 'file_url': S3 파일 URL,
                 'file_key': S3 객체 키,
-                'original_filename': 원본 파일명
+                'original_filename': 원본 파일명,
+                'content_hash': 파일 SHA-256,
+                'perceptual_hash': dHash (옵션, 없으면 None)
             }
         """
         try:
@@ -65,6 +72,12 @@ class S3Service:
                     detail="파일 크기는 10MB를 초과할 수 없습니다."
                 )
             
+            # 중복 이미지 분석 재사용을 위한 해시
+            hashes = {
+                'content_hash': compute_content_hash(content),
+                'perceptual_hash': compute_perceptual_hash(content) if settings.VL_CACHE_PERCEPTUAL_HASH else None
+            }
+            
             # 파일명 생성
             unique_filename = self._generate_unique_filename(file.filename)
             
@@ -82,9 +95,12 @@ class S3Service:
                 ContentType=file.content_type or 'image/jpeg',
                 Metadata={
                     'original_filename': file.filename,
-                    'upload_timestamp': datetime.now().isoformat()
+                    'upload_timestamp': datetime.now().isoformat(),
+                    'content_sha256': hashes['content_hash'],
+                    'perceptual_hash': hashes['perceptual_hash'] or ''
                 }
             )
+            self._remember_hashes(s3_key, hashes)
             
             # 파일 URL 생성
             file_url = f"https://{self.bucket_name}.s3.{settings.AWS_REGION}.amazonaws.com/{s3_key}"
@@ -94,7 +110,8 @@ class S3Service:
             return {
                 'file_url': file_url,
                 'file_key': s3_key,
-                'original_filename': file.filename
+                'original_filename': file.filename,
+                **hashes
             }
             
         except ClientError as e:
@@ -110,6 +127,44 @@ class S3Service:
                 detail=f"파일 업로드 중 오류가 발생했습니다: {str(e)}"
             )
     
+    def _remember_hashes(self, file_key: str, hashes: dict) -> None:
+        if len(self._hashes_by_key) >= MAX_CACHED_HASHES:
+            self._hashes_by_key.pop(next(iter(self._hashes_by_key)))
+        self._hashes_by_key[file_key] = hashes
+    
+    def get_image_hashes(self, file_key: str) -> Optional[dict]:
+        """
+        업로드 시 계산한 이미지 해시 조회 (이미지 다운로드 없이 메타데이터만 확인)
+        
+        Args:
+            file_key: S3 객체 키
+            
+        Returns:
+            dict: {'content_hash', 'perceptual_hash'} (해시가 없는 이전 업로드면 None)
+        """
+        if file_key in self._hashes_by_key:
+            return self._hashes_by_key[file_key]
+        
+        try:
+            response = self.s3_client.head_object(
+                Bucket=self.bucket_name,
+                Key=file_key
+            )
+            metadata = response.get('Metadata', {})
+            if not metadata.get('content_sha256'):
+                return None
+            
+            hashes = {
+                'content_hash': metadata['content_sha256'],
+                'perceptual_hash': metadata.get('perceptual_hash') or None
+            }
+            self._remember_hashes(file_key, hashes)
+            return hashes
+            
+        except ClientError as e:
+            logger.error(f"S3 메타데이터 조회 실패: {str(e)}")
+            return None
+    
     def download_prescription(self, file_key: str) -> Optional[bytes]:
         """
         S3에서 처방전 이미지 다운로드
@@ -1,11 +1,12 @@
 # app/services/user_service.py
-from supabase import Client
+from supabase import AsyncClient
 from app.models.user import UserProfileUpdate, UserResponse
+from app.repositories import user_repository
 from datetime import datetime
 from typing import Optional
 
 async def update_user_profile(
-    supabase: Client,
+    supabase: AsyncClient,
     user_id: int,
     profile_data: UserProfileUpdate
 ) -> Optional[UserResponse]:
@@ -21,9 +22,9 @@ async def update_user_profile(
     update_data["updated_at"] = datetime.utcnow().isoformat()
     
     # Supabase 업데이트 실행
-    response = supabase.table("users").update(update_data).eq("id", user_id).execute()
+    updated = await user_repository.update_user(supabase, user_id, update_data)
     
-    if response.data:
-        return UserResponse(**response.data[0])
+    if updated:
+        return UserResponse(**updated)
     
     return None
\ No newline at end of file
@@ -0,0 +1,160 @@
+# app/services/vqa_client.py
+"""
+VQA 서버(app/vqa_server.py) HTTP 클라이언트
+VL_BACKEND=remote일 때 ai_service가 Qwen2-VL을 직접 로드하지 않고 이 클라이언트로 추론 요청
+
+- 연결 재사용(keep-alive) 커넥션 풀
+- 연결/읽기 타임아웃 분리 (추론은 오래 걸리므로 읽기 타임아웃을 길게)
+- AI_SERVER_SOCKET이 있으면 TCP 대신 Unix 도메인 소켓 사용
+- 요청 취소 토큰을 주면 응답을 기다리는 동안 취소 여부를 확인하고, 취소되면 연결을 끊어서 VQA 서버도 디코딩 중단
+  (동기 httpx 요청은 다른 스레드에서 중단할 수 없으므로 전용 이벤트 루프 스레드에서 비동기 클라이언트로 요청)
+"""
+from concurrent.futures import TimeoutError as FutureTimeout
+from PIL import Image
+from io import BytesIO
+from typing import Optional
+import asyncio
+import threading
+import logging
+import httpx
+from app.core.config import settings
+from app.core.cancellation import CancellationToken, RequestCancelled
+
+logger = logging.getLogger(__name__)
+
+# 응답을 기다리는 동안 요청 취소 여부를 확인하는 간격(초)
+CANCEL_POLL_SECONDS = 0.1
+
+
+class VQAServerError(Exception):
+    """VQA 서버 호출 실패 (연결 실패, 타임아웃, 오류 응답)"""
+    pass
+
+
+class VQAServerTimeout(VQAServerError):
+    """응답 대기 시간 초과 (요청 마감 시각까지 남은 시간을 timeout으로 준 경우 호출한 쪽에서 취소로 처리)"""
+    pass
+
+
+class VQAClient:
+    def __init__(
+        self,
+        base_url: str,
+        socket_path: Optional[str] = None,
+        timeout: float = 120.0,
+        max_connections: int = 16
+    ):
+        """
+        Args:
+            base_url: VQA 서버 주소 (예: http://localhost:8001)
+            socket_path: Unix 도메인 소켓 경로 (있으면 base_url의 host/port 대신 사용)
+            timeout: 추론 응답 대기 시간(초)
+            max_connections: 커넥션 풀 최대 연결 수
+        """
+        self.timeout = timeout
+        transport = httpx.AsyncHTTPTransport(uds=socket_path, retries=1) if socket_path else httpx.AsyncHTTPTransport(retries=1)
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            transport=transport,
+            timeout=httpx.Timeout(timeout, connect=5.0),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        )
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="vqa-client", daemon=True)
+        self._thread.start()
+
+    def _run(self, coro, cancel: Optional[CancellationToken] = None):
+        """
+        전용 이벤트 루프에서 요청 실행 후 결과를 기다림
+
+        Raises:
+            RequestCancelled: 기다리는 동안 cancel이 취소됨 (요청 태스크를 취소해서 연결을 끊음)
+        """
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        while True:
+            try:
+                return future.result(timeout=CANCEL_POLL_SECONDS if cancel is not None else None)
+            except FutureTimeout:
+                if cancel.cancelled:
+                    future.cancel()
+                    raise RequestCancelled(cancel.reason)
+
+    @staticmethod
+    def _encode_image(image: Image.Image) -> bytes:
+        # 전처리(픽셀 예산 축소)가 끝난 이미지라 PNG로 보내도 크지 않음 (무손실)
+        buffer = BytesIO()
+        image.save(buffer, format="PNG")
+        return buffer.getvalue()
+
+    def predict(
+        self,
+        image: Image.Image,
+        prompt: str,
+        max_new_tokens: int,
+        image_key: Optional[str] = None,
+        timeout: Optional[float] = None,
+        cancel: Optional[CancellationToken] = None
+    ) -> str:
+        """
+        이미지 + 질문 추론 요청
+
+        Args:
+            timeout: 이번 요청의 응답 대기 시간(초, 기본 timeout보다 짧을 때만 적용 - 요청 마감까지 남은 시간)
+            cancel: 요청 취소 토큰 (클라이언트 연결 끊김 등으로 취소되면 기다리지 않고 연결을 끊음)
+
+        Returns:
+            str: 모델 예측 텍스트
+
+        Raises:
+            VQAServerTimeout: 응답 대기 시간 초과 (연결이 끊겨서 VQA 서버도 디코딩을 중단함)
+            VQAServerError: 서버 호출 실패
+            RequestCancelled: cancel이 취소됨 (연결이 끊겨서 VQA 서버도 디코딩을 중단함)
+        """
+        data = {"prompt": prompt, "max_new_tokens": str(max_new_tokens)}
+        if image_key:
+            data["image_key"] = image_key
+
+        request_timeout = httpx.USE_CLIENT_DEFAULT
+        if timeout is not None and timeout < self.timeout:
+            request_timeout = httpx.Timeout(timeout, connect=min(5.0, timeout))
+
+        files = {"image": ("image.png", self._encode_image(image), "image/png")}
+        return self._run(self._predict(data, files, request_timeout), cancel)
+
+    async def _predict(self, data: dict, files: dict, request_timeout) -> str:
+        try:
+            response = await self._client.post("/predict", data=data, files=files, timeout=request_timeout)
+            response.raise_for_status()
+        except httpx.TimeoutException as e:
+            raise VQAServerTimeout(f"VQA 서버 응답 시간 초과: {e}")
+        except httpx.HTTPStatusError as e:
+            raise VQAServerError(f"VQA 서버 오류 응답 {e.response.status_code}: {e.response.text[:200]}")
+        except httpx.HTTPError as e:
+            raise VQAServerError(f"VQA 서버 호출 실패: {e}")
+
+        return response.json()["answer"]
+
+    async def _health(self) -> dict:
+        try:
+            response = await self._client.get("/health", timeout=5.0)
+            return response.json()
+        except httpx.HTTPError as e:
+            return {"status": "unreachable", "error": str(e)}
+
+    def health(self) -> dict:
+        """VQA 서버 모델 로드 상태"""
+        return self._run(self._health())
+
+    def close(self) -> None:
+        self._run(self._client.aclose())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5.0)
+
+
+def create_vqa_client() -> VQAClient:
+    return VQAClient(
+        base_url=settings.AI_SERVER_URL,
+        socket_path=settings.AI_SERVER_SOCKET or None,
+        timeout=settings.AI_SERVER_TIMEOUT,
+        max_connections=settings.AI_SERVER_MAX_CONNECTIONS
+    )
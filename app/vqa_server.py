@@ -0,0 +1,128 @@
+# app/vqa_server.py
+"""
+VQA(Visual Question Answering) 추론 서버
+Qwen2-VL 모델을 한 프로세스에서만 로드하고 이미지 + 질문 요청을 HTTP(또는 Unix 소켓)로 받음
+API 서버는 VL_BACKEND=remote로 실행하면 모델 없이 이 서버에 요청하므로 API 워커 수를 따로 늘릴 수 있음
+
+동시에 들어온 요청은 ai_service의 MicroBatcher가 한 번의 generate로 묶어서 처리
+
+실행:
+    python -m app.vqa_server                          # AI_SERVER_URL의 포트 (기본 8001)
+    AI_SERVER_SOCKET=/tmp/vqa.sock python -m app.vqa_server   # Unix 도메인 소켓
+"""
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request
+from PIL import Image
+from io import BytesIO
+from contextlib import asynccontextmanager
+from typing import Optional
+from urllib.parse import urlparse
+import asyncio
+import logging
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.cancellation import CancellationToken, RequestCancelled, cancellation_scope, cancel_on_disconnect
+from app.AImodels.model_loader import LazyModel, ModelUnavailable
+from app.services.ai_service import ai_service, AIService, DEFAULT_PROMPT, VL_MAX_NEW_TOKENS
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# 이 프로세스는 항상 모델을 직접 로드
+vqa_service = ai_service if ai_service.vl_model is not None else AIService(backend="local")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    logger.info("🚀 VQA 서버 시작: Qwen2-VL 백그라운드 로드")
+    vqa_service.vl_model.load_in_background()
+    yield
+    logger.info("👋 VQA 서버 종료 중...")
+
+
+app = FastAPI(title="새로이안 VQA 서버", lifespan=lifespan)
+
+
+@app.get("/health")
+def health_check():
+    """모델 로드 상태 (ready가 아니면 503)"""
+    status = vqa_service.vl_model.status()
+    if not vqa_service.vl_model.is_ready:
+        raise HTTPException(status_code=503, detail=status)
+    return {"status": "ready", "model": status, "model_version": vqa_service.model_version}
+
+
+@app.get("/metrics")
+def get_metrics():
+    return metrics.snapshot()
+
+
+@app.post("/predict")
+async def predict(
+    http_request: Request,
+    image: UploadFile = File(...),
+    prompt: str = Form(DEFAULT_PROMPT),
+    max_new_tokens: int = Form(VL_MAX_NEW_TOKENS),
+    image_key: Optional[str] = Form(None)
+):
+    """
+    이미지 + 질문 추론
+
+    Args:
+        image: 이미지 파일 (API 서버에서 전처리된 이미지)
+        prompt: 질문
+        max_new_tokens: 최대 생성 토큰 수
+        image_key: 비전 인코더 캐시 키 (이미지 content hash)
+
+    Returns:
+        dict: {"answer": str}
+    """
+    if vqa_service.vl_model.state == LazyModel.LOADING:
+        raise HTTPException(status_code=503, detail="모델 로딩 중입니다.", headers={"Retry-After": "10"})
+    if vqa_service.vl_model.state == LazyModel.FAILED:
+        # 로드 실패 모델은 백그라운드에서 다시 로드 중 (요청 안에서 로드하지 않음)
+        raise HTTPException(
+            status_code=503,
+            detail="모델을 다시 불러오는 중입니다.",
+            headers={"Retry-After": str(int(vqa_service.vl_model.retry_after))}
+        )
+
+    try:
+        pil_image = Image.open(BytesIO(await image.read())).convert("RGB")
+    except Exception:
+        raise HTTPException(status_code=400, detail="이미지를 읽을 수 없습니다.")
+
+    # API 서버가 요청을 포기하면(연결 종료) 디코딩 중단
+    token = CancellationToken(timeout=settings.AI_SERVER_TIMEOUT)
+    watcher = asyncio.create_task(cancel_on_disconnect(http_request, token))
+    try:
+        # 블로킹 추론은 스레드에서 실행 (동시 요청은 MicroBatcher에서 배치로 묶임)
+        with cancellation_scope(token):
+            answer = await asyncio.to_thread(
+                vqa_service.analyze_prescription_sync, pil_image, prompt, max_new_tokens, image_key
+            )
+    except RequestCancelled as e:
+        metrics.inc(f"requests.cancelled.{e.reason}")
+        raise HTTPException(status_code=499, detail=str(e))
+    except ModelUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(int(e.retry_after))})
+    except Exception as e:
+        logger.error(f"❌ VQA 추론 실패: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        watcher.cancel()
+
+    return {"answer": answer}
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    if settings.AI_SERVER_SOCKET:
+        uvicorn.run(app, uds=settings.AI_SERVER_SOCKET)
+    else:
+        parsed = urlparse(settings.AI_SERVER_URL)
+        uvicorn.run(app, host=parsed.hostname or "127.0.0.1", port=parsed.port or 8001)
@@ -0,0 +1,52 @@
+# migrations/env.py
+"""
+Alembic 실행 환경
+테이블은 Supabase에서 관리하므로 모델 메타데이터 없이 수동 마이그레이션만 사용 (autogenerate 미사용)
+
+DB 주소 우선순위: alembic Config의 sqlalchemy.url (스크립트에서 지정) → DATABASE_URL 환경 변수 → .env 설정
+"""
+from logging.config import fileConfig
+import os
+from alembic import context
+from sqlalchemy import create_engine, pool
+
+config = context.config
+
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = None
+
+
+def _database_url() -> str:
+    url = config.get_main_option("sqlalchemy.url") or os.getenv("DATABASE_URL")
+    if url:
+        return url
+    from app.core.config import settings
+    return settings.DATABASE_URL
+
+
+def run_migrations_offline() -> None:
+    """SQL 스크립트만 출력 (alembic upgrade head --sql)"""
+    context.configure(
+        url=_database_url(),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    connectable = create_engine(_database_url(), poolclass=pool.NullPool)
+    with connectable.connect() as connection:
+        context.configure(connection=connection, target_metadata=target_metadata)
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
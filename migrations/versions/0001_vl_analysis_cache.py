@@ -0,0 +1,34 @@
+"""VL 분석 결과 캐시 테이블 (app/services/analysis_cache.py)
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # 이미 대시보드에서 만든 환경도 있으므로 IF NOT EXISTS
+    # (content_hash, prompt, model_version) 유니크 인덱스는 0002에서 생성 (upsert on_conflict 대상)
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS vl_analysis_cache (
+            id BIGSERIAL PRIMARY KEY,
+            content_hash TEXT NOT NULL,
+            prompt TEXT NOT NULL,
+            model_version TEXT NOT NULL,
+            perceptual_hash TEXT,
+            analysis TEXT NOT NULL,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS vl_analysis_cache")
@@ -0,0 +1,50 @@
+"""자주 쓰는 조회의 복합 인덱스
+
+- prescription_chats: user_id별 최근 메시지 (Agent 메모리, GET /prescriptions/messages)
+                      + prescription_id 필터
+- prescriptions: user_id별 최신순 목록 (GET /prescriptions/user/{user_id})
+- users: google_id 로그인 조회 (auth_service.get_or_create_user)
+- hospitals: 등록순 페이지 (GET /hospitals)
+- vl_analysis_cache: (content_hash, prompt, model_version) 조회 + upsert 충돌 대상
+
+운영 중인 테이블을 잠그지 않도록 CONCURRENTLY로 생성 (트랜잭션 밖에서 실행)
+생성 도중 실패하면 INVALID 인덱스가 남아 IF NOT EXISTS가 건너뛰므로 해당 인덱스를 DROP 후 다시 실행
+확인: python -m scripts.check_query_plans
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+# (인덱스 이름, 테이블, 컬럼, UNIQUE 여부)
+INDEXES = [
+    ("prescription_chats_user_created_idx", "prescription_chats", "user_id, created_at", False),
+    ("prescription_chats_user_prescription_created_idx", "prescription_chats", "user_id, prescription_id, created_at", False),
+    ("prescriptions_user_created_idx", "prescriptions", "user_id, created_at", False),
+    ("users_google_id_idx", "users", "google_id", False),
+    ("hospitals_created_idx", "hospitals", "created_at", False),
+    ("vl_analysis_cache_key_idx", "vl_analysis_cache", "content_hash, prompt, model_version", True),
+]
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns, unique in INDEXES:
+            op.execute(
+                f"CREATE {'UNIQUE ' if unique else ''}INDEX CONCURRENTLY IF NOT EXISTS {name} "
+                f"ON {table} ({columns})"
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, _, _, _ in reversed(INDEXES):
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
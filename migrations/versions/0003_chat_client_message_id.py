@@ -0,0 +1,35 @@
+"""채팅 메시지 클라이언트 ID (write-behind 저장 중복 방지)
+
+- prescription_chats.client_message_id: 서버가 메시지마다 미리 정한 ID (app.services.chat_writer)
+- UNIQUE 인덱스: 스풀 파일 재전송 시 ON CONFLICT DO NOTHING 대상 (NULL은 중복 허용 → 기존 행 영향 없음)
+
+CHAT_WRITE_BEHIND=True로 켜기 전에 적용 (동기 저장 경로는 이 컬럼을 쓰지 않음)
+컬럼 추가는 기본값 없는 NULL 컬럼이라 테이블 재작성 없음, 인덱스는 CONCURRENTLY로 생성
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE prescription_chats ADD COLUMN IF NOT EXISTS client_message_id TEXT")
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS prescription_chats_client_message_id_idx "
+            "ON prescription_chats (client_message_id)"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS prescription_chats_client_message_id_idx")
+    op.execute("ALTER TABLE prescription_chats DROP COLUMN IF EXISTS client_message_id")
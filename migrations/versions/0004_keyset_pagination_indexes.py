@@ -0,0 +1,54 @@
+"""커서 페이지네이션 인덱스 ((created_at, id) keyset)
+
+목록 조회가 ORDER BY created_at DESC, id DESC + (created_at, id) 커서 조건으로 바뀌어서
+0002의 (…, created_at) 인덱스를 id까지 포함한 인덱스로 교체 (같은 시각 행도 정렬 없이 인덱스 순서로 읽음)
+- prescription_chats: GET /prescriptions/messages (+ prescription_id), Agent 메모리용 기록 조회
+- prescriptions: GET /prescriptions/user/{user_id}
+
+새 인덱스를 만든 뒤 대체되는 인덱스를 삭제 (쓰기 때마다 갱신할 인덱스 수 유지)
+운영 중인 테이블을 잠그지 않도록 CONCURRENTLY로 실행
+확인: python -m scripts.check_query_plans
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+# (새 인덱스 이름, 테이블, 컬럼, 대체되는 0002 인덱스, 그 컬럼)
+INDEXES = [
+    (
+        "prescription_chats_user_created_id_idx", "prescription_chats", "user_id, created_at, id",
+        "prescription_chats_user_created_idx", "user_id, created_at",
+    ),
+    (
+        "prescription_chats_user_prescription_created_id_idx", "prescription_chats",
+        "user_id, prescription_id, created_at, id",
+        "prescription_chats_user_prescription_created_idx", "user_id, prescription_id, created_at",
+    ),
+    (
+        "prescriptions_user_created_id_idx", "prescriptions", "user_id, created_at, id",
+        "prescriptions_user_created_idx", "user_id, created_at",
+    ),
+]
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns, replaced, _ in INDEXES:
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({columns})")
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {replaced}")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _, replaced, replaced_columns in reversed(INDEXES):
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {replaced} ON {table} ({replaced_columns})")
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
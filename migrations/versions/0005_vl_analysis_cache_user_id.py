@@ -0,0 +1,29 @@
+"""VL 분석 캐시 항목의 사용자 (perceptual hash 근사 매칭 범위)
+
+- vl_analysis_cache.user_id: 분석한 처방전의 사용자
+  perceptual hash 근사 매칭은 같은 사용자의 항목끼리만 (app/services/analysis_cache.py)
+  content hash가 같은 항목(같은 이미지 바이트)은 지금처럼 사용자와 관계없이 재사용
+
+기존 행은 NULL로 남아 근사 매칭 대상에서 빠짐 (정확히 일치하는 조회는 그대로)
+기본값 없는 NULL 컬럼 추가라 테이블 재작성 없음
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE vl_analysis_cache ADD COLUMN IF NOT EXISTS user_id BIGINT")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE vl_analysis_cache DROP COLUMN IF EXISTS user_id")
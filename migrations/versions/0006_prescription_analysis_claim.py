@@ -0,0 +1,29 @@
+"""처방전 분석 작업 점유 시각 (app/services/analysis_worker.py)
+
+- prescriptions.claimed_at: 분석을 시작한 시각
+  워커는 analysis_status='pending'인 행을 조건부 UPDATE로 'processing' + claimed_at으로 바꿔서 가져감
+  POST /upload는 직접 분석하는 행을 'analyzing' + claimed_at으로 만들어 워커 복구 대상에서 제외
+  processing/analyzing 상태로 ANALYSIS_CLAIM_TIMEOUT_SECONDS가 지난 행만 중단된 작업으로 보고 다시 가져감
+
+기본값 없는 NULL 컬럼 추가라 테이블 재작성 없음
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE prescriptions ADD COLUMN IF NOT EXISTS claimed_at TIMESTAMPTZ")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE prescriptions DROP COLUMN IF EXISTS claimed_at")
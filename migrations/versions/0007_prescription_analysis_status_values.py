@@ -0,0 +1,77 @@
+"""처방전 분석 상태 값 (app/core/analysis_status.py)
+
+- prescriptions.analysis_status: 기존 pending / completed / failed에 processing, analyzing 추가
+  enum 타입 컬럼이면 타입에 값 추가, 텍스트 컬럼이면 analysis_status CHECK 제약을 새 값 목록으로 교체
+  (기존 행이 목록 밖의 값을 갖고 있으면 VALIDATE에서 실패 - 데이터를 먼저 정리해야 함)
+
+상태 흐름은 app/core/analysis_status.py 참고
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+# app/core/analysis_status.py ALL_STATUSES와 같게 유지 (마이그레이션은 앱 코드를 import하지 않음)
+STATUSES = ("pending", "processing", "analyzing", "completed", "failed")
+CONSTRAINT = "prescriptions_analysis_status_check"
+
+
+def _column_enum_type():
+    """analysis_status가 enum 타입이면 타입 이름 (텍스트 컬럼이거나 --sql 모드면 None)"""
+    if op.get_context().as_sql:
+        return None
+    row = op.get_bind().execute(sa.text("""
+        SELECT data_type, udt_name FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = 'prescriptions' AND column_name = 'analysis_status'
+    """)).first()
+    if row is None:
+        raise RuntimeError("prescriptions.analysis_status 컬럼이 없습니다.")
+    return row.udt_name if row.data_type == "USER-DEFINED" else None
+
+
+def _drop_status_checks() -> None:
+    """analysis_status를 검사하는 기존 CHECK 제약 삭제 (이름을 모르므로 pg_constraint에서 찾음)"""
+    op.execute("""
+        DO $$
+        DECLARE c record;
+        BEGIN
+            FOR c IN
+                SELECT conname FROM pg_constraint
+                WHERE conrelid = 'prescriptions'::regclass AND contype = 'c'
+                  AND pg_get_constraintdef(oid) LIKE '%analysis_status%'
+            LOOP
+                EXECUTE format('ALTER TABLE prescriptions DROP CONSTRAINT %I', c.conname);
+            END LOOP;
+        END $$
+    """)
+
+
+def upgrade() -> None:
+    enum_type = _column_enum_type()
+    if enum_type is not None:
+        # ALTER TYPE ... ADD VALUE는 트랜잭션 밖에서 (추가한 값을 같은 트랜잭션에서 쓸 수 없음)
+        with op.get_context().autocommit_block():
+            for status in STATUSES:
+                op.execute(f"ALTER TYPE {enum_type} ADD VALUE IF NOT EXISTS '{status}'")
+        return
+
+    _drop_status_checks()
+    allowed = ", ".join(f"'{status}'" for status in STATUSES)
+    # NOT VALID로 추가 후 VALIDATE (테이블 쓰기를 막지 않고 기존 행 검사)
+    op.execute(f"ALTER TABLE prescriptions ADD CONSTRAINT {CONSTRAINT} CHECK (analysis_status IN ({allowed})) NOT VALID")
+    op.execute(f"ALTER TABLE prescriptions VALIDATE CONSTRAINT {CONSTRAINT}")
+
+
+def downgrade() -> None:
+    # enum 값은 삭제할 수 없으므로 그대로 두고, 이 마이그레이션이 추가한 CHECK 제약만 삭제
+    # (upgrade에서 교체한 이전 CHECK 제약은 복원하지 않음)
+    op.execute(f"ALTER TABLE prescriptions DROP CONSTRAINT IF EXISTS {CONSTRAINT}")
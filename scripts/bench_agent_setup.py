@@ -0,0 +1,82 @@
+"""
+Agent 요청당 준비 비용 마이크로 벤치마크
+
+- 이전 방식: 요청마다 PromptTemplate + create_react_agent + AgentExecutor 생성
+- 현재 방식: 미리 빌드된 Agent에 chat_history만 호출 시점에 전달
+
+실제 모델 대신 FakeListLLM과 더미 Tool을 사용하므로 순수한 준비 비용만 측정됨.
+
+실행: python -m scripts.bench_agent_setup
+"""
+import time
+import tracemalloc
+from langchain.tools import Tool
+from langchain.memory import ConversationBufferMemory
+from langchain.schema import HumanMessage, AIMessage
+from langchain_community.llms.fake import FakeListLLM
+from app.AImodels.agent_factory import build_agent_executor, memory_to_chat_history
+
+ITERATIONS = 200
+
+DUMMY_TOOLS = [
+    Tool(name="VL_Model_Image_Analyzer", func=lambda x: "분석 결과", description="처방전 이미지 분석"),
+    Tool(name="Public_Data_API_Searcher", func=lambda x: "약물 정보", description="의약품 정보 검색"),
+]
+
+
+def make_memory() -> ConversationBufferMemory:
+    memory = ConversationBufferMemory(memory_key="chat_history", return_messages=True)
+    for i in range(6):
+        memory.chat_memory.add_message(HumanMessage(content=f"질문 {i}"))
+        memory.chat_memory.add_message(AIMessage(content=f"답변 {i}"))
+    return memory
+
+
+def measure(label: str, setup_fn):
+    """setup_fn을 ITERATIONS번 실행하면서 시간과 할당량 측정"""
+    setup_fn()  # 워밍업
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    for _ in range(ITERATIONS):
+        setup_fn()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    stats = tracemalloc.take_snapshot().statistics("filename")
+    tracemalloc.stop()
+
+    allocated = sum(stat.size for stat in stats)
+    per_call_us = elapsed / ITERATIONS * 1_000_000
+    print(f"[{label}] {per_call_us:10.1f} us/request | peak {peak / 1024:8.1f} KiB | retained {allocated / 1024:8.1f} KiB")
+    return per_call_us
+
+
+if __name__ == "__main__":
+    llm = FakeListLLM(responses=["Thought: I now know the final answer\nFinal Answer: ok"])
+    memory = make_memory()
+
+    def old_setup():
+        build_agent_executor(llm, DUMMY_TOOLS, memory)
+
+    prebuilt = build_agent_executor(llm, DUMMY_TOOLS)
+
+    def new_setup():
+        return {"input": "질문", "chat_history": memory_to_chat_history(memory)}
+
+    print("===== Agent 요청당 준비 비용 =====")
+    old_us = measure("rebuild per request", old_setup)
+    new_us = measure("prebuilt + bind    ", new_setup)
+    print(f"\n요청당 절감: {old_us - new_us:.1f} us ({old_us / max(new_us, 1e-9):.1f}x)")
+
+    # 전체 invoke 비교 (Fake LLM이라 LLM 비용은 거의 0)
+    started = time.perf_counter()
+    for _ in range(ITERATIONS):
+        build_agent_executor(llm, DUMMY_TOOLS, make_memory()).invoke({"input": "질문"})
+    old_invoke = (time.perf_counter() - started) / ITERATIONS * 1000
+
+    started = time.perf_counter()
+    for _ in range(ITERATIONS):
+        prebuilt.invoke({"input": "질문", "chat_history": memory_to_chat_history(memory)})
+    new_invoke = (time.perf_counter() - started) / ITERATIONS * 1000
+
+    print(f"invoke 포함: 이전 {old_invoke:.2f} ms → 현재 {new_invoke:.2f} ms")
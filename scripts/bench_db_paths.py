@@ -0,0 +1,84 @@
+"""
+자주 쓰는 조회의 지연시간 비교: PostgREST vs 직접 SQL(text) vs 직접 SQL(prepared statement)
+
+같은 쿼리(채팅 기록 조회, 처방전 단건 조회, 선택적으로 메시지 저장)를 경로별로 순차 반복해서
+p50/p95 지연시간을 출력. 직접 SQL 경로는 커넥션 풀을 재사용 (DB_BACKEND=sql과 같은 코드)
+
+실행: BENCH_USER_ID=1 BENCH_PRESCRIPTION_ID=1 python -m scripts.bench_db_paths
+환경 변수: BENCH_USER_ID, BENCH_PRESCRIPTION_ID, BENCH_ROUNDS,
+          BENCH_WRITE=1 (메시지 저장도 측정 - 해당 사용자 채팅에 벤치마크 메시지가 실제로 저장됨)
+"""
+import os
+import statistics
+import time
+from app.core.config import settings
+
+# 직접 SQL 경로 사용 (PREPARE는 커넥션마다 첫 실행 때)
+settings.DB_BACKEND = "sql"
+settings.DB_PREPARED_STATEMENTS = True
+
+from app.core.database import supabase_client
+from app.repositories import sql_repository
+
+USER_ID = os.environ["BENCH_USER_ID"]
+PRESCRIPTION_ID = int(os.environ["BENCH_PRESCRIPTION_ID"])
+ROUNDS = int(os.getenv("BENCH_ROUNDS", "50"))
+WRITE = os.getenv("BENCH_WRITE") == "1"
+
+
+def postgrest_queries() -> dict:
+    supabase = supabase_client()
+    queries = {
+        "load_history": lambda: supabase.table("prescription_chats").select(
+            "id, message, sender_type, created_at"
+        ).eq("user_id", USER_ID).order("created_at", desc=True).limit(settings.CHAT_HISTORY_WINDOW).execute(),
+        "get_prescription": lambda: supabase.table("prescriptions").select(sql_repository.PRESCRIPTION_COLUMNS).eq(
+            "id", PRESCRIPTION_ID
+        ).execute(),
+    }
+    if WRITE:
+        queries["insert_message"] = lambda: supabase.table("prescription_chats").insert({
+            "user_id": USER_ID, "prescription_id": None, "message": "bench", "sender_type": "user"
+        }).execute()
+    return queries
+
+
+def sql_queries() -> dict:
+    queries = {
+        "load_history": lambda: sql_repository.load_history(USER_ID, settings.CHAT_HISTORY_WINDOW),
+        "get_prescription": lambda: sql_repository.get_prescription(PRESCRIPTION_ID),
+    }
+    if WRITE:
+        queries["insert_message"] = lambda: sql_repository.insert_message(USER_ID, None, "bench", "user")
+    return queries
+
+
+def measure(fn) -> tuple:
+    fn()  # 워밍업 (연결 생성)
+    latencies = []
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - started) * 1000)
+    return statistics.median(latencies), statistics.quantiles(latencies, n=100)[94]
+
+
+def main():
+    print(f"rounds={ROUNDS}, user_id={USER_ID}, prescription_id={PRESCRIPTION_ID}, write={WRITE}")
+    print(f"{'query':>16} | {'path':>12} | {'p50 ms':>8} | {'p95 ms':>8}")
+
+    paths = [
+        ("postgrest", postgrest_queries(), None),
+        ("sql-text", sql_queries(), False),
+        ("sql-prepared", sql_queries(), True),
+    ]
+    for query in paths[0][1]:
+        for path, queries, prepared in paths:
+            if prepared is not None:
+                settings.DB_PREPARED_STATEMENTS = prepared
+            p50, p95 = measure(queries[query])
+            print(f"{query:>16} | {path:>12} | {p50:>8.1f} | {p95:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
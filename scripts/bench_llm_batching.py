@@ -0,0 +1,91 @@
+"""
+flan-t5 마이크로 배칭 처리량/지연시간 벤치마크
+
+동시 세션 수(1/4/16)별로 배칭 없이 실행할 때와 MicroBatcher를 거칠 때의
+처리량(req/s)과 요청 지연시간(p50/p95)을 비교.
+
+실행: python -m scripts.bench_llm_batching
+환경 변수: LLM_REPO_ID, LLM_BATCH_MAX_SIZE, LLM_BATCH_MAX_WAIT_MS, BENCH_REQUESTS_PER_SESSION
+"""
+from concurrent.futures import ThreadPoolExecutor
+import os
+import threading
+import time
+import torch
+from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
+from app.AImodels.local_llm import LocalSeq2SeqLLM
+from app.AImodels.batching import MicroBatcher
+
+REPO_ID = os.getenv('LLM_REPO_ID', 'google/flan-t5-large')
+MAX_BATCH_SIZE = int(os.getenv('LLM_BATCH_MAX_SIZE', '8'))
+MAX_WAIT_MS = float(os.getenv('LLM_BATCH_MAX_WAIT_MS', '10'))
+REQUESTS_PER_SESSION = int(os.getenv('BENCH_REQUESTS_PER_SESSION', '4'))
+SESSIONS = [1, 4, 16]
+MAX_NEW_TOKENS = 48
+
+PROMPTS = [
+    "Question: What is acetaminophen used for?\nThought:",
+    "Question: prescription_id: 12\nThought:",
+    "Question: Can I take ibuprofen with food?\nThought:",
+    "Question: What are the side effects of amoxicillin?\nThought:",
+]
+
+
+def percentile(values: list, ratio: float) -> float:
+    values = sorted(values)
+    return values[min(int(round(ratio * (len(values) - 1))), len(values) - 1)]
+
+
+def run_sessions(llm: LocalSeq2SeqLLM, sessions: int) -> dict:
+    """sessions개의 스레드가 각각 REQUESTS_PER_SESSION번 순차 호출"""
+    latencies = []
+    lock = threading.Lock()
+
+    def session(index: int):
+        for i in range(REQUESTS_PER_SESSION):
+            prompt = PROMPTS[(index + i) % len(PROMPTS)]
+            started = time.perf_counter()
+            llm.invoke(prompt, max_new_tokens=MAX_NEW_TOKENS)
+            with lock:
+                latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        list(pool.map(session, range(sessions)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "throughput": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 0.5) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+    }
+
+
+if __name__ == "__main__":
+    torch.set_grad_enabled(False)
+    print(f"모델 로드: {REPO_ID}")
+    tokenizer = AutoTokenizer.from_pretrained(REPO_ID)
+    model = AutoModelForSeq2SeqLM.from_pretrained(REPO_ID, torch_dtype=torch.float32).eval()
+
+    # 현재 방식: 각 세션이 batch size 1로 같은 모델의 generate를 각자 호출
+    unbatched = LocalSeq2SeqLLM(model=model, tokenizer=tokenizer, max_new_tokens=MAX_NEW_TOKENS)
+
+    batched = LocalSeq2SeqLLM(model=model, tokenizer=tokenizer, max_new_tokens=MAX_NEW_TOKENS)
+    batched.batcher = MicroBatcher(
+        run_batch=batched._run_batch,
+        max_batch_size=MAX_BATCH_SIZE,
+        max_wait_ms=MAX_WAIT_MS,
+        name="bench_batch"
+    )
+
+    run_sessions(unbatched, 1)  # 워밍업
+
+    print(f"\n===== 배치 최대 {MAX_BATCH_SIZE}, 대기 {MAX_WAIT_MS}ms, 세션당 {REQUESTS_PER_SESSION}회 =====")
+    print(f"{'sessions':>8} | {'mode':>9} | {'req/s':>7} | {'p50 ms':>8} | {'p95 ms':>8}")
+    for sessions in SESSIONS:
+        for label, llm in (("unbatched", unbatched), ("batched", batched)):
+            result = run_sessions(llm, sessions)
+            print(
+                f"{sessions:>8} | {label:>9} | {result['throughput']:7.2f} | "
+                f"{result['p50_ms']:8.0f} | {result['p95_ms']:8.0f}"
+            )
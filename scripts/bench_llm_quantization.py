@@ -0,0 +1,119 @@
+"""
+flan-t5 float32 vs int8 동적 양자화 비교 벤치마크
+
+모드별로 별도 프로세스에서 측정 (메모리 측정이 서로 섞이지 않도록):
+    - 모델 로드 시간
+    - 상주 메모리(RSS) 증가량
+    - 생성 속도 (tokens/sec)
+    - 고정 프롬프트에 대한 Agent Tool 선택 정확도
+
+실행: python -m scripts.bench_llm_quantization
+환경 변수: LLM_REPO_ID
+"""
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+REPO_ID = os.getenv('LLM_REPO_ID', 'google/flan-t5-large')
+MODES = ["none", "int8"]
+MAX_NEW_TOKENS = 64
+
+TOOL_DESCRIPTIONS = {
+    "VL_Model_Image_Analyzer": "처방전 이미지 분석. 질문에 'prescription_id: 숫자'가 있으면 반드시 사용.",
+    "Public_Data_API_Searcher": "약물 이름, 의약품 정보(효능, 부작용 등) 검색.",
+}
+
+# (질문, 기대하는 Tool 이름 - None이면 Tool 없이 바로 답변)
+EVAL_CASES = [
+    ("prescription_id: 15\n사용자 질문: 这张处方上写了什么？", "VL_Model_Image_Analyzer"),
+    ("prescription_id: 3\n사용자 질문: What medicine is on my prescription?", "VL_Model_Image_Analyzer"),
+    ("What are the side effects of Tylenol?", "Public_Data_API_Searcher"),
+    ("Tell me the usage of ibuprofen tablets.", "Public_Data_API_Searcher"),
+    ("타이레놀 부작용 알려줘", "Public_Data_API_Searcher"),
+    ("Can I take aspirin with amoxicillin?", "Public_Data_API_Searcher"),
+    ("Hello! Who are you?", None),
+    ("Thank you for your help.", None),
+]
+
+ACTION_PATTERN = re.compile(r"Action\s*:\s*([A-Za-z_]+)")
+
+
+def read_rss_mb() -> float:
+    """현재 프로세스 상주 메모리 (Linux /proc 기준)"""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def chosen_tool(output: str):
+    """모델 출력에서 선택한 Tool 이름 (Final Answer가 먼저 나오면 None)"""
+    final_index = output.find("Final Answer")
+    match = ACTION_PATTERN.search(output)
+    if match and (final_index < 0 or match.start() < final_index):
+        return match.group(1)
+    return None
+
+
+def run_mode(mode: str) -> dict:
+    import torch
+    from app.AImodels.local_llm import LocalSeq2SeqLLM, load_seq2seq_model
+    from app.AImodels.prompts import AGENT_PROMPT_TEMPLATE
+
+    torch.set_grad_enabled(False)
+    rss_before = read_rss_mb()
+    started = time.perf_counter()
+    tokenizer, model = load_seq2seq_model(REPO_ID, quantization=mode)
+    load_seconds = time.perf_counter() - started
+    rss_after = read_rss_mb()
+
+    llm = LocalSeq2SeqLLM(model=model, tokenizer=tokenizer, max_new_tokens=MAX_NEW_TOKENS)
+    tools_text = "\n".join(f"{name}: {desc}" for name, desc in TOOL_DESCRIPTIONS.items())
+
+    correct = 0
+    total_tokens = 0
+    generate_seconds = 0.0
+    for question, expected in EVAL_CASES:
+        prompt = AGENT_PROMPT_TEMPLATE.format(
+            tools=tools_text,
+            tool_names=", ".join(TOOL_DESCRIPTIONS),
+            chat_history="",
+            input=question,
+            agent_scratchpad=""
+        )
+        started = time.perf_counter()
+        output, num_tokens = llm.generate_batch([prompt], max_new_tokens=MAX_NEW_TOKENS, stop=("Observation",))[0]
+        generate_seconds += time.perf_counter() - started
+        total_tokens += num_tokens
+        correct += int(chosen_tool(output) == expected)
+
+    return {
+        "mode": mode,
+        "load_seconds": load_seconds,
+        "rss_mb": rss_after - rss_before,
+        "tokens_per_second": total_tokens / generate_seconds if generate_seconds else 0.0,
+        "accuracy": correct / len(EVAL_CASES),
+    }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "--mode":
+        print(json.dumps(run_mode(sys.argv[2])))
+        sys.exit(0)
+
+    print(f"===== {REPO_ID}: float32 vs int8 ({len(EVAL_CASES)} prompts) =====")
+    print(f"{'mode':>5} | {'load s':>7} | {'RSS MB':>8} | {'tok/s':>7} | {'tool acc':>8}")
+    for mode in MODES:
+        completed = subprocess.run(
+            [sys.executable, "-m", "scripts.bench_llm_quantization", "--mode", mode],
+            capture_output=True, text=True, check=True
+        )
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        print(
+            f"{result['mode']:>5} | {result['load_seconds']:7.1f} | {result['rss_mb']:8.0f} | "
+            f"{result['tokens_per_second']:7.1f} | {result['accuracy']:8.0%}"
+        )
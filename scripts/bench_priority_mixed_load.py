@@ -0,0 +1,79 @@
+"""
+추론 우선순위 스케줄러 벤치마크 (혼합 부하)
+
+대량 백그라운드 분석(한 번에 몰아서 제출)과 일정 간격으로 들어오는 대화형 채팅을
+같은 InferenceExecutor에 제출해서 클래스별 p50/p95 지연시간(제출 → 완료)을 비교.
+모든 작업을 같은 우선순위로 제출한 경우(FIFO)와 우선순위를 나눈 경우를 함께 출력.
+
+작업은 모델 대신 고정 시간 sleep으로 흉내냄 (스케줄링 효과만 측정)
+
+실행: python -m scripts.bench_priority_mixed_load
+환경 변수: BENCH_WORKERS, BENCH_BACKGROUND_JOBS, BENCH_BACKGROUND_MS,
+          BENCH_INTERACTIVE_JOBS, BENCH_INTERACTIVE_MS, BENCH_INTERVAL_MS, PRIORITY_AGING_SECONDS
+"""
+from concurrent.futures import wait
+import os
+import statistics
+import time
+from app.core.priority import INTERACTIVE, BACKGROUND
+from app.services.inference_executor import InferenceExecutor
+
+WORKERS = int(os.getenv("BENCH_WORKERS", "1"))
+BACKGROUND_JOBS = int(os.getenv("BENCH_BACKGROUND_JOBS", "40"))
+BACKGROUND_MS = float(os.getenv("BENCH_BACKGROUND_MS", "100"))
+INTERACTIVE_JOBS = int(os.getenv("BENCH_INTERACTIVE_JOBS", "20"))
+INTERACTIVE_MS = float(os.getenv("BENCH_INTERACTIVE_MS", "50"))
+INTERVAL_MS = float(os.getenv("BENCH_INTERVAL_MS", "150"))
+
+
+def percentile(values: list, q: int) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100)[q - 1]
+
+
+def run_mixed_load(use_priority: bool) -> dict:
+    executor = InferenceExecutor(
+        max_workers=WORKERS,
+        queue_size=BACKGROUND_JOBS + INTERACTIVE_JOBS
+    )
+    latencies = {"interactive": [], "background": []}
+
+    def job(kind: str, service_ms: float, submitted_at: float) -> None:
+        time.sleep(service_ms / 1000)
+        latencies[kind].append((time.perf_counter() - submitted_at) * 1000)
+
+    def submit(kind: str, priority: int, service_ms: float):
+        return executor.submit(
+            job, kind, service_ms, time.perf_counter(),
+            priority=priority if use_priority else INTERACTIVE
+        )
+
+    # 대량 분석 작업을 먼저 몰아서 제출
+    futures = [submit("background", BACKGROUND, BACKGROUND_MS) for _ in range(BACKGROUND_JOBS)]
+    # 대화형 요청은 일정 간격으로 도착
+    for _ in range(INTERACTIVE_JOBS):
+        futures.append(submit("interactive", INTERACTIVE, INTERACTIVE_MS))
+        time.sleep(INTERVAL_MS / 1000)
+    wait(futures)
+
+    return {
+        kind: (percentile(values, 50), percentile(values, 95))
+        for kind, values in latencies.items()
+    }
+
+
+def main():
+    print(
+        f"workers={WORKERS}, background={BACKGROUND_JOBS}x{BACKGROUND_MS:.0f}ms, "
+        f"interactive={INTERACTIVE_JOBS}x{INTERACTIVE_MS:.0f}ms every {INTERVAL_MS:.0f}ms"
+    )
+    print(f"{'mode':>8} | {'class':>11} | {'p50 ms':>8} | {'p95 ms':>8}")
+    for mode, use_priority in (("fifo", False), ("priority", True)):
+        result = run_mixed_load(use_priority)
+        for kind, (p50, p95) in result.items():
+            print(f"{mode:>8} | {kind:>11} | {p50:>8.1f} | {p95:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Supabase 왕복 지연시간 벤치마크: 요청마다 create_client vs 프로세스 공용 클라이언트
+
+같은 PostgREST 조회를 순차로 반복해서 p50/p95 지연시간을 비교.
+"per-request"는 기존 방식(매번 새 클라이언트 → 새 연결/TLS 핸드셰이크),
+"shared"는 app.core.database.supabase_client() (keep-alive 커넥션 풀 재사용)
+
+실행: python -m scripts.bench_supabase_client
+환경 변수: BENCH_TABLE (기본 hospitals), BENCH_ROUNDS
+"""
+from supabase import create_client
+import os
+import statistics
+import time
+from app.core.config import settings
+from app.core.database import supabase_client, close_supabase
+
+TABLE = os.getenv("BENCH_TABLE", "hospitals")
+ROUNDS = int(os.getenv("BENCH_ROUNDS", "30"))
+
+
+def query(client) -> None:
+    client.table(TABLE).select("id").limit(1).execute()
+
+
+def measure(get_client) -> list:
+    latencies = []
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        query(get_client())
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+def main():
+    modes = {
+        "per-request": lambda: create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY),
+        "shared": supabase_client,
+    }
+
+    # 워밍업 (DNS 조회 등)
+    query(supabase_client())
+
+    print(f"table={TABLE}, rounds={ROUNDS}")
+    print(f"{'mode':>11} | {'p50 ms':>8} | {'p95 ms':>8} | {'mean ms':>8}")
+    for mode, get_client in modes.items():
+        latencies = measure(get_client)
+        p50 = statistics.median(latencies)
+        p95 = statistics.quantiles(latencies, n=100)[94]
+        print(f"{mode:>11} | {p50:>8.1f} | {p95:>8.1f} | {statistics.mean(latencies):>8.1f}")
+
+    close_supabase()
+
+
+if __name__ == "__main__":
+    main()
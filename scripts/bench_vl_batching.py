@@ -0,0 +1,71 @@
+"""
+Qwen2-VL 배치 추론 처리량 벤치마크 (CPU)
+
+배치 크기(1/2/4/8)별로 QwenModel.predict_batch 한 번에 처리한 이미지 수를
+측정해서 images/sec와 배치당 지연시간을 비교.
+
+실행: python -m scripts.bench_vl_batching
+환경 변수: VL_MODEL_NAME, BENCH_IMAGE (처방전 이미지 경로, 없으면 합성 이미지),
+          BENCH_MAX_NEW_TOKENS, BENCH_ROUNDS
+"""
+from PIL import Image, ImageDraw
+import os
+import time
+from app.AImodels.qwen_model import QwenModel
+
+MODEL_NAME = os.getenv("VL_MODEL_NAME", "Rfy23/qwen2vl-ko-zh")
+IMAGE_PATH = os.getenv("BENCH_IMAGE")
+MAX_NEW_TOKENS = int(os.getenv("BENCH_MAX_NEW_TOKENS", "64"))
+ROUNDS = int(os.getenv("BENCH_ROUNDS", "2"))
+BATCH_SIZES = [1, 2, 4, 8]
+PROMPT = "这张处方上写了什么？"
+
+
+def load_image(index: int) -> Image.Image:
+    if IMAGE_PATH:
+        return Image.open(IMAGE_PATH).convert("RGB")
+    # 처방전 비슷한 합성 이미지 (배치 안에서 서로 다른 이미지가 되도록 index 표시)
+    image = Image.new("RGB", (640, 480), "white")
+    draw = ImageDraw.Draw(image)
+    draw.text((40, 40), f"Prescription #{index}", fill="black")
+    for line in range(8):
+        draw.text((40, 100 + line * 40), f"Drug {line}: 500mg x {line + 1} / day", fill="black")
+    return image
+
+
+def build_messages(image: Image.Image) -> list:
+    return [
+        {
+            "role": "user",
+            "content": [
+                {"type": "image", "image": image},
+                {"type": "text", "text": f"<image>\n{PROMPT}"}
+            ]
+        }
+    ]
+
+
+def main():
+    model = QwenModel(model_name=MODEL_NAME, device="cpu")
+    images = [load_image(i) for i in range(max(BATCH_SIZES))]
+
+    # 워밍업
+    model.predict_batch([build_messages(images[0])], max_new_tokens=8)
+
+    print(f"{'batch':>5} | {'images/s':>8} | {'batch ms':>9} | {'ms/image':>8}")
+    for batch_size in BATCH_SIZES:
+        messages_list = [build_messages(image) for image in images[:batch_size]]
+        started = time.perf_counter()
+        for _ in range(ROUNDS):
+            model.predict_batch(messages_list, max_new_tokens=MAX_NEW_TOKENS)
+        elapsed = time.perf_counter() - started
+
+        batch_ms = elapsed / ROUNDS * 1000
+        print(
+            f"{batch_size:>5} | {batch_size * ROUNDS / elapsed:>8.3f} | "
+            f"{batch_ms:>9.0f} | {batch_ms / batch_size:>8.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
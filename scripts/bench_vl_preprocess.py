@@ -0,0 +1,103 @@
+"""
+처방전 이미지 전처리 벤치마크: 기존 경로 vs 픽셀 예산 전처리
+
+이미지별로 두 경로의 전처리 시간, visual token 수, (옵션) VL 추론 지연시간을 비교.
+- 기존: Image.open(...).convert("RGB") → process_vision_info 기본 픽셀 범위
+- 전처리: preprocess_prescription_image → VL_MIN_PIXELS/VL_MAX_PIXELS
+
+실행: python -m scripts.bench_vl_preprocess
+환경 변수: VL_MODEL_NAME, BENCH_IMAGE_DIR (샘플 이미지 폴더, 없으면 12MP 합성 사진),
+          BENCH_RUN_MODEL (false면 visual token 수만 측정), BENCH_MAX_NEW_TOKENS
+"""
+from PIL import Image, ImageDraw
+from io import BytesIO
+from pathlib import Path
+import os
+import time
+from transformers import AutoProcessor
+from qwen_vl_utils import process_vision_info
+from app.AImodels.image_preprocess import preprocess_prescription_image, VL_MIN_PIXELS, VL_MAX_PIXELS
+
+MODEL_NAME = os.getenv("VL_MODEL_NAME", "Rfy23/qwen2vl-ko-zh")
+IMAGE_DIR = os.getenv("BENCH_IMAGE_DIR")
+RUN_MODEL = os.getenv("BENCH_RUN_MODEL", "true").lower() == "true"
+MAX_NEW_TOKENS = int(os.getenv("BENCH_MAX_NEW_TOKENS", "64"))
+PROMPT = "这张处方上写了什么？"
+
+
+def synthetic_photo() -> bytes:
+    """책상 위에 놓인 처방전을 찍은 12MP 사진 흉내 (회색 배경 + 흰 종이 + 글씨)"""
+    image = Image.new("RGB", (4032, 3024), (150, 140, 130))
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((900, 500, 3100, 2700), fill=(245, 243, 238))
+    for line in range(20):
+        draw.text((1000, 600 + line * 90), f"Drug {line}: 500mg x {line % 3 + 1} / day", fill="black")
+    buffer = BytesIO()
+    image.save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def load_samples() -> list:
+    if IMAGE_DIR:
+        paths = sorted(p for p in Path(IMAGE_DIR).iterdir() if p.suffix.lower() in (".jpg", ".jpeg", ".png"))
+        return [(p.name, p.read_bytes()) for p in paths]
+    return [("synthetic_12mp.jpg", synthetic_photo())]
+
+
+def build_messages(image: Image.Image, bounds: dict) -> list:
+    return [
+        {
+            "role": "user",
+            "content": [
+                {"type": "image", "image": image, **bounds},
+                {"type": "text", "text": f"<image>\n{PROMPT}"}
+            ]
+        }
+    ]
+
+
+def prepare(image_bytes: bytes, preprocess: bool):
+    started = time.perf_counter()
+    if preprocess:
+        image = preprocess_prescription_image(image_bytes)
+        bounds = {"min_pixels": VL_MIN_PIXELS, "max_pixels": VL_MAX_PIXELS}
+    else:
+        image = Image.open(BytesIO(image_bytes)).convert("RGB")
+        bounds = {}
+    messages = build_messages(image, bounds)
+    image_inputs, _ = process_vision_info(messages)
+    return messages, image_inputs, (time.perf_counter() - started) * 1000
+
+
+def main():
+    processor = AutoProcessor.from_pretrained(MODEL_NAME)
+    merge_length = processor.image_processor.merge_size ** 2
+    model = None
+    if RUN_MODEL:
+        from app.AImodels.qwen_model import QwenModel
+        # min/max_pixels를 지정하지 않아야 기존 경로가 그대로 재현됨 (전처리 경로는 메시지에 지정)
+        model = QwenModel(model_name=MODEL_NAME, device="cpu")
+
+    print(f"{'image':<24} | {'path':<10} | {'input':>11} | {'prep ms':>8} | {'vis tokens':>10} | {'infer ms':>9}")
+    for name, image_bytes in load_samples():
+        with Image.open(BytesIO(image_bytes)) as original:
+            input_size = f"{original.width}x{original.height}"
+        for label, preprocess in (("current", False), ("preprocess", True)):
+            messages, image_inputs, prep_ms = prepare(image_bytes, preprocess)
+            grid = processor.image_processor(images=image_inputs, return_tensors="pt")["image_grid_thw"]
+            visual_tokens = int(grid.prod(-1).sum()) // merge_length
+
+            infer_ms = float("nan")
+            if model is not None:
+                started = time.perf_counter()
+                model.predict_batch([messages], max_new_tokens=MAX_NEW_TOKENS)
+                infer_ms = (time.perf_counter() - started) * 1000
+
+            print(
+                f"{name[:24]:<24} | {label:<10} | {input_size:>11} | {prep_ms:>8.0f} | "
+                f"{visual_tokens:>10} | {infer_ms:>9.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
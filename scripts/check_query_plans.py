@@ -0,0 +1,138 @@
+"""
+자주 쓰는 조회의 실행 계획 확인 (EXPLAIN)
+
+엔드포인트가 PostgREST로 보내는 조회와 같은 SQL을 EXPLAIN (FORMAT JSON)으로 확인해서
+대상 테이블을 인덱스로 읽는지(Index Scan / Index Only Scan / Bitmap Index Scan) 검사.
+하나라도 Seq Scan이면 종료 코드 1 (배포 전/마이그레이션 후 확인용)
+
+실행: python -m scripts.check_query_plans
+환경 변수: DATABASE_URL (없으면 .env 설정), CHECK_USER_ID, CHECK_PRESCRIPTION_ID, CHECK_GOOGLE_ID
+"""
+from datetime import datetime, timezone
+from sqlalchemy import create_engine, text
+import json
+import os
+import sys
+
+# Bitmap Heap Scan은 아래 Bitmap Index Scan으로 찾은 행만 읽음
+INDEX_SCANS = {"Index Scan", "Index Only Scan", "Bitmap Heap Scan"}
+
+# 커서 페이지 조건 (app.core.pagination.older_than_filter가 PostgREST로 보내는 것과 같은 형태)
+KEYSET = "(created_at < :cursor_created_at OR (created_at = :cursor_created_at AND id < :cursor_id))"
+
+# 이름 → (대상 테이블, SQL, 호출 위치)
+HOT_QUERIES = {
+    "chat_history": (
+        "prescription_chats",
+        """SELECT id, message, sender_type, created_at FROM prescription_chats
+           WHERE user_id = :user_id ORDER BY created_at DESC LIMIT 12""",
+        "chat_repository.load_history / chat_service.load_chat_history_from_db",
+    ),
+    "chat_messages_page": (
+        "prescription_chats",
+        f"""SELECT id, user_id, prescription_id, message, sender_type, created_at FROM prescription_chats
+           WHERE user_id = :user_id AND {KEYSET}
+           ORDER BY created_at DESC, id DESC LIMIT 26""",
+        "GET /prescriptions/messages?cursor=",
+    ),
+    "chat_messages_by_prescription": (
+        "prescription_chats",
+        f"""SELECT id, user_id, prescription_id, message, sender_type, created_at FROM prescription_chats
+           WHERE user_id = :user_id AND prescription_id = :prescription_id AND {KEYSET}
+           ORDER BY created_at DESC, id DESC LIMIT 26""",
+        "GET /prescriptions/messages?prescription_id=&cursor=",
+    ),
+    "user_prescriptions": (
+        "prescriptions",
+        f"""SELECT id, user_id, file_url, original_filename, analysis_status, created_at FROM prescriptions
+           WHERE user_id = :user_id AND {KEYSET}
+           ORDER BY created_at DESC, id DESC LIMIT 21""",
+        "GET /prescriptions/user/{user_id}?cursor=",
+    ),
+    "user_by_google_id": (
+        "users",
+        "SELECT * FROM users WHERE google_id = :google_id",
+        "auth_service.get_or_create_user",
+    ),
+    "hospitals_page": (
+        "hospitals",
+        "SELECT * FROM hospitals ORDER BY created_at LIMIT 20 OFFSET 0",
+        "GET /hospitals",
+    ),
+    "analysis_cache_lookup": (
+        "vl_analysis_cache",
+        """SELECT analysis, perceptual_hash, user_id FROM vl_analysis_cache
+           WHERE content_hash = :content_hash AND prompt = :prompt AND model_version = :model_version LIMIT 1""",
+        "analysis_cache.get",
+    ),
+}
+
+
+def _index_names(plan: dict) -> list:
+    names = [plan["Index Name"]] if plan.get("Index Name") else []
+    for child in plan.get("Plans", []):
+        names.extend(_index_names(child))
+    return names
+
+
+def _scans(plan: dict, table: str) -> list:
+    """계획 트리에서 table을 읽는 노드 목록 [(노드 종류, 사용한 인덱스)]"""
+    found = []
+    if plan.get("Relation Name") == table:
+        found.append((plan["Node Type"], ", ".join(_index_names(plan)) or None))
+    for child in plan.get("Plans", []):
+        found.extend(_scans(child, table))
+    return found
+
+
+def check_plans(conn, params: dict, queries: dict = HOT_QUERIES) -> list:
+    """
+    Returns:
+        list: (이름, 통과 여부, [(노드 종류, 인덱스 이름)]) - queries 순서
+    """
+    results = []
+    for name, (table, sql, _) in queries.items():
+        row = conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"), params).scalar()
+        plan = (json.loads(row) if isinstance(row, str) else row)[0]["Plan"]
+        scans = _scans(plan, table)
+        ok = bool(scans) and all(node in INDEX_SCANS for node, _ in scans)
+        results.append((name, ok, scans))
+    return results
+
+
+def default_params() -> dict:
+    return {
+        "user_id": int(os.getenv("CHECK_USER_ID", "1")),
+        "prescription_id": int(os.getenv("CHECK_PRESCRIPTION_ID", "1")),
+        # 둘째 페이지 이후 조회 (커서 = 지금 시각)
+        "cursor_created_at": datetime.now(timezone.utc),
+        "cursor_id": 2 ** 62,
+        "google_id": os.getenv("CHECK_GOOGLE_ID", "google-1"),
+        "content_hash": "0" * 64,
+        "prompt": "这张处方上写了什么？",
+        "model_version": "bench",
+    }
+
+
+def print_results(results: list) -> None:
+    print(f"{'query':>30} | {'result':>6} | scans")
+    for name, ok, scans in results:
+        detail = ", ".join(f"{node}({index})" if index else node for node, index in scans) or "-"
+        print(f"{name:>30} | {'OK' if ok else 'FAIL':>6} | {detail}")
+
+
+def main():
+    url = os.getenv("DATABASE_URL")
+    if not url:
+        from app.core.config import settings
+        url = settings.DATABASE_URL
+
+    engine = create_engine(url)
+    with engine.connect() as conn:
+        results = check_plans(conn, default_params())
+    print_results(results)
+    sys.exit(0 if all(ok for _, ok, _ in results) else 1)
+
+
+if __name__ == "__main__":
+    main()
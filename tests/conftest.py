@@ -0,0 +1,21 @@
+# tests/conftest.py
+"""
+테스트 공통 설정
+app.core.config.Settings의 필수 환경 변수 기본값 (실제 서비스에 연결하지 않는 더미 값)
+"""
+import os
+
+for name, value in {
+    "DATABASE_URL": "postgresql://localhost/test",
+    "SUPABASE_URL": "http://localhost:54321",
+    "SUPABASE_KEY": "test",
+    "AWS_ACCESS_KEY_ID": "test",
+    "AWS_SECRET_ACCESS_KEY": "test",
+    "AWS_BUCKET_NAME": "test",
+    "GOOGLE_CLIENT_ID": "test",
+    "GOOGLE_CLIENT_SECRET": "test",
+    "GOOGLE_REDIRECT_URI": "http://localhost/callback",
+    "JWT_SECRET_KEY": "test",
+    "DRUG_API_SERVICE_KEY": "test",
+}.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,142 @@
+# tests/test_analysis_worker.py
+"""
+분석 워커: 조건부 UPDATE 한 번으로 행을 가져감 (한 곳만 성공), 오래된 processing/analyzing은 다시 가져감
+PostgREST 필터는 테스트용 테이블에서 같은 의미로 평가
+"""
+from datetime import datetime, timedelta, timezone
+import re
+import pytest
+
+pytest.importorskip("pydantic_settings")
+pytest.importorskip("supabase")
+pytest.importorskip("boto3")
+pytest.importorskip("PIL")
+
+from app.core import analysis_status
+from app.core.config import settings
+from app.services import analysis_worker
+from app.services.analysis_worker import AnalysisWorkerPool, _claimable_filter
+
+_AND = re.compile(r'^and\(analysis_status\.in\.\(([^)]*)\),claimed_at\.lt\."([^"]+)"\)$')
+
+
+def _matches(row: dict, or_filter: str) -> bool:
+    """_claimable_filter가 만드는 or 필터 평가 (status.eq 또는 and(status.in, claimed_at.lt))"""
+    pending, stale = or_filter.split(",", 1)
+    if row["analysis_status"] == pending.removeprefix("analysis_status.eq."):
+        return True
+    statuses, before = _AND.match(stale).groups()
+    return (
+        row["analysis_status"] in statuses.split(",")
+        and row["claimed_at"] is not None
+        and datetime.fromisoformat(row["claimed_at"]) < datetime.fromisoformat(before)
+    )
+
+
+class FakeQuery:
+    def __init__(self, table: "FakeTable", update: dict = None):
+        self.table = table
+        self.update_values = update
+        self.conditions = []
+        self.limit_count = None
+
+    def select(self, columns):
+        return self
+
+    def update(self, values):
+        self.update_values = values
+        return self
+
+    def eq(self, column, value):
+        self.conditions.append(lambda row: row[column] == value)
+        return self
+
+    def or_(self, or_filter):
+        self.conditions.append(lambda row: _matches(row, or_filter))
+        return self
+
+    def order(self, column):
+        return self
+
+    def limit(self, count):
+        self.limit_count = count
+        return self
+
+    def execute(self):
+        rows = [row for row in self.table.rows if all(condition(row) for condition in self.conditions)]
+        rows = rows[:self.limit_count] if self.limit_count else rows
+        if self.update_values is not None:
+            for row in rows:
+                row.update(self.update_values)
+        return type("Result", (), {"data": [dict(row) for row in rows]})()
+
+
+class FakeTable:
+    def __init__(self, rows: list):
+        self.rows = rows
+
+    def table(self, name):
+        assert name == "prescriptions"
+        return FakeQuery(self)
+
+
+def _ago(seconds: float) -> str:
+    return (datetime.now(timezone.utc) - timedelta(seconds=seconds)).isoformat()
+
+
+@pytest.fixture
+def rows():
+    timeout = settings.ANALYSIS_CLAIM_TIMEOUT_SECONDS
+    return [
+        {"id": 1, "analysis_status": analysis_status.PENDING, "claimed_at": None},
+        {"id": 2, "analysis_status": analysis_status.PROCESSING, "claimed_at": _ago(10)},
+        {"id": 3, "analysis_status": analysis_status.PROCESSING, "claimed_at": _ago(timeout + 60)},
+        {"id": 4, "analysis_status": analysis_status.ANALYZING, "claimed_at": _ago(timeout + 60)},
+        {"id": 5, "analysis_status": analysis_status.ANALYZING, "claimed_at": _ago(10)},
+        {"id": 6, "analysis_status": analysis_status.COMPLETED, "claimed_at": _ago(timeout + 60)},
+        {"id": 7, "analysis_status": analysis_status.FAILED, "claimed_at": None},
+    ]
+
+
+def test_claimable_filter_covers_pending_and_stale_rows(rows):
+    or_filter = _claimable_filter(datetime.now(timezone.utc))
+    assert [row["id"] for row in rows if _matches(row, or_filter)] == [1, 3, 4]
+
+
+def test_only_one_claim_succeeds(rows):
+    table = FakeTable(rows)
+    first, second = AnalysisWorkerPool(1, 10), AnalysisWorkerPool(1, 10)
+
+    assert first._claim(table, 1)
+    assert rows[0]["analysis_status"] == analysis_status.PROCESSING
+    assert rows[0]["claimed_at"] is not None
+    # 방금 가져간 행은 오래되지 않았으므로 다른 워커는 가져가지 못함
+    assert not second._claim(table, 1)
+    # 진행 중(최근)이거나 끝난 행도 가져가지 않음
+    assert not second._claim(table, 2)
+    assert not second._claim(table, 6)
+    # 오래된 processing/analyzing은 중단된 것으로 보고 다시 가져감
+    assert second._claim(table, 3)
+    assert second._claim(table, 4)
+
+
+def test_unclaimed_job_is_skipped(rows, monkeypatch):
+    submitted = []
+    monkeypatch.setattr(analysis_worker, "supabase_client", lambda: FakeTable(rows))
+    pool = AnalysisWorkerPool(1, 10)
+    monkeypatch.setattr(pool, "_submit", lambda *args: submitted.append(args))
+
+    pool._run_job(5)
+    assert submitted == []
+    assert rows[4]["analysis_status"] == analysis_status.ANALYZING
+
+
+def test_recover_pending_enqueues_claimable_rows_once(rows, monkeypatch):
+    monkeypatch.setattr(analysis_worker, "supabase_client", lambda: FakeTable(rows))
+    pool = AnalysisWorkerPool(1, 10)
+
+    assert pool.recover_pending() == 3
+    assert sorted(pool._queued_ids) == [1, 3, 4]
+    # 이미 큐에 있는 작업은 다시 넣지 않음
+    pool.recover_pending()
+    assert pool._queue.qsize() == 3
@@ -0,0 +1,59 @@
+# tests/test_batching.py
+"""
+MicroBatcher: max_wait_ms 동안 같은 group_key 요청끼리 모아서 한 번에 실행, max_batch_size를 넘지 않음
+"""
+import threading
+import pytest
+
+pytest.importorskip("pydantic_settings")
+
+from app.AImodels.batching import MicroBatcher
+
+
+class Recorder:
+    def __init__(self):
+        self.batches = []
+        self.lock = threading.Lock()
+
+    def __call__(self, payloads):
+        with self.lock:
+            self.batches.append(list(payloads))
+        return [payload * 10 for payload in payloads]
+
+
+def test_requests_are_grouped_by_key():
+    recorder = Recorder()
+    batcher = MicroBatcher(recorder, max_batch_size=8, max_wait_ms=100, name="test_batch")
+    try:
+        futures = [batcher.submit(1, "a"), batcher.submit(2, "b"), batcher.submit(3, "a"), batcher.submit(4, "a")]
+        assert [future.result(timeout=5) for future in futures] == [10, 20, 30, 40]
+    finally:
+        batcher.close()
+
+    assert recorder.batches == [[1, 3, 4], [2]]
+
+
+def test_batches_are_capped_at_max_size():
+    recorder = Recorder()
+    batcher = MicroBatcher(recorder, max_batch_size=2, max_wait_ms=100, name="test_batch")
+    try:
+        futures = [batcher.submit(i) for i in range(5)]
+        assert [future.result(timeout=5) for future in futures] == [0, 10, 20, 30, 40]
+    finally:
+        batcher.close()
+
+    assert recorder.batches == [[0, 1], [2, 3], [4]]
+
+
+def test_batch_failure_is_forwarded_to_every_request():
+    def fail(payloads):
+        raise RuntimeError("out of memory")
+
+    batcher = MicroBatcher(fail, max_batch_size=4, max_wait_ms=50, name="test_batch")
+    try:
+        futures = [batcher.submit(i) for i in range(3)]
+        for future in futures:
+            with pytest.raises(RuntimeError):
+                future.result(timeout=5)
+    finally:
+        batcher.close()
@@ -0,0 +1,175 @@
+# tests/test_chat_writer_spool.py
+"""
+write-behind 스풀 파일: 같은 CHAT_WRITE_SPOOL_PATH를 쓰는 프로세스마다 다른 슬롯, 종료된 슬롯은 가져와서 저장
+재시작 복구: 스풀의 저장 안 된 메시지를 같은 client_message_id로 다시 저장 (DB에서 중복 제거), 잘린 줄은 건너뜀
+조회 병합: 대기 중인 메시지를 채팅 기록에 합치되 이미 저장된 메시지는 중복으로 넣지 않음
+저장 실패: 혼자 실패하는 메시지만 dead-letter, DB 장애면 전부 대기열에 유지
+"""
+import json
+import time
+import pytest
+
+pytest.importorskip("pydantic_settings")
+pytest.importorskip("supabase")
+pytest.importorskip("sqlalchemy")
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.services import chat_writer as chat_writer_module
+from app.services.chat_writer import ChatWriter
+
+
+def _writer(spool_path: str) -> ChatWriter:
+    return ChatWriter(batch_size=10, flush_seconds=60, max_pending=100, spool_path=spool_path)
+
+
+def test_writers_sharing_a_path_use_different_spools(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "CHAT_WRITE_BEHIND", True)
+    base = str(tmp_path / "spool.jsonl")
+    first, second = _writer(base), _writer(base)
+    first.start()
+    second.start()
+    try:
+        assert first.spool_path == base
+        assert second.spool_path == f"{base}.1"
+    finally:
+        first.stop(timeout=0)
+        second.stop(timeout=0)
+
+
+def test_orphan_spool_is_adopted(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "CHAT_WRITE_BEHIND", True)
+    # 저장 스레드가 DB에 쓰지 않도록 배치가 찰 때까지 대기 (flush_seconds=60)
+    base = str(tmp_path / "spool.jsonl")
+    row = {"user_id": "1", "prescription_id": None, "message": "안녕", "sender_type": "user",
+           "created_at": "2026-10-17T00:00:00+00:00", "client_message_id": "orphan"}
+    with open(f"{base}.3", "w", encoding="utf-8") as f:
+        f.write(json.dumps([row], ensure_ascii=False) + "\n")
+
+    writer = _writer(base)
+    writer.start()
+    try:
+        assert writer.with_pending([], "1") == [row]
+        assert not (tmp_path / "spool.jsonl.3").exists()
+        with open(base, encoding="utf-8") as f:
+            assert json.loads(f.readline()) == [row]
+    finally:
+        writer.stop(timeout=0)
+
+
+def _row(message: str) -> dict:
+    return {"user_id": "1", "prescription_id": None, "message": message, "sender_type": "user",
+            "created_at": "2026-10-17T00:00:00+00:00"}
+
+
+def _wait_until(condition, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_restart_resends_spooled_rows_with_same_ids(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "CHAT_WRITE_BEHIND", True)
+    base = str(tmp_path / "spool.jsonl")
+    first = ChatWriter(batch_size=10, flush_seconds=60, max_pending=100, spool_path=base)
+
+    def outage(rows):
+        raise ConnectionError("connection refused")
+
+    monkeypatch.setattr(first, "_insert", outage)
+    first.start()
+    assert first.enqueue([_row("a"), _row("b")])
+    spooled = list(first._pending)
+    # 저장하지 못한 채 프로세스가 종료되고(스풀 잠금 해제) 마지막 기록은 중간에 잘림
+    first.stop(timeout=1)
+    first._spool_lock.close()
+    with open(base, "a", encoding="utf-8") as f:
+        f.write('[{"user_id": "1", "mess')
+
+    sent = []
+    second = ChatWriter(batch_size=10, flush_seconds=0.01, max_pending=100, spool_path=base)
+    monkeypatch.setattr(second, "_insert", lambda rows: sent.append(list(rows)))
+    second.start()
+    try:
+        _wait_until(lambda: not second._pending)
+    finally:
+        second.stop(timeout=1)
+
+    # 같은 client_message_id로 다시 보내므로 이미 저장된 메시지는 ON CONFLICT DO NOTHING으로 건너뜀
+    assert sent == [spooled]
+    assert open(base, encoding="utf-8").read() == ""
+
+
+def test_with_pending_skips_rows_already_saved(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "CHAT_WRITE_BEHIND", True)
+    writer = _writer(str(tmp_path / "spool.jsonl"))
+    writer.start()
+    try:
+        saved = {**_row("a"), "created_at": "2026-10-17T00:00:00Z"}
+        pending = {**_row("b"), "created_at": "2026-10-17T00:00:01+00:00"}
+        other_user = {**_row("c"), "user_id": "2"}
+        writer.enqueue([_row("a"), pending, other_user])
+        # a는 저장된 직후라 DB 조회 결과에도 있음 (created_at 표기가 달라도 같은 메시지)
+        merged = writer.with_pending([saved], "1")
+        assert [row["message"] for row in merged] == ["a", "b"]
+        assert writer.with_pending([saved], "1", limit=1)[0]["message"] == "b"
+    finally:
+        writer.stop(timeout=0)
+
+
+def test_poison_row_is_dead_lettered_and_others_are_saved(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "CHAT_WRITE_BEHIND", True)
+    monkeypatch.setattr(chat_writer_module, "RETRY_MIN_SECONDS", 0.01)
+    saved = []
+
+    def insert(rows):
+        if any(row["message"] == "bad" for row in rows):
+            raise ValueError("violates check constraint")
+        saved.extend(row["message"] for row in rows)
+
+    base = str(tmp_path / "spool.jsonl")
+    writer = ChatWriter(batch_size=10, flush_seconds=0.01, max_pending=100, spool_path=base, max_attempts=2)
+    monkeypatch.setattr(writer, "_insert", insert)
+    dead = metrics.get_counter("chat_writes.dead_lettered")
+    writer.start()
+    try:
+        assert writer.enqueue([_row("a"), _row("bad"), _row("b"), _row("c")])
+        _wait_until(lambda: not writer._pending)
+    finally:
+        writer.stop(timeout=1)
+
+    assert sorted(saved) == ["a", "b", "c"]
+    assert metrics.get_counter("chat_writes.dead_lettered") == dead + 1
+    with open(f"{base}.dead", encoding="utf-8") as f:
+        entries = [json.loads(line) for line in f]
+    assert [entry["row"]["message"] for entry in entries] == ["bad"]
+    assert "check constraint" in entries[0]["error"]
+    # 스풀에는 남은 메시지가 없음
+    assert open(base, encoding="utf-8").read() == ""
+
+
+def test_outage_keeps_every_row_pending(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "CHAT_WRITE_BEHIND", True)
+    monkeypatch.setattr(chat_writer_module, "RETRY_MIN_SECONDS", 0.01)
+    monkeypatch.setattr(chat_writer_module, "RETRY_MAX_SECONDS", 0.01)
+    calls = []
+
+    def insert(rows):
+        calls.append(len(rows))
+        raise ConnectionError("connection refused")
+
+    writer = ChatWriter(batch_size=10, flush_seconds=0.01, max_pending=100,
+                        spool_path=str(tmp_path / "spool.jsonl"), max_attempts=2)
+    monkeypatch.setattr(writer, "_insert", insert)
+    writer.start()
+    try:
+        writer.enqueue([_row("a"), _row("b")])
+        # 반씩 나눠 저장해 본 뒤(1건씩)에도 계속 재시도
+        _wait_until(lambda: len(calls) >= 8)
+    finally:
+        writer.stop(timeout=1)
+
+    assert 1 in calls
+    assert len(writer._pending) == 2
+    assert not (tmp_path / "spool.jsonl.dead").exists()
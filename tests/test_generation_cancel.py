@@ -0,0 +1,77 @@
+# tests/test_generation_cancel.py
+"""
+마감/취소 처리
+- 이번 단계 마감으로 잘린 생성은 요청을 DEADLINE_EXCEEDED로 취소 (잘린 텍스트를 답변으로 쓰지 않음)
+- 원격 VQA 요청은 취소되면 바로 RequestCancelled, 연결을 끊어서 서버도 디코딩 중단
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import socket
+import threading
+import time
+import pytest
+
+pytest.importorskip("pydantic_settings")
+
+from app.core.cancellation import CancellationToken, RequestCancelled, CLIENT_DISCONNECTED, DEADLINE_EXCEEDED
+
+
+def test_step_deadline_truncation_cancels_request():
+    torch = pytest.importorskip("torch")
+    pytest.importorskip("transformers")
+    from app.AImodels.stopping import CancellationStoppingCriteria
+
+    truncated, finished = CancellationToken(), CancellationToken()
+    expired = time.monotonic() - 1
+    criteria = CancellationStoppingCriteria([(truncated, expired), (finished, expired)], done_token_ids=(1,))
+    # 첫 행은 생성 도중(마지막 토큰 5), 둘째 행은 이미 eos(1)로 끝남
+    stop = criteria(torch.tensor([[0, 5], [0, 1]]), None)
+
+    assert stop.tolist() == [True, True]
+    assert truncated.reason == DEADLINE_EXCEEDED
+    with pytest.raises(RequestCancelled):
+        truncated.raise_if_cancelled()
+    assert not finished.cancelled
+
+
+class _SlowHandler(BaseHTTPRequestHandler):
+    disconnected = threading.Event()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        # 디코딩 중인 VQA 서버처럼 응답하지 않고 연결이 끊기는지 확인
+        self.connection.settimeout(0.05)
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            try:
+                if self.connection.recv(1, socket.MSG_PEEK) == b"":
+                    _SlowHandler.disconnected.set()
+                    return
+            except socket.timeout:
+                continue
+            except OSError:
+                _SlowHandler.disconnected.set()
+                return
+
+    def log_message(self, *args):
+        pass
+
+
+def test_cancelled_remote_request_drops_connection():
+    pytest.importorskip("httpx")
+    Image = pytest.importorskip("PIL.Image")
+    from app.services.vqa_client import VQAClient
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _SlowHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = VQAClient(f"http://127.0.0.1:{server.server_address[1]}", timeout=30)
+    token = CancellationToken()
+    threading.Timer(0.2, token.cancel, args=(CLIENT_DISCONNECTED,)).start()
+    try:
+        started_at = time.monotonic()
+        with pytest.raises(RequestCancelled):
+            client.predict(Image.new("RGB", (8, 8)), "질문", 16, cancel=token)
+        assert time.monotonic() - started_at < 2
+        assert _SlowHandler.disconnected.wait(timeout=2)
+    finally:
+        client.close()
+        server.shutdown()
@@ -0,0 +1,29 @@
+# tests/test_image_preprocess.py
+"""종이 영역 자르기: 어두운 배경 위의 밝은 종이만 남기고, 배경이 밝으면 자르지 않음"""
+import pytest
+
+pytest.importorskip("PIL")
+
+from PIL import Image, ImageDraw
+from app.AImodels.image_preprocess import _autocrop
+
+
+def _photo(background: int) -> Image.Image:
+    # 800x600 사진 가운데 400x300 종이, 종이 위에 글씨(검은 줄)
+    image = Image.new("RGB", (800, 600), (background,) * 3)
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((200, 150, 599, 449), fill=(245, 245, 245))
+    for y in range(180, 430, 30):
+        draw.line((230, y, 560, y), fill=(20, 20, 20), width=4)
+    return image
+
+
+def test_dark_background_crops_to_paper():
+    cropped = _autocrop(_photo(background=40))
+    assert 400 <= cropped.width <= 450
+    assert 300 <= cropped.height <= 350
+
+
+def test_bright_background_is_not_cropped():
+    image = _photo(background=235)
+    assert _autocrop(image).size == image.size
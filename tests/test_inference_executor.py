@@ -0,0 +1,104 @@
+# tests/test_inference_executor.py
+"""
+추론 스레드 풀: 우선순위 클래스 순서 + aging, 작업이 던진 예외/취소를 Future로 전달
+"""
+import asyncio
+from concurrent.futures import CancelledError
+import threading
+import time
+import pytest
+
+pytest.importorskip("pydantic_settings")
+
+from app.core.cancellation import RequestCancelled, CLIENT_DISCONNECTED
+from app.core.config import settings
+from app.core.priority import BACKGROUND, INTERACTIVE
+from app.services.inference_executor import InferenceExecutor, InferenceQueueFull
+
+
+def _run_order(executor: InferenceExecutor, submit_pending) -> list:
+    """작업 스레드를 막아둔 채로 submit_pending(order)으로 작업을 쌓고, 풀어준 뒤 실행 순서 반환"""
+    order = []
+    release = threading.Event()
+    blocker = executor.submit(release.wait)
+    futures = submit_pending(order)
+    release.set()
+    blocker.result(timeout=5)
+    for future in futures:
+        future.result(timeout=5)
+    return order
+
+
+def test_interactive_runs_before_background(monkeypatch):
+    monkeypatch.setattr(settings, "PRIORITY_AGING_SECONDS", 0)
+    executor = InferenceExecutor(max_workers=1, queue_size=4)
+
+    def submit_pending(order):
+        return [
+            executor.submit(order.append, "background-1", priority=BACKGROUND),
+            executor.submit(order.append, "background-2", priority=BACKGROUND),
+            executor.submit(order.append, "interactive", priority=INTERACTIVE),
+        ]
+
+    assert _run_order(executor, submit_pending) == ["interactive", "background-1", "background-2"]
+
+
+def test_aged_background_task_runs_first(monkeypatch):
+    # 0.05초 기다릴 때마다 한 단계씩 올라감
+    monkeypatch.setattr(settings, "PRIORITY_AGING_SECONDS", 0.05)
+    executor = InferenceExecutor(max_workers=1, queue_size=4)
+
+    def submit_pending(order):
+        background = executor.submit(order.append, "background", priority=BACKGROUND)
+        time.sleep(0.2)
+        return [background, executor.submit(order.append, "interactive", priority=INTERACTIVE)]
+
+    assert _run_order(executor, submit_pending) == ["background", "interactive"]
+
+
+def test_queue_limit_is_per_priority_class():
+    executor = InferenceExecutor(max_workers=1, queue_size=1)
+    release = threading.Event()
+    futures = [executor.submit(release.wait, priority=BACKGROUND) for _ in range(2)]
+    try:
+        assert executor.is_full(BACKGROUND)
+        with pytest.raises(InferenceQueueFull):
+            executor.submit(release.wait, priority=BACKGROUND)
+        # 백그라운드 작업이 대화형 요청 자리를 차지하지 않음
+        assert not executor.is_full(INTERACTIVE)
+        futures.append(executor.submit(release.wait, priority=INTERACTIVE))
+    finally:
+        release.set()
+    for future in futures:
+        future.result(timeout=5)
+
+
+def test_exception_is_forwarded():
+    executor = InferenceExecutor(max_workers=1, queue_size=4)
+
+    def fail():
+        raise RequestCancelled(CLIENT_DISCONNECTED)
+
+    future = executor.submit(fail, priority=INTERACTIVE)
+    with pytest.raises(RequestCancelled):
+        future.result(timeout=5)
+    # 작업 스레드는 계속 동작
+    assert executor.submit(lambda: 1).result(timeout=5) == 1
+
+
+def test_cancellation_inside_task_is_forwarded_as_cancelled():
+    executor = InferenceExecutor(max_workers=1, queue_size=4)
+
+    def cancelled():
+        raise asyncio.CancelledError("stop")
+
+    future = executor.submit(cancelled)
+    with pytest.raises(CancelledError):
+        future.result(timeout=5)
+
+    async def wait():
+        return await executor.run(cancelled)
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(wait())
+    assert executor.submit(lambda: 2).result(timeout=5) == 2
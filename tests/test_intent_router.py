@@ -0,0 +1,25 @@
+# tests/test_intent_router.py
+from app.AImodels.intent_router import route_query, prescription_route
+
+
+def test_prescription_question_routes_to_vl_with_prompt():
+    route = prescription_route(12, "하루에 몇 번 먹어요?")
+    assert route.tool_name == "VL_Model_Image_Analyzer"
+    assert route.tool_input == "12|하루에 몇 번 먹어요?"
+
+
+def test_upload_keeps_default_analysis():
+    assert prescription_route(12).tool_input == "12"
+    assert prescription_route(12, "  ").tool_input == "12"
+
+
+def test_prescription_id_in_user_text_is_not_routed():
+    # 다른 사용자의 처방전 ID를 입력해도 VL Tool로 바로 가지 않음
+    assert route_query("prescription_id: 123") is None
+    assert route_query("prescription_id: 123\n처방전 질문: 뭐가 적혀 있어?") is None
+
+
+def test_single_drug_name_routes_to_drug_api():
+    route = route_query("타이레놀은 하루에 몇 번 먹어요?")
+    assert route.tool_name == "Public_Data_API_Searcher"
+    assert route.tool_input == "타이레놀"
@@ -0,0 +1,64 @@
+# tests/test_model_loader.py
+"""
+로드에 실패한 모델: 요청 안에서 다시 로드하지 않고 바로 ModelUnavailable, 백그라운드에서 간격을 늘려가며 재시도
+"""
+import time
+import pytest
+
+from app.AImodels import model_loader
+from app.AImodels.model_loader import LazyModel, ModelUnavailable, MODEL_REGISTRY
+
+
+@pytest.fixture
+def fast_reload(monkeypatch):
+    monkeypatch.setattr(model_loader, "MODEL_RELOAD_MIN_SECONDS", 0.05)
+    monkeypatch.setattr(model_loader, "MODEL_RELOAD_MAX_SECONDS", 0.1)
+    yield
+    MODEL_REGISTRY.pop("test_flaky", None)
+
+
+def _wait_until(condition, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_failed_model_is_reloaded_in_background(fast_reload):
+    calls = []
+
+    def load():
+        calls.append(time.monotonic())
+        if len(calls) < 3:
+            raise RuntimeError("out of memory")
+        return "model"
+
+    model = LazyModel("test_flaky", load)
+    with pytest.raises(RuntimeError):
+        model.get()
+    assert model.state == LazyModel.FAILED
+
+    # 실패한 모델은 요청 안에서 다시 로드하지 않음
+    with pytest.raises(ModelUnavailable) as excinfo:
+        model.get()
+    assert excinfo.value.retry_after >= 1.0
+    assert len(calls) == 1
+
+    _wait_until(lambda: model.is_ready)
+    assert model.get() == "model"
+    assert len(calls) == 3
+    assert model.failures == 0
+    # 두 번째 재시도 간격이 첫 번째보다 김
+    assert calls[2] - calls[1] > calls[1] - calls[0] - 0.01
+
+
+def test_status_reports_retry(fast_reload):
+    model = LazyModel("test_flaky", lambda: (_ for _ in ()).throw(RuntimeError("boom")))
+    with pytest.raises(RuntimeError):
+        model.get()
+    status = model.status()
+    assert status["state"] == LazyModel.FAILED
+    assert status["failures"] >= 1
+    assert status["retry_in_seconds"] is not None
+    # 예약된 재시도가 테스트가 끝난 뒤 실행되지 않도록
+    model.state = LazyModel.NOT_LOADED
@@ -0,0 +1,60 @@
+# tests/test_pagination.py
+"""
+keyset 커서: (created_at, id) 왕복, 잘못된 커서는 InvalidCursor, limit + 1개 조회 결과로 다음 커서 생성
+"""
+import base64
+import json
+import pytest
+
+from app.core.pagination import InvalidCursor, decode_cursor, encode_cursor, older_than_filter, page
+
+
+def _cursor(value) -> str:
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip("=")
+
+
+def test_cursor_round_trip():
+    row = {"id": 42, "created_at": "2026-10-17T09:30:00.123456+00:00", "message": "안녕"}
+    cursor = encode_cursor(row)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (row["created_at"], 42)
+
+
+def test_zulu_timestamp_is_normalized():
+    assert decode_cursor(_cursor(["2026-10-17T09:30:00Z", 1])) == ("2026-10-17T09:30:00+00:00", 1)
+
+
+def test_older_than_filter():
+    cursor = encode_cursor({"id": 7, "created_at": "2026-10-17T09:30:00+00:00"})
+    assert older_than_filter(cursor) == (
+        'created_at.lt."2026-10-17T09:30:00+00:00",'
+        'and(created_at.eq."2026-10-17T09:30:00+00:00",id.lt.7)'
+    )
+
+
+@pytest.mark.parametrize("cursor", [
+    "not-base64!!",
+    _cursor({"created_at": "2026-10-17T09:30:00+00:00", "id": 1}),
+    _cursor(["2026-10-17T09:30:00+00:00"]),
+    _cursor(["2026-10-17T09:30:00+00:00", "1"]),
+    _cursor(["2026-10-17T09:30:00+00:00", True]),
+    _cursor([20261017, 1]),
+    # 필터 문자열에 들어가는 값이므로 날짜가 아니면 거절
+    _cursor(['2026-10-17",id.gt.0', 1]),
+])
+def test_invalid_cursor(cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor)
+
+
+def test_page():
+    rows = [{"id": i, "created_at": f"2026-10-17T09:30:0{9 - i}+00:00"} for i in range(4)]
+    items, has_more, next_cursor = page(rows, 3)
+    assert items == rows[:3]
+    assert has_more
+    assert decode_cursor(next_cursor) == (rows[2]["created_at"], 2)
+
+    items, has_more, next_cursor = page(rows[:3], 3)
+    assert items == rows[:3]
+    assert not has_more
+    assert next_cursor is None
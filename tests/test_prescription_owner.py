@@ -0,0 +1,38 @@
+# tests/test_prescription_owner.py
+"""VL Tool은 Agent를 실행 중인 사용자의 처방전만 분석 (질문 텍스트 속 다른 사용자의 prescription_id 거절)"""
+import pytest
+
+pytest.importorskip("pydantic_settings")
+pytest.importorskip("supabase")
+pytest.importorskip("boto3")
+pytest.importorskip("PIL")
+pytest.importorskip("langchain")
+
+from app.AImodels import tools
+from app.services import prescription_analysis
+
+
+@pytest.fixture
+def prescriptions(monkeypatch):
+    rows = {7: {"file_key": "prescriptions/owner.jpg", "ai_analysis": "타이레놀 500mg", "user_id": 1}}
+    monkeypatch.setattr(prescription_analysis, "_get_prescription", lambda supabase, pid: rows.get(pid))
+    monkeypatch.setattr(tools, "analyze_prescription_image", prescription_analysis.analyze_prescription_image)
+    monkeypatch.setattr("app.core.database.supabase_client", lambda: None)
+    return rows
+
+
+def test_owner_can_analyze_own_prescription(prescriptions):
+    with tools.tool_user_scope("1"):
+        assert tools.run_vl_model_inference("7") == "타이레놀 500mg"
+
+
+def test_other_user_prescription_is_not_found(prescriptions):
+    with tools.tool_user_scope("2"):
+        result = tools.run_vl_model_inference("7")
+    assert "찾을 수 없습니다" in result
+
+
+def test_file_key_is_rejected_inside_user_scope(prescriptions):
+    with tools.tool_user_scope("2"):
+        result = tools.run_vl_model_inference("prescriptions/owner.jpg")
+    assert "찾을 수 없습니다" in result
@@ -0,0 +1,27 @@
+# tests/test_prescription_routes.py
+"""GET /prescriptions/messages가 /{prescription_id}에 먼저 매칭되지 않는지 확인"""
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("supabase")
+pytest.importorskip("transformers")
+
+from starlette.routing import Match
+from app.api.prescription import router, get_chat_messages, get_prescription
+
+
+def _first_match(path: str, method: str = "GET"):
+    scope = {"type": "http", "path": path, "method": method}
+    for route in router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.endpoint
+    return None
+
+
+def test_messages_route_is_not_shadowed_by_prescription_id():
+    assert _first_match("/prescriptions/messages") is get_chat_messages
+
+
+def test_prescription_id_route_still_matches():
+    assert _first_match("/prescriptions/42") is get_prescription
@@ -0,0 +1,53 @@
+# tests/test_replica_pool.py
+"""레플리카 풀: 동시에 대여한 레플리카는 서로 다른 인스턴스이고, torch 스레드 수는 풀을 만들 때 한 번만 설정"""
+import threading
+import pytest
+
+from app.AImodels import replica_pool
+from app.AImodels.replica_pool import ReplicaPool
+
+
+@pytest.fixture
+def thread_calls(monkeypatch):
+    calls = []
+    monkeypatch.setattr(replica_pool, "_process_threads", None)
+    monkeypatch.setattr(replica_pool, "_set_torch_threads", calls.append)
+    monkeypatch.setattr(replica_pool.os, "cpu_count", lambda: 8)
+    return calls
+
+
+def test_concurrent_checkouts_get_distinct_replicas(thread_calls):
+    pool = ReplicaPool("test", object, size=3)
+    in_use, overlaps = set(), []
+    lock = threading.Lock()
+    barrier = threading.Barrier(3)
+
+    def run():
+        with pool.checkout() as replica:
+            with lock:
+                if id(replica) in in_use:
+                    overlaps.append(replica)
+                in_use.add(id(replica))
+            # 세 스레드가 모두 레플리카를 가진 상태에서 확인
+            barrier.wait(timeout=5)
+
+    threads = [threading.Thread(target=run) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not overlaps
+    assert len(in_use) == 3
+    # 대여할 때마다 프로세스 전체 스레드 수를 바꾸지 않음 (생성 시 코어 8 / 레플리카 3 = 2 한 번만)
+    assert thread_calls == [2]
+
+
+def test_thread_budget_keeps_smallest_pool_value(thread_calls):
+    ReplicaPool("llm", object, size=1)
+    vl = ReplicaPool("vl", object, size=4)
+    small = ReplicaPool("small", object, size=1, threads_per_replica=6)
+
+    # 코어 8개: llm 8 → vl 2 (4개가 동시에 추론해도 8), 더 큰 값(6)으로는 늘리지 않음
+    assert thread_calls == [8, 2]
+    assert vl.threads_per_replica == small.threads_per_replica == 2
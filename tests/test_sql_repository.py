@@ -0,0 +1,88 @@
+# tests/test_sql_repository.py
+"""
+직접 SQL 경로: 커넥션마다 처음 실행할 때 PREPARE, PREPARE가 실패하면 그 커넥션에서는 text()로 실행
+"""
+from contextlib import contextmanager
+import pytest
+
+pytest.importorskip("pydantic_settings")
+pytest.importorskip("supabase")
+sqlalchemy = pytest.importorskip("sqlalchemy")
+
+from sqlalchemy.exc import ProgrammingError
+from app.core.config import settings
+from app.repositories import sql_repository
+
+
+class _PoolConnection:
+    def __init__(self):
+        self.info = {}
+
+
+class FakeConnection:
+    """SQLAlchemy Connection 중 sql_repository가 쓰는 부분만 흉내 (같은 pool 커넥션을 여러 번 대여)"""
+
+    def __init__(self, pool_connection: _PoolConnection, fail_prepare: bool = False):
+        self.connection = pool_connection
+        self.fail_prepare = fail_prepare
+        self.driver_sql = []
+        self.executed = []
+        self.savepoints = 0
+
+    @contextmanager
+    def begin_nested(self):
+        self.savepoints += 1
+        yield
+
+    def exec_driver_sql(self, statement, parameters=None):
+        if statement.startswith("PREPARE") and self.fail_prepare:
+            raise ProgrammingError(statement, None, Exception('column "ai_analysis" does not exist'))
+        self.driver_sql.append((statement, parameters))
+        return "prepared"
+
+    def execute(self, statement, parameters=None):
+        self.executed.append((statement, parameters))
+        return "text"
+
+
+@pytest.fixture(autouse=True)
+def prepared_statements(monkeypatch):
+    monkeypatch.setattr(settings, "DB_PREPARED_STATEMENTS", True)
+
+
+def test_prepare_once_per_connection():
+    pool_connection = _PoolConnection()
+    first = FakeConnection(pool_connection)
+    assert sql_repository._execute(first, "get_prescription", {"prescription_id": 1}) == "prepared"
+    assert first.driver_sql[0][0].startswith("PREPARE get_prescription AS")
+    assert first.driver_sql[1] == ("EXECUTE get_prescription(%s)", (1,))
+
+    # 같은 pool 커넥션을 다시 대여하면 PREPARE 없이 EXECUTE만
+    second = FakeConnection(pool_connection)
+    sql_repository._execute(second, "get_prescription", {"prescription_id": 2})
+    assert second.driver_sql == [("EXECUTE get_prescription(%s)", (2,))]
+
+
+def test_failed_prepare_falls_back_to_text():
+    pool_connection = _PoolConnection()
+    conn = FakeConnection(pool_connection, fail_prepare=True)
+    assert sql_repository._execute(conn, "get_prescription", {"prescription_id": 1}) == "text"
+    assert conn.savepoints == 1
+    assert conn.executed == [(sql_repository._STATEMENTS["get_prescription"][1], {"prescription_id": 1})]
+
+    # 실패한 쿼리는 이 커넥션에서 다시 PREPARE하지 않음, 다른 쿼리는 그대로 PREPARE
+    conn.fail_prepare = False
+    sql_repository._execute(conn, "get_prescription", {"prescription_id": 2})
+    assert conn.executed[-1][1] == {"prescription_id": 2}
+    assert sql_repository._execute(conn, "load_chat_history", {"user_id": "1", "limit": 5}) == "prepared"
+    assert pool_connection.info[sql_repository._PREPARED_KEY] == {
+        "get_prescription": False, "load_chat_history": True
+    }
+
+
+def test_bulk_insert_statement():
+    statement = str(sql_repository._bulk_insert_statement(("user_id", "message", "client_message_id"), 2, True))
+    assert "VALUES (:user_id_0, :message_0, :client_message_id_0), (:user_id_1, :message_1, :client_message_id_1)" in statement
+    assert "ON CONFLICT (client_message_id) DO NOTHING" in statement
+    # 같은 모양의 구문은 다시 만들지 않음
+    assert sql_repository._bulk_insert_statement(("user_id",), 3, False) is sql_repository._bulk_insert_statement(("user_id",), 3, False)
@@ -0,0 +1,54 @@
+# tests/test_vision_cache_followup.py
+"""같은 처방전 이미지에 대한 후속 질문 (다른 프롬프트)은 다운로드 없이 비전 인코더 캐시를 재사용"""
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("pydantic_settings")
+pytest.importorskip("supabase")
+pytest.importorskip("boto3")
+pytest.importorskip("PIL")
+
+from app.AImodels.vision_cache import vision_cache
+from app.core.metrics import metrics
+from app.services import prescription_analysis
+from app.services.ai_service import ai_service
+
+
+def test_followup_prompt_is_vision_cache_hit(monkeypatch):
+    if ai_service.vl_model is None:
+        pytest.skip("VL_BACKEND=remote (비전 인코더 캐시는 VQA 서버에 있음)")
+
+    content_hash = "followup-test-image"
+    # 첫 질문(기본 프롬프트) 분석 후 남는 항목: vision tower 결과로 교체된 image_embeds
+    vision_cache.put_embeds(content_hash, torch.tensor([[1, 2, 2]]), torch.zeros(1, 8))
+    monkeypatch.setattr(ai_service.vl_model, "load_count", 1)
+
+    def fail_download(file_key):
+        raise AssertionError("비전 인코더 캐시가 있으면 S3에서 다운로드하지 않아야 함")
+
+    monkeypatch.setattr(
+        prescription_analysis.s3_service, "get_image_hashes",
+        lambda file_key: {"content_hash": content_hash, "perceptual_hash": None}
+    )
+    monkeypatch.setattr(prescription_analysis.s3_service, "download_prescription", fail_download)
+
+    calls = []
+
+    def analyze(image, prompt, max_new_tokens=128, image_key=None):
+        calls.append((image, prompt, image_key))
+        return "하루 세 번 식후 복용"
+
+    monkeypatch.setattr(ai_service, "analyze_prescription_sync", analyze)
+
+    hits = metrics.get_counter("vision_cache.hit")
+    # supabase=None: 분석 캐시 DB 조회/저장은 실패해도 무시됨 (메모리 캐시만 사용)
+    answer = prescription_analysis.analyze_prescription_image(
+        None, "prescriptions/followup.jpg", "하루에 몇 번 먹어요?"
+    )
+
+    assert answer == "하루 세 번 식후 복용"
+    assert metrics.get_counter("vision_cache.hit") == hits + 1
+    image, prompt, image_key = calls[0]
+    assert "image_embeds" in image
+    assert prompt == "하루에 몇 번 먹어요?"
+    assert image_key == content_hash